@@ -0,0 +1,122 @@
+"""
+Agendador adaptativo das verificações da planilha do Bot_Gerson.
+
+Encurta o intervalo logo após alterações serem detectadas, aplica backoff
+exponencial quando a planilha está parada e respeita janelas de expediente
+(fora delas as verificações ficam bem mais espaçadas).
+"""
+
+import random
+from datetime import datetime, timedelta
+
+
+def parse_janelas(texto):
+    """Converte "08:00-12:00,13:00-18:00" em [((8, 0), (12, 0)), ((13, 0), (18, 0))]."""
+    janelas = []
+    for parte in (texto or "").split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        inicio, fim = parte.split("-")
+        h_ini, m_ini = (int(x) for x in inicio.strip().split(":"))
+        h_fim, m_fim = (int(x) for x in fim.strip().split(":"))
+        janelas.append(((h_ini, m_ini), (h_fim, m_fim)))
+    return janelas
+
+
+def parse_dias(texto):
+    """Converte "0,1,2,3,4" (segunda=0) em um conjunto de dias da semana."""
+    return {int(d) for d in (texto or "").split(",") if d.strip()}
+
+
+class AgendadorVerificacao:
+    """
+    Calcula quanto tempo esperar até a próxima verificação da planilha.
+
+    Args:
+        intervalo_minimo: Intervalo usado logo após detectar alterações (segundos).
+        intervalo_maximo: Teto do backoff dentro do expediente (segundos).
+        intervalo_fora_expediente: Intervalo usado fora das janelas de expediente (segundos).
+        fator_backoff: Multiplicador aplicado a cada ciclo sem alterações.
+        jitter: Fração de variação aleatória aplicada ao intervalo (0.1 = ±10%).
+        janelas: Lista de ((hora, min), (hora, min)) com o expediente. Vazia = sempre expediente.
+        dias: Dias da semana com expediente (segunda=0). Vazio = todos os dias.
+    """
+
+    def __init__(self, intervalo_minimo=60, intervalo_maximo=600, intervalo_fora_expediente=1800,
+                 fator_backoff=2.0, jitter=0.1, janelas=None, dias=None):
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_maximo = max(intervalo_maximo, intervalo_minimo)
+        self.intervalo_fora_expediente = intervalo_fora_expediente
+        self.fator_backoff = fator_backoff
+        self.jitter = jitter
+        self.janelas = janelas or []
+        self.dias = dias or set()
+
+        self.intervalo_atual = intervalo_minimo  # Intervalo adaptativo (sem jitter)
+        self.ultimo_intervalo = None  # Último intervalo efetivamente agendado
+        self.ciclos_sem_alteracao = 0
+
+    def em_expediente(self, agora=None):
+        """Verifica se o horário informado está dentro de alguma janela de expediente."""
+        agora = agora or datetime.now()
+        if self.dias and agora.weekday() not in self.dias:
+            return False
+        if not self.janelas:
+            return True
+        minuto_dia = agora.hour * 60 + agora.minute
+        for (h_ini, m_ini), (h_fim, m_fim) in self.janelas:
+            if h_ini * 60 + m_ini <= minuto_dia < h_fim * 60 + m_fim:
+                return True
+        return False
+
+    def proximo_inicio_expediente(self, agora=None):
+        """Retorna o datetime do próximo início de janela de expediente (ou None)."""
+        agora = agora or datetime.now()
+        janelas = self.janelas or [((0, 0), (24, 0))]
+        for dias_adiante in range(8):
+            dia = agora + timedelta(days=dias_adiante)
+            if self.dias and dia.weekday() not in self.dias:
+                continue
+            for (h_ini, m_ini), _ in sorted(janelas):
+                inicio = dia.replace(hour=h_ini, minute=m_ini, second=0, microsecond=0)
+                if inicio > agora:
+                    return inicio
+        return None
+
+    def registrar_ciclo(self, houve_alteracao):
+        """Atualiza o intervalo adaptativo com o resultado do ciclo."""
+        if houve_alteracao:
+            self.intervalo_atual = self.intervalo_minimo
+            self.ciclos_sem_alteracao = 0
+        else:
+            self.ciclos_sem_alteracao += 1
+            self.intervalo_atual = min(self.intervalo_atual * self.fator_backoff, self.intervalo_maximo)
+
+    def proximo_intervalo(self, agora=None):
+        """Calcula o próximo intervalo de espera (segundos), já com jitter."""
+        agora = agora or datetime.now()
+
+        if self.em_expediente(agora):
+            intervalo = self.intervalo_atual
+        else:
+            intervalo = max(self.intervalo_atual, self.intervalo_fora_expediente)
+            # Não dorme além da abertura do próximo expediente
+            inicio = self.proximo_inicio_expediente(agora)
+            if inicio is not None:
+                intervalo = min(intervalo, max((inicio - agora).total_seconds(), self.intervalo_minimo))
+
+        if self.jitter:
+            intervalo *= 1 + random.uniform(-self.jitter, self.jitter)
+
+        self.ultimo_intervalo = max(1.0, intervalo)
+        return self.ultimo_intervalo
+
+    def descricao(self):
+        """Texto curto com o intervalo atual, usado no comando /status."""
+        intervalo = self.ultimo_intervalo if self.ultimo_intervalo is not None else self.intervalo_atual
+        minutos, segundos = divmod(int(intervalo), 60)
+        texto = f"{minutos}min {segundos:02d}s" if minutos else f"{segundos}s"
+        if not self.em_expediente():
+            texto += " (fora do expediente)"
+        return texto
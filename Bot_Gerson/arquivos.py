@@ -0,0 +1,168 @@
+"""
+Gravação atômica e leitura validada dos arquivos de dados do Bot_Gerson.
+
+Os arquivos são gravados num temporário na mesma pasta, com fsync, e só então
+substituem o original (`os.replace`). Uma interrupção no meio da gravação
+(ex: TerminateProcess/SIGTERM do bot_manager) deixa o arquivo anterior intacto.
+
+Os arquivos de dados gravados aqui (JSON ou msgpack, veja serializacao.py)
+levam a chave "_checksum" (hash dos demais dados); na leitura, um arquivo
+ilegível ou com checksum divergente é ignorado e a versão válida mais recente
+do repositório de backups é usada no lugar.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+from serializacao import canonico, canonico_json, codificar, decodificar
+
+logger = logging.getLogger(__name__)
+
+CHAVE_CHECKSUM = "_checksum"
+
+
+class ArquivoCorrompido(Exception):
+    """O arquivo existe, mas não pôde ser lido ou não passou na validação."""
+
+
+# === Bytes gravados (métricas do ciclo) ===
+_bytes_gravados = 0
+_lock_bytes = threading.Lock()  # Gravações também rodam em threads (asyncio.to_thread)
+
+
+def contabilizar_gravacao(quantidade):
+    """Soma `quantidade` bytes ao total gravado nos arquivos de dados pelo processo."""
+    global _bytes_gravados
+    with _lock_bytes:
+        _bytes_gravados += quantidade
+
+
+def bytes_gravados():
+    """Total de bytes gravados nos arquivos de dados (gravações atômicas e linhas de log JSONL)."""
+    return _bytes_gravados
+
+
+def gravar_atomico(caminho, conteudo):
+    """Grava `conteudo` (str ou bytes) em `caminho` de forma atômica (temp + fsync + os.replace)."""
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(conteudo, str):
+        conteudo = conteudo.encode("utf-8")
+
+    temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}.tmp")
+    try:
+        with open(temporario, "wb") as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+    contabilizar_gravacao(len(conteudo))
+
+    # Garante que a renomeação em si chegou ao disco (não suportado no Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(caminho.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def descartar_linha_incompleta(caminho):
+    """
+    Remove do final de um arquivo de linhas (JSONL) uma linha sem quebra, deixada por
+    uma gravação interrompida, para que o próximo append não a corrompa. Retorna True se removeu.
+    """
+    with open(caminho, "rb+") as f:
+        conteudo = f.read()
+        if conteudo and not conteudo.endswith(b"\n"):
+            f.truncate(conteudo.rfind(b"\n") + 1)
+            return True
+    return False
+
+
+def calcular_checksum(dados):
+    """Hash dos dados numa serialização canônica (independe do formato e da indentação do arquivo)."""
+    return hashlib.blake2b(canonico(dados), digest_size=16).hexdigest()
+
+
+def _checksum_json(dados):
+    return hashlib.blake2b(canonico_json(dados), digest_size=16).hexdigest()
+
+
+def serializar_dados(dados, indent=4, formato=None):
+    """Serializa um dict (com a chave de checksum acrescentada ao final) no formato configurado."""
+    return codificar({**dados, CHAVE_CHECKSUM: calcular_checksum(dados)}, formato=formato, indent=indent)
+
+
+def gravar_dados(caminho, dados, indent=4, formato=None):
+    """Grava um dict de forma atômica e com checksum (JSON, orjson ou msgpack)."""
+    gravar_atomico(caminho, serializar_dados(dados, indent=indent, formato=formato))
+
+
+def ler_dados(caminho):
+    """
+    Lê um arquivo gravado por `gravar_dados` (formato detectado pelo conteúdo) e valida o checksum.
+
+    Arquivos sem a chave de checksum (formato antigo) são aceitos como estão.
+    Levanta ArquivoCorrompido se o arquivo não puder ser lido ou não bater.
+    """
+    try:
+        conteudo = Path(caminho).read_bytes()
+    except OSError as e:
+        raise ArquivoCorrompido(f"{Path(caminho).name}: {e}") from e
+    return validar_dados(conteudo, Path(caminho).name)
+
+
+def validar_dados(conteudo, descricao):
+    """Decodifica o conteúdo (bytes ou texto) e confere o checksum (se houver). Levanta ArquivoCorrompido."""
+    try:
+        dados = decodificar(conteudo)
+    except ValueError as e:
+        raise ArquivoCorrompido(f"{descricao}: {e}") from e
+
+    if isinstance(dados, dict) and CHAVE_CHECKSUM in dados:
+        esperado = dados.pop(CHAVE_CHECKSUM)
+        # Checksums antigos foram calculados pelo módulo json; só recalcula assim se o rápido divergir
+        if calcular_checksum(dados) != esperado and _checksum_json(dados) != esperado:
+            raise ArquivoCorrompido(f"{descricao}: checksum não confere")
+    return dados
+
+
+def carregar_dados(caminho, backups=None, padrao=None):
+    """
+    Carrega um arquivo de dados validado, recorrendo à versão válida mais recente do backup se estiver corrompido.
+
+    Args:
+        backups: RepositorioBackups onde procurar versões de `caminho.name` (opcional).
+
+    Returns:
+        (dados, origem): origem é o caminho lido, a descrição do backup usado,
+        ou None se o arquivo não existe (dados = padrao).
+    """
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return padrao, None
+    try:
+        return ler_dados(caminho), caminho
+    except ArquivoCorrompido as e:
+        logger.error(f"Arquivo corrompido: {e}. Procurando backup válido...")
+        # Preserva o arquivo corrompido para análise/recuperação manual
+        caminho.replace(caminho.with_name(caminho.name + ".corrompido"))
+        if backups is not None:
+            for versao in backups.versoes(caminho.name):
+                try:
+                    conteudo = backups.ler(versao)
+                    dados = validar_dados(conteudo, f"backup de {versao['data']}")
+                except (ArquivoCorrompido, OSError) as erro_backup:
+                    logger.warning(f"Backup inválido ignorado: {erro_backup}")
+                    continue
+                gravar_atomico(caminho, conteudo)
+                logger.warning(f"{caminho.name} restaurado a partir do backup de {versao['data']}")
+                return dados, f"backup de {versao['data']}"
+        raise
@@ -0,0 +1,268 @@
+"""
+Repositório de backups do Bot_Gerson: deduplicado, comprimido e com retenção.
+
+Cada backup é guardado uma única vez por conteúdo (endereçado pelo hash) em
+`objetos/`, comprimido com zstd (se o pacote `zstandard` estiver instalado)
+ou gzip. O `manifesto.json` lista as versões de cada arquivo; versões com o
+mesmo conteúdo da anterior não são registradas, então o uso de disco cresce
+com as alterações reais, não com o tempo.
+
+A retenção mantém uma versão por hora nas últimas horas, uma por dia nos
+últimos dias e uma por mês nos últimos meses (sempre preservando a mais nova).
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from arquivos import ArquivoCorrompido, gravar_atomico, gravar_dados, ler_dados
+from serializacao import canonico
+
+logger = logging.getLogger(__name__)
+
+FORMATO_DATA = "%Y-%m-%dT%H:%M:%S"
+
+# Backups soltos das versões anteriores: <nome>_backup_YYYYMMDD_HHMMSS<ext>
+_PADRAO_LEGADO = re.compile(r"^(?P<base>.+)_backup_(?:reset_)?(?P<data>\d{8}_\d{6})(?P<ext>\.json|\.db)$")
+
+
+def _comprimir(conteudo, compressao):
+    if compressao == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).compress(conteudo)
+    return gzip.compress(conteudo, compresslevel=6, mtime=0)
+
+
+def _descomprimir(conteudo, extensao):
+    if extensao == ".zst":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(conteudo)
+    return gzip.decompress(conteudo)
+
+
+def escolher_compressao(preferida="auto"):
+    """Retorna "zstd" se disponível (e desejado); caso contrário "gzip"."""
+    if preferida in ("auto", "zstd"):
+        try:
+            import zstandard  # noqa: F401
+            return "zstd"
+        except ImportError:
+            if preferida == "zstd":
+                logger.warning("zstandard não instalado; usando gzip nos backups. Instale com: pip install zstandard")
+    return "gzip"
+
+
+class RepositorioBackups:
+    """
+    Backups deduplicados por conteúdo, com retenção em camadas.
+
+    Args:
+        pasta: Pasta dos backups (ex: backups/).
+        compressao: "auto", "zstd" ou "gzip".
+        horas / dias / meses: Camadas da retenção (uma versão por hora/dia/mês).
+    """
+
+    def __init__(self, pasta, compressao="auto", horas=24, dias=30, meses=12):
+        self.pasta = Path(pasta)
+        self.pasta_objetos = self.pasta / "objetos"
+        self.caminho_manifesto = self.pasta / "manifesto.json"
+        self.compressao = escolher_compressao(compressao)
+        self.horas = horas
+        self.dias = dias
+        self.meses = meses
+        self._manifesto = None
+
+    # === Manifesto ===
+    @property
+    def manifesto(self):
+        if self._manifesto is None:
+            self._manifesto = {"versoes": []}
+            if self.caminho_manifesto.exists():
+                try:
+                    self._manifesto = ler_dados(self.caminho_manifesto)
+                except ArquivoCorrompido as e:
+                    logger.error(f"Manifesto de backups corrompido ({e}); reconstruindo a partir dos objetos")
+                    self._manifesto = self._reconstruir_manifesto()
+        return self._manifesto
+
+    def _salvar_manifesto(self):
+        gravar_dados(self.caminho_manifesto, self.manifesto)
+
+    def _reconstruir_manifesto(self):
+        """Último recurso: lista os objetos existentes (sem nome de arquivo) como versões avulsas."""
+        versoes = []
+        for objeto in sorted(self.pasta_objetos.glob("*/*")):
+            versoes.append({
+                "nome": "desconhecido",
+                "hash": objeto.name.split(".")[0],
+                "objeto": str(objeto.relative_to(self.pasta)),
+                "data": datetime.fromtimestamp(objeto.stat().st_mtime).strftime(FORMATO_DATA),
+                "tamanho": None,
+                "tamanho_comprimido": objeto.stat().st_size,
+            })
+        return {"versoes": versoes}
+
+    # === Escrita ===
+    def salvar(self, nome, conteudo, quando=None, gravar_manifesto=True):
+        """
+        Registra uma versão de `nome` com o `conteudo` (bytes).
+
+        Retorna a entrada criada, ou None se o conteúdo é igual ao da última versão.
+        """
+        quando = quando or datetime.now()
+        digest = hashlib.blake2b(conteudo, digest_size=20).hexdigest()
+
+        ultima = self.ultima(nome)
+        if ultima is not None and ultima["hash"] == digest:
+            return None
+
+        # Reaproveita o objeto se o mesmo conteúdo já foi guardado (por qualquer versão)
+        existente = next((v for v in self.manifesto["versoes"] if v["hash"] == digest), None)
+        if existente is not None and (self.pasta / existente["objeto"]).exists():
+            objeto = existente["objeto"]
+            tamanho_comprimido = existente["tamanho_comprimido"]
+        else:
+            extensao = ".zst" if self.compressao == "zstd" else ".gz"
+            caminho_objeto = self.pasta_objetos / digest[:2] / (digest + extensao)
+            comprimido = _comprimir(conteudo, self.compressao)
+            gravar_atomico(caminho_objeto, comprimido)
+            objeto = str(caminho_objeto.relative_to(self.pasta))
+            tamanho_comprimido = len(comprimido)
+
+        entrada = {
+            "nome": nome,
+            "hash": digest,
+            "objeto": objeto,
+            "data": quando.strftime(FORMATO_DATA),
+            "tamanho": len(conteudo),
+            "tamanho_comprimido": tamanho_comprimido,
+        }
+        self.manifesto["versoes"].append(entrada)
+        if gravar_manifesto:
+            self._salvar_manifesto()
+        return entrada
+
+    # === Leitura ===
+    def versoes(self, nome=None):
+        """Versões (de um arquivo ou de todos), da mais recente para a mais antiga."""
+        versoes = [v for v in self.manifesto["versoes"] if nome is None or v["nome"] == nome]
+        return sorted(versoes, key=lambda v: v["data"], reverse=True)
+
+    def ultima(self, nome):
+        versoes = self.versoes(nome)
+        return versoes[0] if versoes else None
+
+    def ler(self, entrada):
+        """Conteúdo (bytes) de uma versão, verificado contra o hash."""
+        caminho = self.pasta / entrada["objeto"]
+        conteudo = _descomprimir(caminho.read_bytes(), caminho.suffix)
+        if hashlib.blake2b(conteudo, digest_size=20).hexdigest() != entrada["hash"]:
+            raise ArquivoCorrompido(f"backup {entrada['objeto']}: conteúdo não confere com o hash")
+        return conteudo
+
+    def uso_disco(self):
+        """Bytes ocupados pelos objetos (cada conteúdo conta uma vez)."""
+        return sum(p.stat().st_size for p in self.pasta_objetos.glob("*/*"))
+
+    # === Retenção ===
+    def aplicar_retencao(self, agora=None):
+        """Remove versões fora das camadas de retenção e objetos não referenciados. Retorna quantas removeu."""
+        agora = agora or datetime.now()
+        manter = []
+        for nome in {v["nome"] for v in self.manifesto["versoes"]}:
+            vistos = set()
+            for indice, versao in enumerate(self.versoes(nome)):
+                data = datetime.strptime(versao["data"], FORMATO_DATA)
+                idade = agora - data
+                meses_idade = (agora.year - data.year) * 12 + agora.month - data.month
+                if indice == 0:
+                    chave = "mais_recente"
+                elif idade.total_seconds() < self.horas * 3600:
+                    chave = ("hora", data.strftime("%Y%m%d%H"))
+                elif idade.days < self.dias:
+                    chave = ("dia", data.strftime("%Y%m%d"))
+                elif meses_idade < self.meses:
+                    chave = ("mes", data.strftime("%Y%m"))
+                else:
+                    continue
+                # Versões em ordem decrescente: a primeira de cada faixa é a mais nova dela
+                if chave not in vistos:
+                    vistos.add(chave)
+                    manter.append(versao)
+
+        removidas = len(self.manifesto["versoes"]) - len(manter)
+        if removidas:
+            self.manifesto["versoes"] = manter
+            self._salvar_manifesto()
+
+        # Coleta de lixo: objetos sem nenhuma versão apontando para eles
+        referenciados = {v["objeto"] for v in manter}
+        for objeto in self.pasta_objetos.glob("*/*"):
+            if str(objeto.relative_to(self.pasta)) not in referenciados:
+                objeto.unlink()
+        return removidas
+
+    # === Migração ===
+    def importar_legados(self):
+        """
+        Importa os backups soltos das versões anteriores (*_backup_YYYYMMDD_HHMMSS.json/.db).
+
+        O conteúdo é deduplicado e comprimido; os arquivos originais são apagados
+        após a importação. Retorna a quantidade de arquivos importados.
+        """
+        legados = []
+        for caminho in self.pasta.glob("*_backup_*"):
+            correspondencia = _PADRAO_LEGADO.match(caminho.name)
+            if correspondencia and caminho.is_file():
+                legados.append((correspondencia, caminho))
+        if not legados:
+            return 0
+
+        importados = []
+        for correspondencia, caminho in sorted(legados, key=lambda item: item[0].group("data")):
+            base = correspondencia.group("base")
+            quando = datetime.strptime(correspondencia.group("data"), "%Y%m%d_%H%M%S")
+            try:
+                if base == "estado_empresas":
+                    nome, conteudo = "estado_empresas.json", serializar_estado(_registros_legados(caminho))
+                else:
+                    nome, conteudo = base + correspondencia.group("ext"), caminho.read_bytes()
+                self.salvar(nome, conteudo, quando, gravar_manifesto=False)
+                importados.append(caminho)
+            except Exception as e:
+                logger.warning(f"Backup antigo não importado ({caminho.name}): {e}")
+                continue
+
+        # Só apaga os originais depois que o manifesto com as versões importadas foi gravado
+        self._salvar_manifesto()
+        for caminho in importados:
+            caminho.unlink()
+
+        logger.info(f"{len(importados)} backups antigos importados para o repositório deduplicado")
+        return len(importados)
+
+
+def serializar_estado(registros):
+    """Forma canônica do estado para backup (mesmo conteúdo -> mesmos bytes)."""
+    return canonico(registros)
+
+
+def _registros_legados(caminho):
+    if caminho.suffix == ".db":
+        conexao = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+        try:
+            return {
+                codigo: {"nome": nome, "status": status, "regime_tributario": regime}
+                for codigo, nome, status, regime in conexao.execute(
+                    "SELECT codigo, nome, status, regime_tributario FROM empresas"
+                )
+            }
+        finally:
+            conexao.close()
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f).get("registros", {})
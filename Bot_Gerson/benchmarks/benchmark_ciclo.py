@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark do ciclo de monitoramento do Bot_Gerson.
+
+Executa `MyBot.executar_ciclo` (o corpo de monitorar_planilha) contra planilhas
+sintéticas locais, sem Discord nem Google Sheets, e mede por ciclo:
+
+- tempo de parede (ms)
+- pico de memória RSS do processo (MB)
+- bytes gravados pelo bot em arquivos de dados (contador de arquivos.bytes_gravados)
+- notificações emitidas (mensagens enviadas aos canais falsos)
+
+Cada cenário (linhas x taxa de alteração) roda em um subprocesso próprio, para
+que o pico de RSS de um cenário não contamine o seguinte.
+
+Uso:
+    python benchmarks/benchmark_ciclo.py
+    python benchmarks/benchmark_ciclo.py --linhas 1000 10000 --churn 0 0.01 --ciclos 5
+    python benchmarks/benchmark_ciclo.py --saida resultados.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def _pico_rss_mb():
+    """Pico de RSS do processo atual em MB."""
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux retorna KB; macOS retorna bytes
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+class CanalFalso:
+    """Canal do Discord falso: apenas conta as mensagens enviadas."""
+
+    def __init__(self):
+        self.enviadas = 0
+
+    async def send(self, *args, **kwargs):
+        self.enviadas += 1
+
+
+async def _aguardar_tarefas_pendentes(bot):
+    """Aguarda as notificações enfileiradas e as gravações agendadas (sem esperar a janela de debounce)."""
+    await bot.despachante.aguardar()
+    await bot.persistencia.descarregar()
+    ignorar = {asyncio.current_task(), *bot.despachante.tarefas}
+    while True:
+        pendentes = [t for t in asyncio.all_tasks() if t not in ignorar and not t.done()]
+        if not pendentes:
+            return
+        await asyncio.gather(*pendentes, return_exceptions=True)
+
+
+async def _executar_cenario(linhas, churn, ciclos, semente):
+    # Imports tardios: as variáveis de ambiente precisam estar definidas antes de importar main
+    import main
+    from arquivos import bytes_gravados
+    from fontes_planilha import FonteArquivoLocal, gerar_planilha_sintetica
+    from planilha import DetectorRevisaoFonte
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    csv_path = gerar_planilha_sintetica(main.DATA_DIR / "planilha_sintetica.csv", linhas, semente=semente)
+    fonte = FonteArquivoLocal(csv_path, taxa_mutacao=churn, semente=semente).conectar()
+
+    class BotBenchmark(main.MyBot):
+        def __init__(self):
+            super().__init__()
+            self.canal_falso = CanalFalso()
+            self.fonte = fonte
+            self.detector_alteracoes = DetectorRevisaoFonte(fonte)
+            # Canais falsos: sem limite de taxa, para medir só o custo do bot
+            self.despachante.por_segundo_por_canal = 0
+
+        def get_channel(self, _id):
+            return self.canal_falso
+
+    bot = BotBenchmark()
+    bot.despachante.iniciar()
+    bot.sheet_data = bot.carregar_estado()
+    bot.indice.reconstruir(bot.sheet_data)
+
+    resultados = []
+    # Ciclo 0 = carga inicial (sem notificações); os demais aplicam a taxa de alteração
+    for ciclo in range(ciclos + 1):
+        bytes_antes = bytes_gravados()
+        enviadas_antes = bot.canal_falso.enviadas
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await bot.executar_ciclo()
+            await _aguardar_tarefas_pendentes(bot)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        resultados.append({
+            "ciclo": ciclo,
+            "tempo_ms": round(duracao_ms, 2),
+            "bytes_gravados": bytes_gravados() - bytes_antes,
+            "notificacoes": bot.canal_falso.enviadas - enviadas_antes,
+        })
+
+    estaveis = resultados[1:] or resultados
+    return {
+        "linhas": linhas,
+        "churn": churn,
+        "carga_inicial_ms": resultados[0]["tempo_ms"],
+        "ciclo_mediano_ms": round(statistics.median(r["tempo_ms"] for r in estaveis), 2),
+        "ciclo_max_ms": max(r["tempo_ms"] for r in estaveis),
+        "bytes_por_ciclo": round(statistics.mean(r["bytes_gravados"] for r in estaveis)),
+        "notificacoes_por_ciclo": round(statistics.mean(r["notificacoes"] for r in estaveis), 1),
+        "pico_rss_mb": round(_pico_rss_mb(), 1),
+        "ciclos": resultados,
+    }
+
+
+def _rodar_subprocesso(linhas, churn, ciclos, semente):
+    """Roda um cenário em subprocesso isolado (diretórios temporários próprios)."""
+    with tempfile.TemporaryDirectory(prefix="gerson_bench_") as tmp:
+        env = dict(os.environ)
+        env.update({
+            "GERSON_DATA_DIR": str(Path(tmp) / "data"),
+            "GERSON_LOGS_DIR": str(Path(tmp) / "logs"),
+            "GERSON_BACKUPS_DIR": str(Path(tmp) / "backups"),
+            "FONTE_PLANILHA": "local",
+            "VERIFICAR_REVISAO_DRIVE": "true",
+        })
+        saida = subprocess.run(
+            [sys.executable, __file__, "--cenario", str(linhas), str(churn),
+             "--ciclos", str(ciclos), "--semente", str(semente)],
+            cwd=BOT_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def _imprimir_tabela(resultados):
+    cabecalho = f"{'linhas':>8} {'churn':>7} {'carga (ms)':>11} {'ciclo p50 (ms)':>15} {'ciclo max (ms)':>15} {'bytes/ciclo':>12} {'notif/ciclo':>12} {'pico RSS (MB)':>14}"
+    print(cabecalho)
+    print("-" * len(cabecalho))
+    for r in resultados:
+        print(f"{r['linhas']:>8} {r['churn']:>7} {r['carga_inicial_ms']:>11.1f} {r['ciclo_mediano_ms']:>15.1f} "
+              f"{r['ciclo_max_ms']:>15.1f} {r['bytes_por_ciclo']:>12} {r['notificacoes_por_ciclo']:>12} {r['pico_rss_mb']:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do ciclo de monitoramento do Bot_Gerson")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--churn", type=float, nargs="+", default=[0.0, 0.001, 0.01],
+                        help="Fração das linhas alteradas a cada ciclo")
+    parser.add_argument("--ciclos", type=int, default=5, help="Ciclos medidos após a carga inicial")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--cenario", nargs=2, metavar=("LINHAS", "CHURN"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cenario:
+        # Execução interna de um único cenário (chamada pelo processo pai)
+        sys.path.insert(0, str(BOT_DIR))
+        linhas, churn = int(args.cenario[0]), float(args.cenario[1])
+        resultado = asyncio.run(_executar_cenario(linhas, churn, args.ciclos, args.semente))
+        print(json.dumps(resultado))
+        return
+
+    resultados = []
+    for linhas in args.linhas:
+        for churn in args.churn:
+            print(f"Executando cenário: {linhas} linhas, churn {churn}...", file=sys.stderr)
+            resultados.append(_rodar_subprocesso(linhas, churn, args.ciclos, args.semente))
+
+    _imprimir_tabela(resultados)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=4, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
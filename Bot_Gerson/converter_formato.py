@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Converte os arquivos de dados do Bot_Gerson entre JSON, orjson e msgpack.
+
+O bot lê qualquer um dos formatos (detectado pelo conteúdo), então a conversão
+é opcional: serve para converter de uma vez os arquivos existentes (em vez de
+esperar a próxima gravação de cada um) ou para exportar um arquivo em msgpack
+como JSON legível. O checksum de cada arquivo é validado antes da conversão.
+
+Uso (a partir da pasta Bot_Gerson, de preferência com o bot parado):
+    python converter_formato.py --formato msgpack
+    python converter_formato.py --formato json
+    python converter_formato.py --arquivo data/historico_suspensas.json --saida suspensas_legivel.json
+
+Para manter o formato, ajuste também FORMATO_ARQUIVOS no config/.env; caso
+contrário o bot volta a gravar cada arquivo no formato configurado.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from arquivos import ArquivoCorrompido, gravar_dados, ler_dados
+from serializacao import FORMATOS, escolher_formato
+
+BOT_DIR = Path(__file__).parent.resolve()
+DATA_DIR = Path(os.getenv("GERSON_DATA_DIR", BOT_DIR / "data"))
+BACKUPS_DIR = Path(os.getenv("GERSON_BACKUPS_DIR", BOT_DIR / "backups"))
+
+
+def arquivos_de_dados():
+    """Arquivos de dados gravados com checksum: [(caminho, indent usado no formato json)]."""
+    arquivos = [
+        (DATA_DIR / "historico_suspensas.json", 4),
+        (BACKUPS_DIR / "manifesto.json", 4),
+        (DATA_DIR / "historico" / "indice.json", None),
+    ]
+    arquivos += [(caminho, None) for caminho in sorted((DATA_DIR / "historico").glob("alteracoes_*.json"))]
+    return [(caminho, indent) for caminho, indent in arquivos if caminho.exists()]
+
+
+def converter(caminho, formato, indent=4, saida=None):
+    """Converte um arquivo (no lugar, ou para `saida`). Retorna (bytes antes, bytes depois)."""
+    saida = Path(saida) if saida else caminho
+    antes = caminho.stat().st_size
+    gravar_dados(saida, ler_dados(caminho), indent=indent, formato=formato)
+    return antes, saida.stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte os arquivos de dados entre JSON, orjson e msgpack")
+    parser.add_argument("--formato", choices=FORMATOS, default="json", help="Formato de destino (padrão: json)")
+    parser.add_argument("--arquivo", help="Converte só este arquivo (padrão: todos os arquivos de dados)")
+    parser.add_argument("--saida", help="Com --arquivo: grava o resultado aqui em vez de substituir o original")
+    args = parser.parse_args()
+
+    formato = escolher_formato(args.formato)
+    if formato != args.formato:
+        print(f"Formato {args.formato} indisponível (pacote não instalado).", file=sys.stderr)
+        sys.exit(1)
+
+    if args.arquivo:
+        arquivos = [(Path(args.arquivo), 4)]
+    else:
+        if args.saida:
+            parser.error("--saida exige --arquivo")
+        arquivos = arquivos_de_dados()
+
+    total_antes = total_depois = 0
+    falhas = 0
+    for caminho, indent in arquivos:
+        try:
+            antes, depois = converter(caminho, formato, indent, args.saida)
+        except (ArquivoCorrompido, OSError) as e:
+            print(f"✗ {caminho.name}: {e}")
+            falhas += 1
+            continue
+        total_antes += antes
+        total_depois += depois
+        print(f"✓ {caminho.name}: {antes} -> {depois} bytes")
+
+    print(f"{len(arquivos) - falhas} arquivo(s) convertido(s) para {formato}: {total_antes} -> {total_depois} bytes")
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Diário do estado das empresas: uma base completa + deltas por ciclo.
+
+Em vez de cópias completas do estado, cada ciclo acrescenta uma linha com as
+empresas alteradas e removidas (`deltas_<base>.jsonl`). A cada N ciclos uma
+nova base comprimida (`base_<data>.json.gz`) é gravada e inicia um novo
+segmento. Com isso é possível reconstruir o estado em qualquer momento passado
+e responder "qual era o status da empresa X na data D" sem varrer cópias.
+
+Uso pela linha de comando (a partir da pasta Bot_Gerson):
+    python diario_estado.py --listar
+    python diario_estado.py --em "01/10/2026 12:00" --saida estado_2026-10-01.json
+    python diario_estado.py --em "01/10/2026 12:00" --codigo 123
+    python diario_estado.py --codigo 123 --historico
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from arquivos import contabilizar_gravacao, descartar_linha_incompleta, gravar_atomico
+from serializacao import canonico, decodificar, ler_linha_json, linha_json
+
+logger = logging.getLogger(__name__)
+
+FORMATO_DATA = "%Y-%m-%dT%H:%M:%S"
+_FORMATO_ARQUIVO = "%Y%m%dT%H%M%S%f"
+
+
+class DiarioEstado:
+    """
+    Base + deltas do estado das empresas, com reconstrução em qualquer data.
+
+    Args:
+        pasta: Pasta do diário (ex: backups/estado).
+        deltas_por_base: Ciclos registrados antes de gravar uma nova base.
+    """
+
+    def __init__(self, pasta, deltas_por_base=500):
+        self.pasta = Path(pasta)
+        self.deltas_por_base = deltas_por_base
+        self._base_atual = None  # Identificador (data) do segmento em uso
+        self._deltas_no_segmento = 0
+        self._registros_base = None  # Tamanho do estado na base atual (se conhecido)
+
+    # === Segmentos ===
+    def segmentos(self):
+        """Lista [(data da base, caminho da base, caminho dos deltas)], do mais antigo ao mais novo."""
+        segmentos = []
+        for base in sorted(self.pasta.glob("base_*.json.gz")):
+            ident = base.name[len("base_"):-len(".json.gz")]
+            data = datetime.strptime(ident, _FORMATO_ARQUIVO)
+            segmentos.append((data, base, self.pasta / f"deltas_{ident}.jsonl"))
+        return segmentos
+
+    def _carregar_ultimo_segmento(self):
+        segmentos = self.segmentos()
+        if not segmentos:
+            return None
+        data, _, deltas = segmentos[-1]
+        self._base_atual = data.strftime(_FORMATO_ARQUIVO)
+        if deltas.exists() and descartar_linha_incompleta(deltas):
+            logger.warning(f"Última linha de {deltas.name} estava incompleta; descartada")
+        self._deltas_no_segmento = sum(1 for _ in _ler_deltas(deltas))
+        return segmentos[-1]
+
+    # === Escrita ===
+    def nova_base(self, registros, quando=None):
+        """Grava uma base completa (comprimida) e inicia um novo segmento de deltas."""
+        quando = quando or datetime.now()
+        ident = quando.strftime(_FORMATO_ARQUIVO)
+        conteudo = canonico({"data": quando.strftime(FORMATO_DATA), "registros": registros})
+        gravar_atomico(self.pasta / f"base_{ident}.json.gz", gzip.compress(conteudo, mtime=0))
+        self._base_atual = ident
+        self._deltas_no_segmento = 0
+        self._registros_base = len(registros)
+        logger.info(f"Nova base do diário de estado gravada ({len(registros)} registros)")
+
+    def registrar(self, alterados, removidos, carregar_estado, quando=None):
+        """
+        Acrescenta o delta de um ciclo ao segmento atual.
+
+        Args:
+            alterados: dict {codigo: dados} das empresas novas/alteradas.
+            removidos: Códigos removidos.
+            carregar_estado: Função que retorna o estado completo (usada só ao criar uma base).
+        """
+        quando = quando or datetime.now()
+        if self._base_atual is None and self._carregar_ultimo_segmento() is None:
+            # Sem base ainda: o estado atual (já com este ciclo aplicado) é a base
+            self.nova_base(carregar_estado(), quando)
+            return
+
+        linha = linha_json(
+            {"data": quando.strftime(FORMATO_DATA), "alterados": alterados, "removidos": sorted(removidos)}
+        )
+        with open(self.pasta / f"deltas_{self._base_atual}.jsonl", "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        contabilizar_gravacao(len(linha.encode("utf-8")) + 1)
+        self._deltas_no_segmento += 1
+
+        # Nova base a cada N ciclos, ou quando um único delta já é do tamanho de meia base
+        delta_grande = self._registros_base is not None and len(alterados) + len(removidos) > self._registros_base // 2
+        if self._deltas_no_segmento >= self.deltas_por_base or delta_grande:
+            self.nova_base(carregar_estado(), quando)
+
+    # === Leitura ===
+    def _segmento_em(self, quando):
+        """Último segmento cuja base é anterior ou igual a `quando`."""
+        escolhido = None
+        for segmento in self.segmentos():
+            if segmento[0] <= quando:
+                escolhido = segmento
+        return escolhido
+
+    def estado_em(self, quando=None):
+        """Reconstrói o estado {codigo: dados} em `quando` (padrão: o mais recente). None se não houver dados."""
+        quando = quando or datetime.now()
+        segmento = self._segmento_em(quando)
+        if segmento is None:
+            return None
+        _, base, deltas = segmento
+        registros = _ler_base(base)["registros"]
+        limite = quando.strftime(FORMATO_DATA)
+        for delta in _ler_deltas(deltas):
+            if delta["data"] > limite:
+                break
+            registros.update(delta["alterados"])
+            for codigo in delta["removidos"]:
+                registros.pop(codigo, None)
+        return registros
+
+    def empresa_em(self, codigo, quando=None):
+        """Dados da empresa em `quando` (None se não existia)."""
+        estado = self.estado_em(quando)
+        return None if estado is None else estado.get(codigo)
+
+    def historico_empresa(self, codigo):
+        """Lista [(data, dados ou None)] com cada mudança registrada da empresa, da mais antiga à mais nova."""
+        eventos = []
+        anterior = object()
+        for _, base, deltas in self.segmentos():
+            dados_base = _ler_base(base)
+            atual = dados_base["registros"].get(codigo)
+            if atual != anterior:
+                eventos.append((dados_base["data"], atual))
+                anterior = atual
+            for delta in _ler_deltas(deltas):
+                if codigo in delta["alterados"]:
+                    atual = delta["alterados"][codigo]
+                elif codigo in delta["removidos"]:
+                    atual = None
+                else:
+                    continue
+                if atual != anterior:
+                    eventos.append((delta["data"], atual))
+                    anterior = atual
+        return eventos
+
+    def conferir(self, registros):
+        """Garante que o diário reflete `registros` (estado atual); se divergir, grava uma nova base."""
+        if self.estado_em() != registros:
+            logger.warning("Diário de estado divergente do estado atual; gravando nova base")
+            self.nova_base(registros)
+            return False
+        self._carregar_ultimo_segmento()
+        self._registros_base = len(registros)
+        return True
+
+
+def _ler_base(caminho):
+    return decodificar(gzip.decompress(Path(caminho).read_bytes()))
+
+
+def _ler_deltas(caminho):
+    """Percorre as linhas de deltas, ignorando uma última linha truncada."""
+    if not Path(caminho).exists():
+        return
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            try:
+                yield ler_linha_json(linha)
+            except json.JSONDecodeError:
+                logger.warning(f"Linha inválida/truncada ignorada em {Path(caminho).name}")
+
+
+def _interpretar_data(texto):
+    for formato in ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            data = datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+        # Só a data: considera o fim do dia
+        return data.replace(hour=23, minute=59, second=59) if len(texto) <= 10 else data
+    raise argparse.ArgumentTypeError(f"data inválida: {texto} (use DD/MM/AAAA [HH:MM])")
+
+
+def main():
+    bot_dir = Path(__file__).parent.resolve()
+    pasta_padrao = Path(os.getenv("GERSON_BACKUPS_DIR", bot_dir / "backups")) / "estado"
+
+    parser = argparse.ArgumentParser(description="Reconstrói o estado das empresas em uma data passada")
+    parser.add_argument("--pasta", default=str(pasta_padrao), help="Pasta do diário de estado")
+    parser.add_argument("--em", type=_interpretar_data, help="Data/hora (DD/MM/AAAA [HH:MM]); padrão: agora")
+    parser.add_argument("--codigo", help="Mostra apenas a empresa com este código")
+    parser.add_argument("--historico", action="store_true", help="Com --codigo: lista todas as mudanças da empresa")
+    parser.add_argument("--listar", action="store_true", help="Lista as bases e a quantidade de deltas")
+    parser.add_argument("--saida", help="Grava o estado reconstruído neste arquivo JSON")
+    args = parser.parse_args()
+
+    diario = DiarioEstado(args.pasta)
+
+    if args.listar:
+        for data, base, deltas in diario.segmentos():
+            total = sum(1 for _ in _ler_deltas(deltas))
+            print(f"{data.strftime('%d/%m/%Y %H:%M:%S')}  base {base.stat().st_size:>10} bytes  {total:>5} deltas")
+        return
+
+    if args.codigo and args.historico:
+        for data, dados in diario.historico_empresa(args.codigo):
+            descricao = "não existe na planilha" if dados is None else f"{dados['status']} / {dados['regime_tributario'] or '-'} ({dados['nome']})"
+            print(f"{data}  {descricao}")
+        return
+
+    estado = diario.estado_em(args.em)
+    if estado is None:
+        print("Nenhum dado do diário para a data informada.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.codigo:
+        print(json.dumps(estado.get(args.codigo), indent=4, ensure_ascii=False))
+    elif args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(estado, f, indent=4, ensure_ascii=False)
+        print(f"Estado com {len(estado)} registros gravado em {args.saida}")
+    else:
+        print(f"{len(estado)} registros. Use --saida para gravar o estado ou --codigo para uma empresa.")
+
+
+if __name__ == "__main__":
+    main()
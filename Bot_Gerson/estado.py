@@ -0,0 +1,177 @@
+"""
+Armazenamento do estado das empresas do Bot_Gerson em SQLite (modo WAL).
+
+Substitui o antigo `estado_empresas.json`, que era regravado por inteiro a cada
+ciclo. Cada ciclo grava apenas as empresas alteradas/removidas, numa única
+transação. O JSON antigo é importado automaticamente na primeira execução.
+"""
+
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from arquivos import ArquivoCorrompido, ler_dados
+
+logger = logging.getLogger(__name__)
+
+NOME_BACKUP = "estado_empresas.json"  # Nome das versões antigas do estado no repositório de backups
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS empresas (
+    codigo TEXT PRIMARY KEY,
+    nome TEXT NOT NULL,
+    status TEXT NOT NULL,
+    regime_tributario TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+
+class EstadoEmpresas:
+    """
+    Estado persistido das empresas (código -> nome, status e regime tributário).
+
+    A conexão é aberta sob demanda e pode ser usada a partir de threads
+    (asyncio.to_thread); um lock serializa os acessos.
+
+    Args:
+        caminho: Arquivo do banco SQLite (ex: data/estado_empresas.db).
+    """
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._conexao = None
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        if self._conexao is None:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.executescript(_ESQUEMA)
+            self._conexao = conexao
+        return self._conexao
+
+    def verificar(self):
+        """Executa `PRAGMA quick_check`; retorna False se o banco estiver corrompido/ilegível."""
+        try:
+            with self._lock:
+                resultado = self._conectar().execute("PRAGMA quick_check").fetchone()
+            return resultado is not None and resultado[0] == "ok"
+        except sqlite3.DatabaseError as e:
+            logger.error(f"Banco de estado ilegível ({self.caminho.name}): {e}")
+            return False
+
+    def recriar(self, registros):
+        """Recria o banco do zero com `registros` (o banco atual é preservado como *.corrompido)."""
+        self.fechar()
+        for sufixo in ("", "-wal", "-shm"):
+            arquivo = self.caminho.with_name(self.caminho.name + sufixo)
+            if arquivo.exists():
+                arquivo.replace(arquivo.with_name(arquivo.name + ".corrompido"))
+        self.aplicar(registros)
+
+    def fechar(self):
+        with self._lock:
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+    def total(self):
+        with self._lock:
+            return self._conectar().execute("SELECT COUNT(*) FROM empresas").fetchone()[0]
+
+    def ultima_verificacao(self):
+        with self._lock:
+            linha = self._conectar().execute(
+                "SELECT valor FROM meta WHERE chave = 'ultima_verificacao'"
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def iterar(self):
+        """Percorre as empresas salvas via cursor, sem montar uma lista intermediária."""
+        with self._lock:
+            cursor = self._conectar().execute(
+                "SELECT codigo, nome, status, regime_tributario FROM empresas"
+            )
+            for codigo, nome, status, regime in cursor:
+                yield codigo, {"nome": nome, "status": status, "regime_tributario": regime}
+
+    def carregar(self):
+        """Retorna o estado completo como dict {codigo: {nome, status, regime_tributario}}."""
+        return dict(self.iterar())
+
+    def aplicar(self, alterados, removidos=()):
+        """
+        Grava as empresas alteradas e apaga as removidas numa única transação.
+
+        Args:
+            alterados: dict {codigo: {nome, status, regime_tributario}}.
+            removidos: Códigos que não existem mais na planilha.
+        """
+        agora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        with self._lock:
+            conexao = self._conectar()
+            with conexao:
+                conexao.executemany(
+                    "INSERT INTO empresas (codigo, nome, status, regime_tributario) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(codigo) DO UPDATE SET nome = excluded.nome, status = excluded.status, "
+                    "regime_tributario = excluded.regime_tributario",
+                    (
+                        (codigo, dados.get("nome", ""), dados.get("status", ""), dados.get("regime_tributario", ""))
+                        for codigo, dados in alterados.items()
+                    ),
+                )
+                conexao.executemany("DELETE FROM empresas WHERE codigo = ?", ((codigo,) for codigo in removidos))
+                conexao.execute(
+                    "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('ultima_verificacao', ?)", (agora,)
+                )
+        return agora
+
+    def limpar(self):
+        """Apaga todas as empresas (usado pelo reset de estado)."""
+        with self._lock:
+            conexao = self._conectar()
+            with conexao:
+                conexao.execute("DELETE FROM empresas")
+                conexao.execute("DELETE FROM meta")
+
+    def migrar_json(self, caminho_json):
+        """
+        Importa o antigo estado_empresas.json (uma única vez) se o banco estiver vazio.
+
+        Após a importação o arquivo é renomeado para *.json.migrado. Retorna a
+        quantidade de registros importados (0 se nada foi feito). Se o JSON
+        estiver corrompido, ele é renomeado para *.json.corrompido e
+        ArquivoCorrompido é levantado.
+        """
+        caminho_json = Path(caminho_json)
+        if not caminho_json.exists() or self.total() > 0:
+            return 0
+
+        try:
+            dados = ler_dados(caminho_json)
+        except ArquivoCorrompido:
+            caminho_json.replace(caminho_json.with_name(caminho_json.name + ".corrompido"))
+            raise
+        registros = dados.get("registros", {})
+        self.aplicar(registros)
+
+        if dados.get("ultima_verificacao"):
+            with self._lock:
+                conexao = self._conectar()
+                with conexao:
+                    conexao.execute(
+                        "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('ultima_verificacao', ?)",
+                        (dados["ultima_verificacao"],),
+                    )
+
+        caminho_json.rename(caminho_json.with_name(caminho_json.name + ".migrado"))
+        logger.info(f"Estado migrado de {caminho_json.name} para {self.caminho.name} ({len(registros)} registros)")
+        return len(registros)
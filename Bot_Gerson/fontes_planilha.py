@@ -0,0 +1,185 @@
+"""
+Fontes de dados da planilha de empresas do Bot_Gerson.
+
+`FontePlanilha` é a interface usada pelo bot para conectar, ler faixas de
+colunas e obter um marcador barato de revisão. Há duas implementações:
+
+- FonteGspread: a planilha real no Google Sheets (produção).
+- FonteArquivoLocal: um CSV/XLSX local, com latência e mutações simuladas,
+  para rodar o monitor offline contra planilhas sintéticas grandes.
+"""
+
+import csv
+import logging
+import random
+import time
+from pathlib import Path
+
+from planilha import coluna_para_indice
+
+logger = logging.getLogger(__name__)
+
+
+class FontePlanilha:
+    """Interface de fonte da planilha. Todos os métodos são síncronos (use asyncio.to_thread)."""
+
+    descricao = "fonte"
+
+    def conectar(self):
+        """Abre (ou reabre) a conexão com a fonte."""
+        raise NotImplementedError
+
+    def batch_get(self, ranges):
+        """Retorna, para cada faixa A1 de colunas (ex: "A:D"), a lista de linhas da faixa."""
+        raise NotImplementedError
+
+    def marcador_revisao(self):
+        """Retorna um marcador que muda quando a planilha é alterada (None se indisponível)."""
+        return None
+
+
+class FonteGspread(FontePlanilha):
+    """Planilha do Google Sheets acessada via gspread (primeira aba)."""
+
+    def __init__(self, caminho_credenciais, sheet_id, scopes):
+        self.caminho_credenciais = caminho_credenciais
+        self.sheet_id = sheet_id
+        self.scopes = scopes
+        self.worksheet = None
+        self.descricao = f"Google Sheets ({sheet_id})"
+
+    def conectar(self):
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        gc = gspread.authorize(
+            Credentials.from_service_account_file(self.caminho_credenciais, scopes=self.scopes)
+        )
+        self.worksheet = gc.open_by_key(self.sheet_id).sheet1
+        return self
+
+    def batch_get(self, ranges):
+        return self.worksheet.batch_get(ranges)
+
+    def marcador_revisao(self):
+        planilha = self.worksheet.spreadsheet
+        # gspread >= 6 expõe get_lastUpdateTime(); versões 5.x usam a propriedade
+        get_last = getattr(planilha, "get_lastUpdateTime", None)
+        return get_last() if callable(get_last) else planilha.lastUpdateTime
+
+
+# Status usados nas mutações simuladas da fonte local
+STATUS_SIMULADOS = ["ATIVA", "ATIVO", "INATIVA", "BAIXA", "DEVOLVIDA", "SUSPENSA", "SUSPENSA RFB"]
+REGIMES_SIMULADOS = ["SN", "SIMPLES NACIONAL", "LP", "LUCRO PRESUMIDO", "LR", "MEI", "ISENTO", ""]
+
+
+class FonteArquivoLocal(FontePlanilha):
+    """
+    Planilha local (CSV ou XLSX) carregada em memória.
+
+    Args:
+        caminho: Arquivo .csv ou .xlsx com cabeçalho na primeira linha.
+        latencia: Segundos de espera simulados em cada leitura.
+        taxa_mutacao: Fração das linhas cujo status/regime é alterado a cada leitura (0 = sem mutações).
+        semente: Semente do gerador aleatório, para execuções reproduzíveis.
+    """
+
+    def __init__(self, caminho, latencia=0.0, taxa_mutacao=0.0, semente=None):
+        self.caminho = Path(caminho)
+        self.latencia = latencia
+        self.taxa_mutacao = taxa_mutacao
+        self._random = random.Random(semente)
+        self.linhas = []
+        self.revisao = 0
+        self.mutacoes_aplicadas = 0
+        self._assinatura = None  # (mtime, tamanho) do arquivo carregado
+        self.descricao = f"Arquivo local ({self.caminho.name})"
+
+    def conectar(self):
+        self._carregar()
+        return self
+
+    def _carregar(self):
+        if self.caminho.suffix.lower() in (".xlsx", ".xlsm"):
+            try:
+                from openpyxl import load_workbook
+            except ImportError:
+                raise ImportError("openpyxl não instalado. Instale com: pip install openpyxl")
+            wb = load_workbook(self.caminho, read_only=True, data_only=True)
+            self.linhas = [
+                ["" if v is None else str(v) for v in row]
+                for row in wb.worksheets[0].iter_rows(values_only=True)
+            ]
+            wb.close()
+        else:
+            with open(self.caminho, "r", encoding="utf-8", newline="") as f:
+                self.linhas = [row for row in csv.reader(f)]
+
+        self._assinatura = self._obter_assinatura()
+        self.revisao += 1
+        logger.info(f"Planilha local carregada: {self.caminho} ({len(self.linhas)} linhas)")
+
+    def _obter_assinatura(self):
+        info = self.caminho.stat()
+        return info.st_mtime_ns, info.st_size
+
+    def _aplicar_mutacoes(self):
+        """Altera status/regime de uma fração das linhas, simulando edições na planilha."""
+        total = len(self.linhas) - 1
+        quantidade = int(total * self.taxa_mutacao)
+        if quantidade <= 0:
+            return
+        for idx in self._random.sample(range(1, len(self.linhas)), quantidade):
+            row = self.linhas[idx]
+            while len(row) < 4:
+                row.append("")
+            if self._random.random() < 0.8:
+                row[2] = self._random.choice(STATUS_SIMULADOS)
+            else:
+                row[3] = self._random.choice(REGIMES_SIMULADOS)
+        self.mutacoes_aplicadas += quantidade
+        self.revisao += 1
+
+    def batch_get(self, ranges):
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        # Recarrega se o arquivo foi editado em disco
+        if self._obter_assinatura() != self._assinatura:
+            self._carregar()
+
+        if self.taxa_mutacao:
+            self._aplicar_mutacoes()
+
+        blocos = []
+        for faixa in ranges:
+            inicio, _, fim = faixa.partition(":")
+            ini = coluna_para_indice(inicio) - 1
+            fim = coluna_para_indice(fim or inicio)
+            blocos.append([row[ini:fim] for row in self.linhas])
+        return blocos
+
+    def marcador_revisao(self):
+        # Consulta o arquivo a cada chamada: uma edição em disco muda o marcador antes da
+        # leitura. O contador de mutações cobre as alterações simuladas, que só existem em memória
+        return (*self._obter_assinatura(), self.mutacoes_aplicadas)
+
+
+def gerar_planilha_sintetica(caminho, total_linhas, semente=None):
+    """Gera um CSV sintético (cabeçalho + total_linhas empresas) no formato da planilha real."""
+    rnd = random.Random(semente)
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["CÓDIGO", "EMPRESA", "STATUS", "REGIME", "RESPONSÁVEL", "OBSERVAÇÕES"])
+        for i in range(1, total_linhas + 1):
+            writer.writerow([
+                str(i),
+                f"EMPRESA SINTETICA {i} LTDA",
+                rnd.choice(STATUS_SIMULADOS),
+                rnd.choice(REGIMES_SIMULADOS),
+                f"ANALISTA {i % 17}",
+                "",
+            ])
+    return caminho
@@ -0,0 +1,482 @@
+"""
+Histórico de alterações do Bot_Gerson em log append-only.
+
+Cada alteração vira uma linha JSON em `alteracoes.jsonl` (custo proporcional à
+alteração, não ao histórico). O fsync é feito em lote, uma vez por ciclo, e o
+log é compactado periodicamente em um arquivo por competência
+(`alteracoes_YYYY-MM.json`), no mesmo formato usado em memória pelo bot.
+
+Na inicialização só o índice (`indice.json`, com as estatísticas de cada
+competência) é lido; as alterações de uma competência são carregadas quando um
+relatório as pede e mantidas num cache LRU, então a memória não cresce com os anos.
+"""
+
+import heapq
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from arquivos import (
+    ArquivoCorrompido, carregar_dados, contabilizar_gravacao, descartar_linha_incompleta,
+    gravar_atomico, gravar_dados, ler_dados, serializar_dados,
+)
+from serializacao import ler_linha_json, linha_json
+
+logger = logging.getLogger(__name__)
+
+MESES = (
+    "JANEIRO", "FEVEREIRO", "MARÇO", "ABRIL", "MAIO", "JUNHO",
+    "JULHO", "AGOSTO", "SETEMBRO", "OUTUBRO", "NOVEMBRO", "DEZEMBRO",
+)
+
+
+def nova_competencia():
+    """Estrutura vazia de uma competência do histórico."""
+    return {
+        "alteracoes": [],
+        "estatisticas": {
+            "total_alteracoes": 0,
+            "alteracoes_status": 0,
+            "alteracoes_regime": 0
+        }
+    }
+
+
+def adicionar_alteracao(dados, alteracao):
+    """Acrescenta a alteração aos dados de uma competência e atualiza as estatísticas."""
+    dados["alteracoes"].append(alteracao)
+    _contabilizar(dados["estatisticas"], alteracao)
+
+
+def _contabilizar(estatisticas, alteracao):
+    estatisticas["total_alteracoes"] += 1
+    if alteracao["tipo"] == "status":
+        estatisticas["alteracoes_status"] += 1
+    elif alteracao["tipo"] == "regime_tributario":
+        estatisticas["alteracoes_regime"] += 1
+
+
+def _contar_empresa(empresas, codigo, nome, quantidade=1):
+    """Soma alterações de uma empresa no agregado {codigo: {nome, alteracoes}} (mantém o primeiro nome visto)."""
+    if codigo not in empresas:
+        empresas[codigo] = {"nome": nome, "alteracoes": 0}
+    empresas[codigo]["alteracoes"] += quantidade
+
+
+def agrupar_por_empresa(alteracoes):
+    """Agrupa a lista de alterações por empresa: {codigo: {nome, alteracoes: [...]}} (para os relatórios detalhados)."""
+    empresas = {}
+    for alt in alteracoes:
+        if alt["codigo"] not in empresas:
+            empresas[alt["codigo"]] = {"nome": alt["nome"], "alteracoes": []}
+        empresas[alt["codigo"]]["alteracoes"].append(alt)
+    return empresas
+
+
+def entrada_indice(dados, ultimo_seq):
+    """Entrada do índice de uma competência: estatísticas, último seq e alterações por empresa."""
+    empresas = {}
+    for alt in dados["alteracoes"]:
+        _contar_empresa(empresas, alt["codigo"], alt["nome"])
+    return {"estatisticas": dados["estatisticas"], "ultimo_seq": ultimo_seq, "empresas": empresas}
+
+
+@lru_cache(maxsize=None)
+def nome_competencia(competencia, abreviado=False):
+    """"2025-03" -> "MARÇO/2025" (ou "MAR", abreviado). Calculado uma única vez por competência."""
+    ano, mes = competencia.split("-")
+    nome = MESES[int(mes) - 1]
+    return nome[:3] if abreviado else f"{nome}/{ano}"
+
+
+class HistoricoAlteracoes:
+    """
+    Histórico {competencia: {...}} com as listas de alterações carregadas sob demanda.
+
+    Só o índice (estatísticas, último seq e alterações por empresa de cada
+    competência) fica sempre em memória. As alterações de uma competência são
+    lidas do seu arquivo quando pedidas e mantidas num cache LRU; competências
+    com alterações ainda não compactadas ficam fixas em memória até a próxima
+    compactação.
+
+    Os agregados (por mês, por ano, por empresa e o top de empresas) são
+    atualizados a cada alteração, então os resumos dos relatórios não precisam
+    percorrer as alterações.
+
+    Args:
+        ler_competencia: Função competencia -> (dados, ultimo_seq) que lê o arquivo.
+        limite_cache: Competências mantidas no cache (além das fixas).
+    """
+
+    def __init__(self, ler_competencia, limite_cache=6):
+        self._ler_competencia = ler_competencia
+        self.limite_cache = limite_cache
+        self.indice = {}  # competencia -> {"estatisticas": {...}, "ultimo_seq": n, "empresas": {...}}
+        self._cache = OrderedDict()  # competencia -> dados (LRU)
+        self._fixas = {}  # competencia -> dados com alterações pendentes de compactação
+        self._anos = {}  # ano -> agregado do ano (montado na primeira consulta, depois incremental)
+
+    def definir_indice(self, indice):
+        self.indice = indice
+        self._anos = {}
+
+    def __contains__(self, competencia):
+        return competencia in self.indice
+
+    def __iter__(self):
+        return iter(self.indice)
+
+    def __len__(self):
+        return len(self.indice)
+
+    def keys(self):
+        return self.indice.keys()
+
+    def estatisticas(self, competencia):
+        """Estatísticas da competência, sem carregar as alterações."""
+        return self.indice[competencia]["estatisticas"]
+
+    def ultimo_seq(self, competencia):
+        return self.indice[competencia]["ultimo_seq"] if competencia in self.indice else 0
+
+    # === Agregados ===
+    def empresas(self, competencia):
+        """Alterações por empresa na competência: {codigo: {nome, alteracoes}}, na ordem da primeira alteração."""
+        return self.indice[competencia]["empresas"]
+
+    def competencias_do_ano(self, ano):
+        return sorted(c for c in self.indice if c.startswith(f"{ano}-"))
+
+    def resumo_ano(self, ano):
+        """Agregado do ano: {estatisticas, empresas} somando as competências (sem ler as alterações)."""
+        ano = str(ano)
+        if ano not in self._anos:
+            resumo = {"estatisticas": dict.fromkeys(nova_competencia()["estatisticas"], 0), "empresas": {}}
+            for competencia in self.competencias_do_ano(ano):
+                entrada = self.indice[competencia]
+                for chave, valor in entrada["estatisticas"].items():
+                    resumo["estatisticas"][chave] += valor
+                for codigo, empresa in entrada["empresas"].items():
+                    _contar_empresa(resumo["empresas"], codigo, empresa["nome"], empresa["alteracoes"])
+            self._anos[ano] = resumo
+        return self._anos[ano]
+
+    def top_empresas(self, ano, n=10):
+        """As `n` empresas com mais alterações no ano: [(codigo, {nome, alteracoes})]."""
+        empresas = self.resumo_ano(ano)["empresas"]
+        return heapq.nlargest(n, empresas.items(), key=lambda item: item[1]["alteracoes"])
+
+    def __getitem__(self, competencia):
+        """Dados completos da competência ({alteracoes, estatisticas}), lidos do arquivo se preciso."""
+        if competencia in self._fixas:
+            return self._fixas[competencia]
+        if competencia in self._cache:
+            self._cache.move_to_end(competencia)
+            return self._cache[competencia]
+        if competencia not in self.indice:
+            raise KeyError(competencia)
+        dados = self._carregar(competencia)
+        self._guardar_no_cache(competencia, dados)
+        return dados
+
+    def _carregar(self, competencia):
+        dados, ultimo_seq = self._ler_competencia(competencia)
+        # O arquivo é a fonte da verdade: corrige o índice (e o agregado do ano) se estiver defasado
+        self.indice[competencia] = entrada_indice(dados, ultimo_seq)
+        self._anos.pop(competencia[:4], None)
+        return dados
+
+    def _guardar_no_cache(self, competencia, dados):
+        self._cache[competencia] = dados
+        while len(self._cache) > self.limite_cache:
+            self._cache.popitem(last=False)
+
+    def fixar(self, competencia):
+        """Mantém a competência em memória (criando-a se preciso) até a próxima compactação."""
+        if competencia in self._fixas:
+            return self._fixas[competencia]
+        dados = self._cache.pop(competencia, None)
+        if dados is None and competencia in self.indice:
+            try:
+                dados = self._carregar(competencia)
+            except ArquivoCorrompido as e:
+                logger.error(f"Competência {competencia} sem arquivo válido; recomeçando vazia: {e}")
+        if dados is None:
+            dados = nova_competencia()
+            self.indice[competencia] = entrada_indice(dados, 0)
+            self._anos.pop(competencia[:4], None)
+        self._fixas[competencia] = dados
+        return dados
+
+    def adicionar(self, competencia, alteracao):
+        """Acrescenta a alteração à competência (criando-a se preciso) e atualiza os agregados."""
+        adicionar_alteracao(self.fixar(competencia), alteracao)
+        _contar_empresa(self.indice[competencia]["empresas"], alteracao["codigo"], alteracao["nome"])
+
+        resumo = self._anos.get(competencia[:4])
+        if resumo is not None:
+            _contabilizar(resumo["estatisticas"], alteracao)
+            _contar_empresa(resumo["empresas"], alteracao["codigo"], alteracao["nome"])
+
+    def pendentes(self):
+        """Competências fixas em memória: [(competencia, dados)]."""
+        return list(self._fixas.items())
+
+    def liberar(self, competencia, ultimo_seq):
+        """Após a compactação: registra o seq gravado e devolve a competência ao cache LRU."""
+        dados = self._fixas.pop(competencia, None)
+        if competencia in self.indice:
+            self.indice[competencia]["ultimo_seq"] = ultimo_seq
+        if dados is not None:
+            self._guardar_no_cache(competencia, dados)
+
+
+class Compactacao:
+    """Retrato do histórico tirado no loop de eventos para a compactação gravada em thread."""
+
+    __slots__ = ("seq", "linhas", "competencias", "arquivos", "indice")
+
+    def __init__(self, seq, linhas, competencias, arquivos, indice):
+        self.seq = seq  # Último seq incluído nos arquivos
+        self.linhas = linhas  # Linhas do log absorvidas
+        self.competencias = competencias  # Competências com linhas no log absorvidas
+        self.arquivos = arquivos  # [(competencia, conteúdo serializado)]
+        self.indice = indice  # Conteúdo serializado do índice
+
+
+class LogAlteracoes:
+    """
+    Log append-only do histórico de alterações, com compactação por competência.
+
+    Args:
+        diretorio: Pasta do histórico (ex: data/historico).
+        limite_linhas: Linhas no log que disparam a compactação.
+        backups: RepositorioBackups para guardar cada competência compactada (opcional).
+        limite_cache: Competências mantidas em memória pelo histórico (LRU).
+    """
+
+    NOME_LOG = "alteracoes.jsonl"
+    NOME_INDICE = "indice.json"
+
+    def __init__(self, diretorio, limite_linhas=5000, backups=None, limite_cache=6):
+        self.diretorio = Path(diretorio)
+        self.backups = backups
+        self.caminho_log = self.diretorio / self.NOME_LOG
+        self.caminho_indice = self.diretorio / self.NOME_INDICE
+        self.limite_linhas = limite_linhas
+        self.historico = HistoricoAlteracoes(self._ler_competencia, limite_cache=limite_cache)
+        self.seq = 0  # Último número de sequência gravado
+        self.linhas_log = 0  # Linhas no log ainda não compactadas
+        self.competencias_log = set()  # Competências com linhas no log
+        self._arquivo = None
+        self._pendente_fsync = False
+        self._lock = threading.Lock()  # `sincronizar` e a gravação da compactação rodam em thread
+
+    def _caminho_competencia(self, competencia):
+        return self.diretorio / f"alteracoes_{competencia}.json"
+
+    # === Leitura ===
+    def carregar(self, caminho_legado=None):
+        """
+        Carrega o índice de competências e reaplica o log; retorna o HistoricoAlteracoes.
+
+        As alterações de cada competência só são lidas quando pedidas. Se
+        `caminho_legado` (o antigo historico_alteracoes.json) existir, ele é
+        importado uma única vez e renomeado para *.json.migrado.
+        """
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+
+        if caminho_legado is not None and Path(caminho_legado).exists():
+            self._migrar_legado(Path(caminho_legado))
+
+        indice_alterado = self._carregar_indice()
+        self.seq = max((entrada["ultimo_seq"] for entrada in self.historico.indice.values()), default=0)
+
+        # Reaplica o log, ignorando linhas já compactadas e uma última linha truncada
+        if self.caminho_log.exists():
+            if descartar_linha_incompleta(self.caminho_log):
+                logger.warning("Última linha do log de alterações estava incompleta; descartada")
+            with open(self.caminho_log, "r", encoding="utf-8") as f:
+                for numero, linha in enumerate(f, 1):
+                    try:
+                        registro = ler_linha_json(linha)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Linha {numero} do log de alterações inválida/truncada; ignorada")
+                        continue
+                    seq, competencia = registro["seq"], registro["competencia"]
+                    self.seq = max(self.seq, seq)
+                    self.linhas_log += 1
+                    self.competencias_log.add(competencia)
+                    # Fixar lê o arquivo da competência, cujo ultimo_seq prevalece sobre o do índice
+                    self.historico.fixar(competencia)
+                    if seq <= self.historico.ultimo_seq(competencia):
+                        continue
+                    self.historico.adicionar(competencia, registro["alteracao"])
+
+        if indice_alterado:
+            self._gravar_indice()
+        return self.historico
+
+    def _carregar_indice(self):
+        """
+        Lê o índice e o confere com os arquivos de competência existentes.
+
+        Competências sem entrada no índice (ou com índice ilegível) são lidas uma
+        vez para reconstruí-lo. Retorna True se o índice precisou ser corrigido.
+        """
+        indice = {}
+        if self.caminho_indice.exists():
+            try:
+                indice = ler_dados(self.caminho_indice)["competencias"]
+            except (ArquivoCorrompido, KeyError) as e:
+                logger.error(f"Índice do histórico inválido ({e}); reconstruindo a partir das competências")
+
+        # Entradas de versões anteriores do índice (sem o agregado por empresa) também são refeitas
+        indice = {competencia: entrada for competencia, entrada in indice.items() if "empresas" in entrada}
+        arquivos = {caminho.stem.split("_", 1)[1] for caminho in self.diretorio.glob("alteracoes_*.json")}
+        alterado = set(indice) != arquivos
+        validas = {competencia: indice[competencia] for competencia in arquivos if competencia in indice}
+        for competencia in sorted(arquivos - set(indice)):
+            try:
+                dados, ultimo_seq = self._ler_competencia(competencia)
+            except ArquivoCorrompido as e:
+                logger.error(f"Competência {competencia} ignorada (sem backup válido): {e}")
+                continue
+            validas[competencia] = entrada_indice(dados, ultimo_seq)
+        self.historico.definir_indice(dict(sorted(validas.items())))
+        if alterado:
+            logger.info(f"Índice do histórico reconstruído ({len(self.historico)} competências)")
+        return alterado
+
+    def _ler_competencia(self, competencia):
+        """Lê o arquivo de uma competência: (dados, ultimo_seq). Levanta ArquivoCorrompido."""
+        caminho = self._caminho_competencia(competencia)
+        # Checksum inválido: usa o backup válido mais recente da competência
+        dados, origem = carregar_dados(caminho, self.backups)
+        if origem is None:
+            raise ArquivoCorrompido(f"{caminho.name}: arquivo não encontrado")
+        ultimo_seq = dados.pop("ultimo_seq", 0)
+        return dados, ultimo_seq
+
+    def _migrar_legado(self, caminho_legado):
+        with open(caminho_legado, "r", encoding="utf-8") as f:
+            legado = json.load(f)
+        for competencia, dados in legado.items():
+            self._gravar_competencia(competencia, dados, self.seq)
+        caminho_legado.rename(caminho_legado.with_name(caminho_legado.name + ".migrado"))
+        logger.info(f"Histórico migrado de {caminho_legado.name} ({len(legado)} competências)")
+
+    # === Escrita ===
+    def acrescentar(self, competencia, alteracao):
+        """Acrescenta uma alteração ao log (sem fsync; veja `sincronizar`)."""
+        with self._lock:
+            if self._arquivo is None:
+                self.diretorio.mkdir(parents=True, exist_ok=True)
+                self._arquivo = open(self.caminho_log, "a", encoding="utf-8")
+            self.seq += 1
+            registro = {"seq": self.seq, "competencia": competencia, "alteracao": alteracao}
+            linha = linha_json(registro) + "\n"
+            self._arquivo.write(linha)
+            self._arquivo.flush()
+            contabilizar_gravacao(len(linha.encode("utf-8")))
+            self.linhas_log += 1
+            self.competencias_log.add(competencia)
+            self._pendente_fsync = True
+
+    def sincronizar(self):
+        """Garante em disco (fsync) todas as linhas acrescentadas desde a última chamada."""
+        with self._lock:
+            self._sincronizar()
+
+    def _sincronizar(self):
+        if self._arquivo is not None and self._pendente_fsync:
+            os.fsync(self._arquivo.fileno())
+            self._pendente_fsync = False
+
+    def precisa_compactar(self, agora=None):
+        """Compacta quando o log passa do limite ou contém competências já encerradas."""
+        if not self.linhas_log:
+            return False
+        competencia_atual = (agora or datetime.now()).strftime("%Y-%m")
+        return self.linhas_log >= self.limite_linhas or any(c != competencia_atual for c in self.competencias_log)
+
+    def preparar_compactacao(self):
+        """
+        Roda no loop de eventos: serializa as competências pendentes e o índice.
+
+        Nada é alterado no histórico em memória; as competências só voltam ao
+        cache LRU em `concluir_compactacao`, depois que os arquivos forem gravados.
+        """
+        seq = self.seq
+        arquivos = []
+        indice = dict(self.historico.indice)
+        for competencia, dados in sorted(self.historico.pendentes()):
+            arquivos.append((competencia, serializar_dados({**dados, "ultimo_seq": seq}, indent=None)))
+            indice[competencia] = {**indice[competencia], "ultimo_seq": seq}
+        compactacao = Compactacao(
+            seq, self.linhas_log, self.competencias_log, arquivos,
+            serializar_dados({"competencias": indice}, indent=None),
+        )
+        # Competências que receberem alterações durante a gravação continuam fixas
+        self.competencias_log = set()
+        return compactacao
+
+    def gravar_compactacao(self, compactacao):
+        """Roda em thread: grava as competências e o índice e tira do log as linhas incluídas neles."""
+        for competencia, conteudo in compactacao.arquivos:
+            caminho = self._caminho_competencia(competencia)
+            gravar_atomico(caminho, conteudo)
+            if self.backups is not None:
+                self.backups.salvar(caminho.name, conteudo)
+        gravar_atomico(self.caminho_indice, compactacao.indice)
+
+        # Os arquivos de competência registram `ultimo_seq`, então uma queda antes
+        # do truncamento apenas faz o log ser ignorado na próxima carga
+        with self._lock:
+            if self._arquivo is not None:
+                self._sincronizar()
+                self._arquivo.close()
+                self._arquivo = None
+            if self.seq == compactacao.seq:
+                open(self.caminho_log, "w", encoding="utf-8").close()
+            else:
+                # Linhas acrescentadas depois da preparação continuam no log
+                with open(self.caminho_log, "r", encoding="utf-8") as f:
+                    restantes = [linha for linha in f if ler_linha_json(linha)["seq"] > compactacao.seq]
+                gravar_atomico(self.caminho_log, "".join(restantes))
+
+    def concluir_compactacao(self, compactacao):
+        """Roda no loop de eventos após `gravar_compactacao`: devolve as competências gravadas ao cache."""
+        for competencia, _ in compactacao.arquivos:
+            if competencia not in self.competencias_log:
+                self.historico.liberar(competencia, compactacao.seq)
+        self.linhas_log -= compactacao.linhas
+        logger.info(
+            f"Log de alterações compactado ({compactacao.linhas} linhas, "
+            f"competências: {', '.join(sorted(compactacao.competencias))})"
+        )
+
+    def cancelar_compactacao(self, compactacao):
+        """A gravação falhou: as linhas continuam no log e a compactação será tentada de novo."""
+        self.competencias_log |= compactacao.competencias
+
+    def _gravar_competencia(self, competencia, dados, ultimo_seq):
+        caminho = self._caminho_competencia(competencia)
+        gravar_dados(caminho, {**dados, "ultimo_seq": ultimo_seq}, indent=None)
+        if self.backups is not None:
+            self.backups.salvar(caminho.name, caminho.read_bytes())
+
+    def _gravar_indice(self):
+        gravar_dados(self.caminho_indice, {"competencias": self.historico.indice}, indent=None)
+
+    def fechar(self):
+        with self._lock:
+            if self._arquivo is not None:
+                self._sincronizar()
+                self._arquivo.close()
+                self._arquivo = None
@@ -1,25 +1,47 @@
 import discord
 import asyncio
 import gspread
-from google.oauth2.service_account import Credentials
 from discord import app_commands
-import json
 import os
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import logging
-import shutil
 from pathlib import Path
 import sys
 import atexit
+import io
+import time
+
+# Módulos compartilhados pelos bots ficam em comum/, na raiz do repositório
+RAIZ_REPOSITORIO = str(Path(__file__).resolve().parent.parent)
+if RAIZ_REPOSITORIO not in sys.path:
+    sys.path.insert(0, RAIZ_REPOSITORIO)
+
+from arquivos import ArquivoCorrompido, bytes_gravados
+from backups import RepositorioBackups
+from serializacao import decodificar, definir_formato
+from diario_estado import DiarioEstado
+from estado import NOME_BACKUP, EstadoEmpresas
+from historico import LogAlteracoes, agrupar_por_empresa, nome_competencia
+from metricas import ColetorMetricas
+from agendador import AgendadorVerificacao, parse_janelas, parse_dias
+from fontes_planilha import FonteArquivoLocal, FonteGspread
+from normalizacao import RegrasInvalidas, RegrasNormalizacao, ValoresSemRegra
+from persistencia import PersistenciaAdiada
+from comum.registro_logs import configurar_logs
+from resumo_ciclo import ResumoCiclo
+from suspensas import HistoricoSuspensas
+from notificacoes import CanalNaoEncontrado, DespachanteNotificacoes, Notificacao, ResumoNotificacoes, agrupar_embeds
+from planilha import IndiceEmpresas, LeitorColunas, MotorDiff, DetectorRevisaoFonte, DetectorSempreAlterado
 
 # === CONFIGURAÇÃO DE CAMINHOS ===
 # Define o diretório base do bot (onde está o main.py)
 BOT_DIR = Path(__file__).parent.resolve()
 CONFIG_DIR = BOT_DIR / "config"
-DATA_DIR = BOT_DIR / "data"
-LOGS_DIR = BOT_DIR / "logs"
-BACKUPS_DIR = BOT_DIR / "backups"
+# Dados, logs e backups podem ser redirecionados por variável de ambiente (ex: benchmarks)
+DATA_DIR = Path(os.getenv("GERSON_DATA_DIR", BOT_DIR / "data"))
+LOGS_DIR = Path(os.getenv("GERSON_LOGS_DIR", BOT_DIR / "logs"))
+BACKUPS_DIR = Path(os.getenv("GERSON_BACKUPS_DIR", BOT_DIR / "backups"))
 
 # Cria diretórios se não existirem
 for directory in [CONFIG_DIR, DATA_DIR, LOGS_DIR, BACKUPS_DIR]:
@@ -29,13 +51,14 @@ for directory in [CONFIG_DIR, DATA_DIR, LOGS_DIR, BACKUPS_DIR]:
 load_dotenv(dotenv_path=CONFIG_DIR / ".env")
 
 # === CONFIGURAÇÃO DE LOGGING ===
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOGS_DIR / 'bot_logs.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+# Arquivo e console são escritos por uma thread própria (fila), fora do loop de eventos
+configurar_logs(
+    LOGS_DIR / 'bot_logs.log',
+    nivel=os.getenv('LOG_NIVEL', 'INFO'),
+    formato=os.getenv('LOG_FORMATO', 'texto').lower(),  # texto ou json (uma linha JSON por registro)
+    rotacao=os.getenv('LOG_ROTACAO', 'tamanho').lower(),  # tamanho ou diaria
+    tamanho_maximo=int(os.getenv('LOG_TAMANHO_MAXIMO_MB', '10')) * 1024 * 1024,
+    arquivos_antigos=int(os.getenv('LOG_ARQUIVOS_ANTIGOS', '5')),
 )
 logger = logging.getLogger(__name__)
 
@@ -49,94 +72,128 @@ DISCORD_CHANNEL_GENERAL = int(os.getenv('DISCORD_CHANNEL_GENERAL')) if os.getenv
 GOOGLE_SHEET_ID = os.getenv('GOOGLE_SHEET_ID')
 PATH_CREDENTIALS = CONFIG_DIR / os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
 DIA_RELATORIO_MENSAL = int(os.getenv('DIA_RELATORIO_MENSAL', '5'))  # Dia do mês para enviar relatório
-
-STATUS_MONITORADOS = ["INATIVA", "BAIXA", "DEVOLVIDA", "SUSPENSA"]
-
-# Mapeamento de variações de status e regimes para valores normalizados
-MAPEAMENTO_STATUS = {
-    # Status normais
-    "ATIVA": "ATIVA",
-    "ATIVO": "ATIVA",
-    "ATIVA (CONSULTORIA)": "ATIVA",
-    "ATIVO (CONSULTORIA)": "ATIVA",
-    "ATIVA (LEGALIZAÇÃO)": "ATIVA",
-    "ATIVO (LEGALIZAÇÃO)": "ATIVA",
-    "ATIVA (MANUTENÇÃO)": "ATIVA",
-    "ATIVO (MANUTENÇÃO)": "ATIVA",
-    "INATIVA": "INATIVA",
-    "INATIVO": "INATIVA",  # Normaliza INATIVO para INATIVA
-    "BAIXA": "BAIXA",
-    "BAIXADA": "BAIXA",
-    "DEVOLVIDA": "DEVOLVIDA",
-    "SUSPENSA": "SUSPENSA",
-    "SUSPENSA RFB": "SUSPENSA",  # Variação
-    "SUSPENSA-RFB": "SUSPENSA",
-    "SUSPENSA_RFB": "SUSPENSA",
-    "SUSPENSA (MANUTENÇÃO)": "SUSPENSA",
-    "SUSPENSA MANUTENÇÃO": "SUSPENSA",
-    "SUSPENSA (LEGALIZAÇÃO)": "SUSPENSA",
-    "SUSPENSA LEGALIZAÇÃO": "SUSPENSA",
-    
-
-    # Regimes como status (quando aparecem na coluna de status)
-    "SN": "SN",
-    "SN-EXCEDENTE": "SN-EXCEDENTE",  # Variação
-    "SN EXCEDENTE": "SN-EXCEDENTE",
-    "LP": "LP",
-    "LR": "LR",  # Lucro Real = Lucro Presumido para simplificar
-    "LR-NUCLEO": "LR-NUCLEO",  # Variação
-    "LR NUCLEO": "LR-NUCLEO",
-    "LP-NUCLEO": "LP-NUCLEO",
-    "LP NUCLEO": "LP-NUCLEO",
-    "MEI": "MEI",
-    "IGREJA": "IGREJA",
-    "ISENTO": "ISENTO",
+# Consulta a data de modificação no Drive antes de baixar a planilha inteira
+VERIFICAR_REVISAO_DRIVE = os.getenv('VERIFICAR_REVISAO_DRIVE', 'true').lower() in ('1', 'true', 'sim', 'yes')
+# Agendamento adaptativo das verificações (segundos)
+INTERVALO_MINIMO = int(os.getenv('INTERVALO_MINIMO', '60'))  # Logo após alterações
+INTERVALO_MAXIMO = int(os.getenv('INTERVALO_MAXIMO', '600'))  # Teto do backoff no expediente
+INTERVALO_FORA_EXPEDIENTE = int(os.getenv('INTERVALO_FORA_EXPEDIENTE', '1800'))
+JANELAS_EXPEDIENTE = os.getenv('JANELAS_EXPEDIENTE', '08:00-18:00')  # Ex: 08:00-12:00,13:00-18:00
+DIAS_EXPEDIENTE = os.getenv('DIAS_EXPEDIENTE', '0,1,2,3,4')  # Segunda=0 ... Domingo=6
+# Colunas da planilha (letras) com código, nome, status e regime tributário
+COLUNAS_PLANILHA = {
+    "codigo": os.getenv('COLUNA_CODIGO', 'A'),
+    "nome": os.getenv('COLUNA_NOME', 'B'),
+    "status": os.getenv('COLUNA_STATUS', 'C'),
+    "regime": os.getenv('COLUNA_REGIME', 'D'),
 }
-
-MAPEAMENTO_REGIME = {
-    "SN": "SN",
-    "SIMPLES NACIONAL": "SN",
-    "SIMPLES": "SN",
-    "SN-EXCEDENTE": "SN-EXCEDENTE",
-    "SN EXCEDENTE": "SN-EXCEDENTE",
-
-    "LP": "LP",
-    "LUCRO PRESUMIDO": "LP",
-    "LR": "LR",
-    "LUCRO REAL": "LR",
-    "LR-NUCLEO": "LR-NUCLEO",
-    "LR NUCLEO": "LR-NUCLEO",
-    "LP-NUCLEO": "LP-NUCLEO",
-    "LP NUCLEO": "LP-NUCLEO",
-
-    "MEI": "MEI",
-    "MICROEMPREENDEDOR": "MEI",
-
-    "IGREJA": "IGREJA",
-    "RELIGIOSO": "IGREJA",
-    "ORGANIZACAO RELIGIOSA": "IGREJA",
-
-    "ISENTO": "ISENTO",
-    "ISENTA": "ISENTO",
+# Fonte da planilha: "gspread" (Google Sheets) ou "local" (CSV/XLSX para testes de carga offline)
+FONTE_PLANILHA = os.getenv('FONTE_PLANILHA', 'gspread').lower()
+ARQUIVO_PLANILHA_LOCAL = os.getenv('ARQUIVO_PLANILHA_LOCAL', str(DATA_DIR / 'planilha_local.csv'))
+LATENCIA_PLANILHA_LOCAL = float(os.getenv('LATENCIA_PLANILHA_LOCAL', '0'))  # Segundos por leitura
+TAXA_MUTACAO_PLANILHA_LOCAL = float(os.getenv('TAXA_MUTACAO_PLANILHA_LOCAL', '0'))  # Fração de linhas alteradas por leitura
+# Envio de notificações: workers simultâneos e limite por canal (rajada + mensagens/segundo)
+NOTIFICACOES_WORKERS = int(os.getenv('NOTIFICACOES_WORKERS', '3'))
+NOTIFICACOES_RAJADA_POR_CANAL = int(os.getenv('NOTIFICACOES_RAJADA_POR_CANAL', '5'))
+NOTIFICACOES_POR_SEGUNDO_POR_CANAL = float(os.getenv('NOTIFICACOES_POR_SEGUNDO_POR_CANAL', '1'))
+# Modo resumo (opcional): agrupa as notificações do ciclo em mensagens com até 10 embeds
+NOTIFICACOES_RESUMO = os.getenv('NOTIFICACOES_RESUMO', 'false').lower() == 'true'
+NOTIFICACOES_RESUMO_LIMITE_ARQUIVO = int(os.getenv('NOTIFICACOES_RESUMO_LIMITE_ARQUIVO', '50'))  # Acima disso, envia resumo + arquivo .txt
+NOTIFICACOES_JANELA_RESUMO = int(os.getenv('NOTIFICACOES_JANELA_RESUMO', '0'))  # Segundos acumulando notificações (0 = por ciclo)
+# Backups deduplicados dos históricos (segundos entre backups), compressão e retenção (por hora/dia/mês)
+INTERVALO_BACKUP_ESTADO = int(os.getenv('INTERVALO_BACKUP_ESTADO', '3600'))
+BACKUP_COMPRESSAO = os.getenv('BACKUP_COMPRESSAO', 'auto').lower()  # auto, zstd ou gzip
+BACKUP_RETENCAO_HORAS = int(os.getenv('BACKUP_RETENCAO_HORAS', '24'))
+BACKUP_RETENCAO_DIAS = int(os.getenv('BACKUP_RETENCAO_DIAS', '30'))
+BACKUP_RETENCAO_MESES = int(os.getenv('BACKUP_RETENCAO_MESES', '12'))
+# Diário do estado (base + deltas por ciclo): ciclos com alteração antes de gravar uma nova base
+DIARIO_DELTAS_POR_BASE = int(os.getenv('DIARIO_DELTAS_POR_BASE', '500'))
+# Linhas acumuladas no log de alterações antes da compactação por competência
+HISTORICO_LIMITE_LOG = int(os.getenv('HISTORICO_LIMITE_LOG', '5000'))
+# Competências do histórico mantidas em memória (as demais são lidas do disco quando um relatório pede)
+HISTORICO_CACHE_COMPETENCIAS = int(os.getenv('HISTORICO_CACHE_COMPETENCIAS', '6'))
+# Janela (segundos) que agrupa várias alterações numa única gravação de arquivo
+JANELA_GRAVACAO = float(os.getenv('JANELA_GRAVACAO', '0.5'))
+# Formato dos arquivos de dados: auto (orjson se instalado), json (indentado), orjson ou msgpack
+FORMATO_ARQUIVOS = os.getenv('FORMATO_ARQUIVOS', 'auto').lower()
+# Detalhes por linha registrados por categoria em cada ciclo quando LOG_NIVEL=DEBUG (o resumo do ciclo sai sempre)
+LOG_AMOSTRA_POR_CATEGORIA = int(os.getenv('LOG_AMOSTRA_POR_CATEGORIA', '20'))
+# Métricas dos ciclos: ciclos mantidos em memória (/metricas) e arquivo opcional no formato do Prometheus
+METRICAS_CICLOS = int(os.getenv('METRICAS_CICLOS', '500'))
+METRICAS_ARQUIVO_PROMETHEUS = os.getenv('METRICAS_ARQUIVO_PROMETHEUS', '')  # Relativo à pasta data/ (vazio = desativado)
+# Arquivo com as regras de normalização de status/regime (JSON, ou YAML com PyYAML instalado)
+NORMALIZACAO_ARQUIVO = CONFIG_DIR / os.getenv('NORMALIZACAO_ARQUIVO', 'normalizacao.json')
+GOOGLE_SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
+]
+
+STATUS_MONITORADOS = frozenset({"INATIVA", "BAIXA", "DEVOLVIDA", "SUSPENSA"})
+# Ordem de exibição dos status monitorados
+STATUS_MONITORADOS_ORDEM = ("INATIVA", "BAIXA", "DEVOLVIDA", "SUSPENSA")
+
+# Regras de normalização de status e regime (arquivo relido quando modificado, sem reiniciar o bot)
+REGRAS_NORMALIZACAO = RegrasNormalizacao(NORMALIZACAO_ARQUIVO)
+try:
+    REGRAS_NORMALIZACAO.carregar()
+except (RegrasInvalidas, OSError) as e:
+    logger.critical(f"Regras de normalização inválidas ou ausentes ({NORMALIZACAO_ARQUIVO}): {e}")
+    sys.exit(1)
+
+# Categorias do resumo de log do ciclo, na ordem de exibição
+ROTULOS_RESUMO_CICLO = {
+    "linhas": "linhas novas/alteradas",
+    "alteracao_status": "alterações de status",
+    "alteracao_regime": "alterações de regime",
+    "regime_definido": "regimes definidos",
+    "nova_empresa": "empresas novas",
+    "historico": "registros no histórico",
+    "suspensa_registrada": "suspensas registradas na semana",
+    "suspensa_repetida": "suspensas já registradas na semana",
+    "status_sem_notificacao": "status sem notificação",
+    "regime_sem_notificacao": "regimes sem notificação (status negativo)",
+    "nova_sem_notificacao": "empresas novas sem notificação (status negativo)",
+    "status_normalizado": "status normalizados",
+    "regime_normalizado": "regimes normalizados",
+    "regime_vazio": "regimes vazios mantidos",
+    "status_migrado": "status atualizados pelas regras de normalização (sem notificação)",
+    "regime_migrado": "regimes atualizados pelas regras de normalização (sem notificação)",
 }
 
-def normalizar_status(valor):
+# Tabelas compiladas (chaves sem acento/pontuação), com cache por valor bruto
+NORMALIZADOR_STATUS = REGRAS_NORMALIZACAO.status
+NORMALIZADOR_REGIME = REGRAS_NORMALIZACAO.regime
+
+def normalizar_status(valor, contar=True):
     """Normaliza variações de status para valores padrão."""
-    if not valor:
-        return ""
-    valor_upper = str(valor).upper().strip()
-    return MAPEAMENTO_STATUS.get(valor_upper, valor_upper)
+    return NORMALIZADOR_STATUS.normalizar(valor, contar=contar)
 
-def normalizar_regime(valor):
+def normalizar_regime(valor, contar=True):
     """Normaliza variações de regime tributário para valores padrão."""
-    if not valor:
-        return ""
-    valor_upper = str(valor).upper().strip()
-    return MAPEAMENTO_REGIME.get(valor_upper, valor_upper)
+    return NORMALIZADOR_REGIME.normalizar(valor, contar=contar)
+
+def so_regras_mudaram(valor_anterior, valor_novo, normalizar):
+    """
+    Indica se o valor salvo só difere do novo por ter sido normalizado com outras regras.
+
+    O estado guarda o valor já normalizado; se as regras atuais levam o valor salvo ao
+    valor novo, a empresa não mudou (ex: "SUSPENSA (RFB)" salvo antes de uma regra nova).
+    """
+    return bool(valor_anterior) and normalizar(valor_anterior, contar=False) == valor_novo
+
+def criar_fonte_planilha():
+    """Cria a fonte da planilha configurada no .env (FONTE_PLANILHA)."""
+    if FONTE_PLANILHA == "local":
+        return FonteArquivoLocal(
+            ARQUIVO_PLANILHA_LOCAL,
+            latencia=LATENCIA_PLANILHA_LOCAL,
+            taxa_mutacao=TAXA_MUTACAO_PLANILHA_LOCAL,
+        )
+    return FonteGspread(PATH_CREDENTIALS, GOOGLE_SHEET_ID, GOOGLE_SCOPES)
 
 def eh_status_monitorado(status):
     """Verifica se o status é um dos monitorados (considerando variações)."""
-    status_normalizado = normalizar_status(status)
+    status_normalizado = normalizar_status(status, contar=False)
 
     # Verifica se o status normalizado está na lista de monitorados
     return status_normalizado in STATUS_MONITORADOS
@@ -158,12 +215,10 @@ def criar_lockfile():
                     import psutil
                     if psutil.pid_exists(old_pid):
                         logger.error(f"Bot já está rodando (PID: {old_pid}). Encerrando...")
-                        print(f"ERRO: Bot_Gerson já está em execução (PID: {old_pid})")
                         sys.exit(1)
                 else:
                     os.kill(old_pid, 0)  # Não mata o processo, apenas verifica
                     logger.error(f"Bot já está rodando (PID: {old_pid}). Encerrando...")
-                    print(f"ERRO: Bot_Gerson já está em execução (PID: {old_pid})")
                     sys.exit(1)
             except (ProcessLookupError, OSError, ImportError):
                 # Processo não existe mais, pode remover o lockfile antigo
@@ -218,35 +273,118 @@ class MyBot(discord.Client):
         super().__init__(intents=intents)
         self.tree = app_commands.CommandTree(self)
         self.sheet_data = {}
+        # Leitura detecta o formato de cada arquivo; só a gravação segue a configuração
+        formato = definir_formato(FORMATO_ARQUIVOS)
+        logger.info(f"Formato dos arquivos de dados: {formato}")
+        self.estado = EstadoEmpresas(DATA_DIR / "estado_empresas.db")  # Estado persistido (SQLite)
+        # Empresas de uma gravação do estado que falhou, regravadas na próxima tentativa
+        self.estado_pendente = {}
+        self.estado_pendente_removidos = set()
+        self.ultimo_backup_estado = None
+        # Estado em qualquer data passada (backups/estado): base completa + deltas de cada ciclo
+        self.diario_estado = DiarioEstado(BACKUPS_DIR / "estado", deltas_por_base=DIARIO_DELTAS_POR_BASE)
+        self.backups = RepositorioBackups(
+            BACKUPS_DIR,
+            compressao=BACKUP_COMPRESSAO,
+            horas=BACKUP_RETENCAO_HORAS,
+            dias=BACKUP_RETENCAO_DIAS,
+            meses=BACKUP_RETENCAO_MESES,
+        )
+        self.indice = IndiceEmpresas()  # Índices por status/regime do estado atual
+        self.agendador = AgendadorVerificacao(
+            intervalo_minimo=INTERVALO_MINIMO,
+            intervalo_maximo=INTERVALO_MAXIMO,
+            intervalo_fora_expediente=INTERVALO_FORA_EXPEDIENTE,
+            janelas=parse_janelas(JANELAS_EXPEDIENTE),
+            dias=parse_dias(DIAS_EXPEDIENTE),
+        )
+        self.fonte = criar_fonte_planilha()  # Google Sheets ou arquivo local
+        self.leitor = LeitorColunas(COLUNAS_PLANILHA)  # Lê apenas as colunas usadas
+        self.motor_diff = MotorDiff()  # Impressões digitais das linhas da última leitura
+        self.reprocessar_tudo = False  # Regras de normalização recarregadas: reprocessa todas as linhas
+        # Valores sem regra de normalização nas empresas atuais (comando /normalizacao)
+        self.valores_sem_regra = {
+            normalizador.nome: ValoresSemRegra(normalizador)
+            for normalizador in (NORMALIZADOR_STATUS, NORMALIZADOR_REGIME)
+        }
+        # Contagens do ciclo por categoria: uma linha de log por ciclo, detalhe por linha só em DEBUG
+        self.resumo_ciclo = ResumoCiclo(logger, ROTULOS_RESUMO_CICLO, amostra=LOG_AMOSTRA_POR_CATEGORIA)
+        # Sinal barato de alteração consultado antes de cada download completo
+        if VERIFICAR_REVISAO_DRIVE:
+            self.detector_alteracoes = DetectorRevisaoFonte(self.fonte)
+        else:
+            self.detector_alteracoes = DetectorSempreAlterado()
+        # Notificações enfileiradas pelo ciclo e enviadas por um pool de workers
+        self.despachante = DespachanteNotificacoes(
+            workers=NOTIFICACOES_WORKERS,
+            rajada_por_canal=NOTIFICACOES_RAJADA_POR_CANAL,
+            por_segundo_por_canal=NOTIFICACOES_POR_SEGUNDO_POR_CANAL,
+        )
+        # Notificações acumuladas para envio agrupado (modo resumo)
+        self.resumo = ResumoNotificacoes(janela=NOTIFICACOES_JANELA_RESUMO) if NOTIFICACOES_RESUMO else None
+        # Tempos por etapa e contadores dos últimos ciclos (comando /metricas)
+        self.reconexoes = 0
+        self.metricas = ColetorMetricas(
+            limite=METRICAS_CICLOS,
+            arquivo_prometheus=DATA_DIR / METRICAS_ARQUIVO_PROMETHEUS if METRICAS_ARQUIVO_PROMETHEUS else None,
+        )
+        self.metricas.registrar_fonte("notificacoes_enviadas", lambda: self.despachante.enviadas)
+        self.metricas.registrar_fonte("notificacoes_falhas", lambda: self.despachante.falhas)
+        self.metricas.registrar_fonte("mensagens_enviadas", lambda: self.despachante.mensagens_enviadas)
+        self.metricas.registrar_fonte("bytes_gravados", bytes_gravados)
+        self.metricas.registrar_fonte("reconexoes", lambda: self.reconexoes)
         self.ultima_verificacao = None
-        self.historico_alteracoes = {}  # Histórico de alterações por mês
-        self.historico_suspensas = {}  # Histórico de empresas suspensas por semana
+        self.log_alteracoes = LogAlteracoes(
+            DATA_DIR / "historico",
+            limite_linhas=HISTORICO_LIMITE_LOG,
+            backups=self.backups,
+            limite_cache=HISTORICO_CACHE_COMPETENCIAS,
+        )
+        # Histórico de alterações por mês (índice em memória, alterações carregadas sob demanda)
+        self.historico_alteracoes = self.log_alteracoes.historico
+        # Histórico de empresas suspensas por semana (log incremental + arquivo completo)
+        self.historico_suspensas = HistoricoSuspensas(DATA_DIR, backups=self.backups, limite_linhas=HISTORICO_LIMITE_LOG)
+        # Gravações adiadas: um escritor por arquivo, agrupando as marcações da janela
+        self.persistencia = PersistenciaAdiada(janela=JANELA_GRAVACAO)
+        self.persistencia.registrar(
+            "historico_suspensas.json",
+            self.historico_suspensas.preparar_compactacao,
+            self.historico_suspensas.gravar_compactacao,
+        )
         self.ultimo_relatorio_enviado = None  # Data do último relatório enviado
         self.ultimo_relatorio_suspensas_enviado = None  # Data do último relatório semanal de suspensas
         self.primeiro_carregamento_completo = verificar_primeiro_carregamento()  # Flag de primeiro carregamento
 
     async def setup_hook(self):
+        self.despachante.iniciar()
         await self.tree.sync()
-        print("Comandos sincronizados com sucesso!")
+        logger.info("Comandos sincronizados com sucesso!")
+
+    async def close(self):
+        # Entrega as notificações pendentes antes de desconectar
+        self.despachar_resumo(forcar=True)
+        await self.despachante.encerrar()
+        # Grava os arquivos com alterações ainda na janela de espera
+        await self.persistencia.descarregar()
+        if self.estado_pendente or self.estado_pendente_removidos:
+            await self.salvar_estado({})
+        self.estado.fechar()
+        self.log_alteracoes.fechar()
+        self.historico_suspensas.fechar()
+        await super().close()
 
     async def on_ready(self):
-        print(f"O Bot {self.user} está online!")
         logger.info(f"O Bot {self.user} está online!")
 
-        # Inicializa Google Sheets em thread separada para não bloquear o loop
-        def init_sheets():
-            gc = gspread.authorize(
-                Credentials.from_service_account_file(PATH_CREDENTIALS, scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"])
-            )
-            return gc.open_by_key(GOOGLE_SHEET_ID).sheet1
-
-        self.sheet = await asyncio.to_thread(init_sheets)
+        # Conecta à fonte da planilha em thread separada para não bloquear o loop
+        await asyncio.to_thread(self.fonte.conectar)
+        logger.info(f"Fonte da planilha: {self.fonte.descricao}")
 
         # Carrega histórico de alterações
         self.historico_alteracoes = self.carregar_historico()
 
         # Carrega histórico de suspensas
-        self.historico_suspensas = self.carregar_historico_suspensas()
+        self.carregar_historico_suspensas()
 
         # Inicia tarefas em paralelo
         self.loop.create_task(self.monitorar_planilha())
@@ -299,268 +437,38 @@ class MyBot(discord.Client):
 
     async def reconectar_sheets(self):
         """Reconecta ao Google Sheets em caso de erro de conexão."""
+        self.reconexoes += 1
         try:
             logger.info("Tentando reconectar ao Google Sheets...")
-            print("Reconectando ao Google Sheets...")
-
-            def init_sheets():
-                gc = gspread.authorize(
-                    Credentials.from_service_account_file(PATH_CREDENTIALS, scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"])
-                )
-                return gc.open_by_key(GOOGLE_SHEET_ID).sheet1
 
-            self.sheet = await asyncio.to_thread(init_sheets)
+            await asyncio.to_thread(self.fonte.conectar)
             logger.info("Reconexão ao Google Sheets bem-sucedida!")
-            print("Reconexão bem-sucedida!")
             return True
         except Exception as e:
             logger.error(f"Erro ao reconectar ao Google Sheets: {e}")
-            print(f"Erro ao reconectar: {e}")
             return False
 
     async def monitorar_planilha(self):
-        print("Monitorando planilha do Google Sheets...")
         logger.info("Monitorando planilha do Google Sheets...")
-        print(f"ID da planilha: {GOOGLE_SHEET_ID}")
         logger.info(f"ID da planilha: {GOOGLE_SHEET_ID}")
-        print("Modo: Verificação contínua a cada 2.5 minutos (TESTE)")
-        logger.info("Modo: Verificação contínua a cada 2.5 minutos (TESTE)")
+        modo = (f"Modo: Verificação adaptativa ({self.agendador.intervalo_minimo}s a {self.agendador.intervalo_maximo}s "
+                f"no expediente, {self.agendador.intervalo_fora_expediente}s fora dele)")
+        logger.info(modo)
 
         # Carrega dados salvos, se existirem
         self.sheet_data = self.carregar_estado()
+        self.indice.reconstruir(self.sheet_data)
 
         # Contador de tentativas de reconexão
         tentativas_reconexao = 0
         MAX_TENTATIVAS_RECONEXAO = 3
 
-        # === HORÁRIOS ESPECÍFICOS (COMENTADO PARA TESTES) ===
-        # Descomente o bloco abaixo para ativar verificações apenas nos horários: 09:00, 11:00, 13:00, 15:00
-        # HORARIOS_VERIFICACAO = [9, 11, 13, 15]
-        # ultima_hora_verificada = None
-
         while True:
+            # Alterações vistas no ciclo encurtam o próximo intervalo
+            houve_alteracao = False
             try:
-                agora = datetime.now()
-                # hora_atual = agora.hour
-
-                # === VERIFICAÇÃO POR HORÁRIOS ESPECÍFICOS (COMENTADO) ===
-                # Descomente este bloco e comente o bloco "VERIFICAÇÃO CONTÍNUA" abaixo para usar horários
-                # if hora_atual in HORARIOS_VERIFICACAO and ultima_hora_verificada != hora_atual:
-                #     self.ultima_verificacao = agora.strftime('%d/%m/%Y %H:%M:%S')
-                #     print(f"\n{'='*60}")
-                #     print(f"Verificação agendada - {self.ultima_verificacao}")
-                #     print(f"{'='*60}")
-                #     logger.info(f"Verificação agendada - {self.ultima_verificacao}")
-
-                # === VERIFICAÇÃO CONTÍNUA (ATIVO PARA TESTES) ===
-                self.ultima_verificacao = agora.strftime('%d/%m/%Y %H:%M:%S')
-                print(f"\nVerificando planilha... {self.ultima_verificacao}")
-                logger.info(f"Verificando planilha... {self.ultima_verificacao}")
-
-                # Executa a chamada síncrona em thread separada para não bloquear o loop
-                data = await asyncio.to_thread(self.sheet.get_all_values)
-
-                print(f"Dados obtidos com sucesso! ({len(data)} linhas)")
-                logger.info(f"Dados obtidos com sucesso! ({len(data)} linhas)")
-                novos_dados = {}
-                if len(data) <= 1:  # Verifica se há dados além do cabeçalho
-                    print("Planilha vazia ou contém apenas cabeçalho")
-                    logger.warning("Planilha vazia ou contém apenas cabeçalho")
-                    await asyncio.sleep(150)  # 2.5 minutos
-                    continue
-
-                # Pula a primeira linha (cabeçalho)
-                for idx, row in enumerate(data[1:], start=2):  # start=2 porque idx 1 é o cabeçalho
-                    # Verifica se a linha tem pelo menos as colunas essenciais (A, B, C)
-                    if len(row) < 3:
-                        continue
-
-                    # A=0, B=1, C=2, D=3
-                    codigo = row[0]  # Coluna A
-                    nome = row[1]    # Coluna B
-                    status = row[2]  # Coluna C
-                    regime_tributario = row[3] if len(row) > 3 else ""  # Coluna D (opcional)
-
-                    # Verifica campos obrigatórios (código, nome e status)
-                    # Regime tributário é opcional e pode ser adicionado depois
-                    if not all([codigo, nome, status]):
-                        continue
-
-                    codigo = str(codigo).strip()
-                    nome = str(nome).strip()
-                    status_bruto = str(status).upper().strip()
-                    regime_bruto = str(regime_tributario).upper().strip()
-
-                    # Normaliza os valores
-                    status = normalizar_status(status_bruto)
-                    regime_tributario = normalizar_regime(regime_bruto)
-
-                    # Log se houver normalização
-                    if status != status_bruto:
-                        logger.info(f"Status normalizado: '{status_bruto}' -> '{status}' ({codigo})")
-                    if regime_tributario != regime_bruto:
-                        logger.info(f"Regime normalizado: '{regime_bruto}' -> '{regime_tributario}' ({codigo})")
-
-                    # PROTEÇÃO: Se a empresa já existe e tinha regime, mas agora veio vazio da planilha
-                    # mantém o regime anterior (leitura temporária incompleta do Sheets)
-                    if codigo in self.sheet_data:
-                        dados_anterior = self.sheet_data[codigo]
-                        regime_anterior = dados_anterior.get("regime_tributario", "") if isinstance(dados_anterior, dict) else ""
-
-                        # Se tinha regime antes e agora veio vazio, mantém o anterior
-                        if regime_anterior and not regime_tributario:
-                            logger.warning(f"Regime vazio detectado temporariamente para {codigo} - {nome} (era {regime_anterior}). Mantendo regime anterior.")
-                            regime_tributario = regime_anterior
-
-                    # Armazena em formato de dicionário (valores normalizados)
-                    # Permite regime vazio para empresas novas sem regime ainda definido
-                    novos_dados[codigo] = {
-                        "status": status,
-                        "regime_tributario": regime_tributario if regime_tributario else ""
-                    }
-
-                    # Verifica alterações ou novas empresas
-                    if codigo in self.sheet_data:
-                        dados_anterior = self.sheet_data[codigo]
-                        status_anterior = dados_anterior.get("status") if isinstance(dados_anterior, dict) else dados_anterior
-                        regime_anterior = dados_anterior.get("regime_tributario", "") if isinstance(dados_anterior, dict) else ""
-                        
-                        # Verifica mudança de status
-                        if status != status_anterior:
-                            print(f"\nAlteração detectada na linha {idx}:")
-                            print(f"   Empresa: {codigo} - {nome}")
-                            print(f"   Status anterior: {status_anterior}")
-                            print(f"   Novo status: {status}")
-                            logger.info(f"Alteração detectada na linha {idx}: {codigo} - {nome} ({status_anterior} -> {status})")
-
-                            # Registra alteração no histórico
-                            self.registrar_alteracao(
-                                tipo="status",
-                                codigo=codigo,
-                                nome=nome,
-                                valor_anterior=status_anterior,
-                                valor_novo=status
-                            )
-
-                            # Notifica sobre status monitorado (problema)
-                            if eh_status_monitorado(status):
-                                await self.enviar_mensagem(codigo, nome, status)
-                                # Registra empresa suspensa para relatório semanal
-                                if status == "SUSPENSA":
-                                    self.registrar_empresa_suspensa(codigo, nome)
-                            # Notifica quando volta a ficar ATIVA (resolução)
-                            elif status.upper() == "ATIVA" and eh_status_monitorado(status_anterior):
-                                await self.enviar_mensagem_reativacao(codigo, nome, status_anterior)
-                            else:
-                                print(f"   Status não requer notificação: {status}")
-                                logger.info(f"Status não requer notificação: {status}")
-                        
-                        # Verifica mudança de regime tributário
-                        regime_anterior_valido = regime_anterior if regime_anterior else ""
-                        regime_novo_valido = regime_tributario if regime_tributario else ""
-
-                        if regime_novo_valido != regime_anterior_valido:
-                            if regime_anterior_valido and regime_novo_valido:
-                                # Mudança de regime (já tinha um regime antes e tem um novo diferente)
-                                print(f"\nAlteração de Regime Tributário detectada na linha {idx}:")
-                                print(f"   Empresa: {codigo} - {nome}")
-                                print(f"   Regime anterior: {regime_anterior_valido}")
-                                print(f"   Novo regime: {regime_novo_valido}")
-                                logger.info(f"Alteração de regime tributário na linha {idx}: {codigo} - {nome} ({regime_anterior_valido} -> {regime_novo_valido})")
-
-                                # Registra alteração no histórico
-                                self.registrar_alteracao(
-                                    tipo="regime_tributario",
-                                    codigo=codigo,
-                                    nome=nome,
-                                    valor_anterior=regime_anterior_valido,
-                                    valor_novo=regime_novo_valido
-                                )
-
-                                # NÃO notifica mudança de regime se o status atual for negativo
-                                if self.primeiro_carregamento_completo:
-                                    if eh_status_monitorado(status):
-                                        logger.info(f"   Mudança de regime com status negativo ({status}): registrando sem notificar Discord")
-                                        print(f"   Status negativo ({status}): não notificando mudança de regime")
-                                    else:
-                                        await self.enviar_mensagem_regime_tributario(codigo, nome, regime_anterior_valido, regime_novo_valido)
-                            elif regime_novo_valido and not regime_anterior_valido:
-                                # Regime definido pela primeira vez (empresa já existia, mas sem regime)
-                                print(f"\nRegime tributário definido na linha {idx}:")
-                                print(f"   Empresa: {codigo} - {nome}")
-                                print(f"   Regime tributário: {regime_novo_valido}")
-                                logger.info(f"Regime tributário definido: {codigo} - {nome} (Regime: {regime_novo_valido})")
-
-                                # Registra no histórico
-                                self.registrar_alteracao(
-                                    tipo="regime_tributario",
-                                    codigo=codigo,
-                                    nome=nome,
-                                    valor_anterior="Não definido",
-                                    valor_novo=regime_novo_valido
-                                )
-
-                                # NÃO notifica definição de regime se o status atual for negativo
-                                if self.primeiro_carregamento_completo:
-                                    if eh_status_monitorado(status):
-                                        logger.info(f"   Regime definido com status negativo ({status}): registrando sem notificar Discord")
-                                        print(f"   Status negativo ({status}): não notificando definição de regime")
-                                    else:
-                                        await self.enviar_mensagem_regime_definido(codigo, nome, regime_novo_valido)
-                    else:
-                        # Nova empresa detectada
-                        print(f"\nNova empresa detectada na linha {idx}:")
-                        print(f"   Empresa: {codigo} - {nome}")
-                        print(f"   Status inicial: {status}")
-                        print(f"   Regime tributário: {regime_tributario if regime_tributario else 'Não definido'}")
-                        logger.info(f"Nova empresa detectada na linha {idx}: {codigo} - {nome} (Status: {status}, Regime: {regime_tributario if regime_tributario else 'Não definido'})")
-
-                        # Só envia notificação se não for o primeiro carregamento E se o status NÃO for negativo
-                        if self.primeiro_carregamento_completo:
-                            # NÃO notifica empresas novas com status negativo
-                            # Empresas já criadas inativas/baixas/devolvidas/suspensas não precisam de notificação
-                            if eh_status_monitorado(status):
-                                logger.info(f"   Nova empresa com status negativo ({status}): registrando sem notificar Discord")
-                                print(f"   Nova empresa com status negativo ({status}): apenas registrando")
-                            else:
-                                # Notifica apenas empresas novas com status ATIVA
-                                await self.enviar_mensagem_nova_empresa(codigo, nome, status, regime_tributario)
-                        else:
-                            logger.info(f"   Primeira carga: anotando {codigo} sem notificar Discord")
-
-                # FIM DO LOOP - Atualiza dados salvos APÓS processar TODAS as linhas
-                # PROTEÇÃO: Não salva se os dados novos forem muito menores que os anteriores
-                # (indica leitura incompleta/erro de conexão)
-                dados_anteriores_count = len(self.sheet_data)
-                dados_novos_count = len(novos_dados)
-
-                if dados_anteriores_count > 0 and dados_novos_count < dados_anteriores_count * 0.5:
-                    # Se os novos dados têm menos de 50% dos anteriores, provavelmente houve erro
-                    logger.warning(f"PROTEÇÃO ATIVADA: Dados novos ({dados_novos_count}) muito menores que anteriores ({dados_anteriores_count}). NÃO salvando estado.")
-                    print(f"⚠️ PROTEÇÃO: Leitura incompleta detectada ({dados_novos_count}/{dados_anteriores_count} registros). Estado NÃO será salvo.")
-                    # Não atualiza self.sheet_data nem salva
-                    await asyncio.sleep(150)
-                    continue
-
-                self.sheet_data = novos_dados
-                await self.salvar_estado(novos_dados)
-
-                # Se for a primeira carga, marca como completa APÓS salvar tudo
-                if not self.primeiro_carregamento_completo:
-                    marcar_primeiro_carregamento()
-                    self.primeiro_carregamento_completo = True
-
-                # === PARA HORÁRIOS ESPECÍFICOS (COMENTADO) ===
-                # Descomente as linhas abaixo ao usar horários específicos
-                # ultima_hora_verificada = hora_atual
-                # print(f"{'='*60}")
-                # print(f"Verificação concluída às {agora.strftime('%H:%M:%S')}")
-                # print(f"Próxima verificação: {self._proxima_verificacao(hora_atual)}")
-                # print(f"{'='*60}\n")
-                # logger.info(f"Verificação concluída. Próxima: {self._proxima_verificacao(hora_atual)}")
-
+                houve_alteracao = await self.executar_ciclo()
             except gspread.exceptions.APIError as e:
-                print(f"Erro de API do Google Sheets: {e}")
                 logger.error(f"Erro de API do Google Sheets: {e}")
                 # Tenta reconectar
                 if tentativas_reconexao < MAX_TENTATIVAS_RECONEXAO:
@@ -573,132 +481,577 @@ class MyBot(discord.Client):
                     tentativas_reconexao = 0  # Reset para próximo ciclo
 
             except Exception as e:
-                print(f"Erro ao monitorar planilha: {e}")
                 logger.error(f"Erro ao monitorar planilha: {e}")
                 # Verifica se é erro de conexão e tenta reconectar
                 if "transport" in str(e).lower() or "connection" in str(e).lower() or "timeout" in str(e).lower():
                     logger.warning("Erro de conexão detectado. Tentando reconectar...")
                     await self.reconectar_sheets()
 
-            # === MODO TESTE: Verifica a cada 2.5 minutos ===
-            await asyncio.sleep(150)
+            # Intervalo adaptativo: curto após alterações, backoff quando a planilha está parada
+            await self._aguardar_proximo_ciclo(houve_alteracao)
+
+    async def executar_ciclo(self):
+        """
+        Executa uma verificação completa da planilha, registrando as métricas do ciclo.
+
+        Retorna True se foram vistas linhas novas ou alteradas (usado pelo agendador).
+        Exceções de leitura são tratadas pelo loop de monitorar_planilha.
+        """
+        self.metricas.iniciar_ciclo()
+        resultado = "erro"
+        try:
+            houve_alteracao = await self._executar_ciclo()
+            resultado = "alterado" if houve_alteracao else "sem_alteracao"
+            return houve_alteracao
+        finally:
+            self.metricas.finalizar_ciclo(resultado)
+            if self.metricas.arquivo_prometheus is not None:
+                try:
+                    await asyncio.to_thread(self.metricas.exportar)
+                except OSError as e:
+                    logger.warning(f"Não foi possível gravar as métricas em {self.metricas.arquivo_prometheus}: {e}")
+
+    async def _executar_ciclo(self):
+        agora = datetime.now()
+        self.ultima_verificacao = agora.strftime('%d/%m/%Y %H:%M:%S')
+        logger.info(f"Verificando planilha... {self.ultima_verificacao}")
+
+        # Gravação do estado que falhou no ciclo anterior: tenta de novo mesmo sem alterações na planilha
+        if self.estado_pendente or self.estado_pendente_removidos:
+            await self.salvar_estado({})
+
+        # Regras de normalização modificadas: reprocessa todas as linhas com as novas regras.
+        # As linhas que não mudaram na planilha são apenas renormalizadas (sem histórico nem notificação)
+        if REGRAS_NORMALIZACAO.verificar():
+            logger.info("Regras de normalização recarregadas; reprocessando a planilha inteira.")
+            self.reprocessar_tudo = True
+            self.detector_alteracoes.resetar()
+
+        # Consulta primeiro o sinal de alteração (data de modificação no Drive)
+        with self.metricas.etapa("busca"):
+            mudou, marcador = await asyncio.to_thread(self.detector_alteracoes.verificar)
+        if not mudou:
+            logger.info(f"Planilha não modificada (marcador: {marcador}). Download ignorado.")
+            return False
+
+        # Baixa apenas as colunas mapeadas (código, nome, status, regime) em thread separada
+        with self.metricas.etapa("busca"):
+            data = await self._buscar_planilha()
+        self.metricas.contar("linhas", max(len(data) - 1, 0))
+
+        logger.info(f"Dados obtidos com sucesso! ({len(data)} linhas)")
+        if len(data) <= 1:  # Verifica se há dados além do cabeçalho
+            logger.warning("Planilha vazia ou contém apenas cabeçalho")
+            return False
+
+        # Compara com a última leitura: só processa linhas novas ou alteradas
+        with self.metricas.etapa("diff"):
+            diff = self.motor_diff.calcular(data, todas=self.reprocessar_tudo)
+        if diff.inalterado:
+            logger.info("Planilha inalterada (digest idêntico). Ciclo ignorado.")
+            self.detector_alteracoes.confirmar(marcador)
+            return False
+
+        logger.info(f"{len(diff.linhas_alteradas)} linha(s) nova(s) ou alterada(s) desde a última verificação.")
+        houve_alteracao = bool(diff.linhas_alteradas)
+
+        # Parte do estado anterior, descartando empresas que saíram da planilha
+        novos_dados = {
+            codigo: dados for codigo, dados in self.sheet_data.items()
+            if codigo in diff.codigos_validos
+        }
+
+        resumo = self.resumo_ciclo
+        resumo.contar("linhas", len(diff.linhas_alteradas))
+        self.metricas.contar("linhas_alteradas", len(diff.linhas_alteradas))
+        inicio_normalizacao = time.perf_counter()
+        for idx, codigo, nome, status, regime_tributario in diff.linhas_alteradas:
+            status_bruto = status.upper()
+            regime_bruto = regime_tributario.upper()
 
-            # === PARA HORÁRIOS ESPECÍFICOS (COMENTADO) ===
-            # Descomente a linha abaixo e comente o asyncio.sleep(150) acima para usar horários
-            # await asyncio.sleep(300)  # Verifica a cada 5 minutos se está na hora de executar
+            # Normaliza os valores
+            status = normalizar_status(status_bruto)
+            regime_tributario = normalizar_regime(regime_bruto)
+
+            # Conta as normalizações (detalhe por linha só em DEBUG, amostrado)
+            if status != status_bruto:
+                resumo.detalhe("status_normalizado", "Status normalizado: '%s' -> '%s' (%s)", status_bruto, status, codigo)
+            if regime_tributario != regime_bruto:
+                resumo.detalhe("regime_normalizado", "Regime normalizado: '%s' -> '%s' (%s)", regime_bruto, regime_tributario, codigo)
+
+            # PROTEÇÃO: Se a empresa já existe e tinha regime, mas agora veio vazio da planilha
+            # mantém o regime anterior (leitura temporária incompleta do Sheets)
+            if codigo in self.sheet_data:
+                dados_anterior = self.sheet_data[codigo]
+                regime_anterior = dados_anterior.get("regime_tributario", "") if isinstance(dados_anterior, dict) else ""
+
+                # Se tinha regime antes e agora veio vazio, mantém o anterior
+                if regime_anterior and not regime_tributario:
+                    resumo.detalhe(
+                        "regime_vazio", "Regime vazio detectado temporariamente para %s - %s (era %s). Mantendo regime anterior.",
+                        codigo, nome, regime_anterior, nivel=logging.WARNING
+                    )
+                    regime_tributario = regime_anterior
 
+            # Armazena em formato de dicionário (valores normalizados)
+            # Permite regime vazio para empresas novas sem regime ainda definido
+            novos_dados[codigo] = {
+                "nome": nome,
+                "status": status,
+                "regime_tributario": regime_tributario if regime_tributario else ""
+            }
+
+            # Verifica alterações ou novas empresas
+            if codigo in self.sheet_data:
+                dados_anterior = self.sheet_data[codigo]
+                status_anterior = dados_anterior.get("status") if isinstance(dados_anterior, dict) else dados_anterior
+                regime_anterior = dados_anterior.get("regime_tributario", "") if isinstance(dados_anterior, dict) else ""
+
+                # Diferença causada só pelas regras de normalização (regras recarregadas, ou estado
+                # salvo por uma versão anterior): atualiza o estado sem histórico nem notificação
+                so_regras = codigo in diff.codigos_inalterados
+
+                # Verifica mudança de status
+                if status != status_anterior and (so_regras or so_regras_mudaram(status_anterior, status, normalizar_status)):
+                    resumo.detalhe(
+                        "status_migrado", "Status salvo atualizado pelas regras de normalização: %s (%s -> %s)",
+                        codigo, status_anterior, status
+                    )
+                elif status != status_anterior:
+                    resumo.detalhe(
+                        "alteracao_status", "Alteração detectada na linha %s: %s - %s (%s -> %s)",
+                        idx, codigo, nome, status_anterior, status
+                    )
+
+                    # Registra alteração no histórico
+                    self.registrar_alteracao(
+                        tipo="status",
+                        codigo=codigo,
+                        nome=nome,
+                        valor_anterior=status_anterior,
+                        valor_novo=status
+                    )
+
+                    # Notifica sobre status monitorado (problema)
+                    if eh_status_monitorado(status):
+                        self.notificar(self.montar_mensagem, codigo, nome, status)
+                        # Registra empresa suspensa para relatório semanal
+                        if status == "SUSPENSA":
+                            self.registrar_empresa_suspensa(codigo, nome)
+                    # Notifica quando volta a ficar ATIVA (resolução)
+                    elif status.upper() == "ATIVA" and eh_status_monitorado(status_anterior):
+                        self.notificar(self.montar_mensagem_reativacao, codigo, nome, status_anterior)
+                    else:
+                        resumo.detalhe("status_sem_notificacao", "Status não requer notificação: %s (%s)", status, codigo)
+
+                # Verifica mudança de regime tributário
+                regime_anterior_valido = regime_anterior if regime_anterior else ""
+                regime_novo_valido = regime_tributario if regime_tributario else ""
+
+                if regime_novo_valido != regime_anterior_valido:
+                    if regime_anterior_valido and regime_novo_valido and (
+                            so_regras or so_regras_mudaram(regime_anterior_valido, regime_novo_valido, normalizar_regime)):
+                        resumo.detalhe(
+                            "regime_migrado", "Regime salvo atualizado pelas regras de normalização: %s (%s -> %s)",
+                            codigo, regime_anterior_valido, regime_novo_valido
+                        )
+                    elif regime_anterior_valido and regime_novo_valido:
+                        # Mudança de regime (já tinha um regime antes e tem um novo diferente)
+                        resumo.detalhe(
+                            "alteracao_regime", "Alteração de regime tributário na linha %s: %s - %s (%s -> %s)",
+                            idx, codigo, nome, regime_anterior_valido, regime_novo_valido
+                        )
+
+                        # Registra alteração no histórico
+                        self.registrar_alteracao(
+                            tipo="regime_tributario",
+                            codigo=codigo,
+                            nome=nome,
+                            valor_anterior=regime_anterior_valido,
+                            valor_novo=regime_novo_valido
+                        )
+
+                        # NÃO notifica mudança de regime se o status atual for negativo
+                        if self.primeiro_carregamento_completo:
+                            if eh_status_monitorado(status):
+                                resumo.detalhe(
+                                    "regime_sem_notificacao", "Mudança de regime com status negativo (%s): registrando sem notificar Discord (%s)",
+                                    status, codigo
+                                )
+                            else:
+                                self.notificar(self.montar_mensagem_regime_tributario, codigo, nome, regime_anterior_valido, regime_novo_valido)
+                    elif regime_novo_valido and not regime_anterior_valido:
+                        # Regime definido pela primeira vez (empresa já existia, mas sem regime)
+                        resumo.detalhe(
+                            "regime_definido", "Regime tributário definido na linha %s: %s - %s (Regime: %s)",
+                            idx, codigo, nome, regime_novo_valido
+                        )
+
+                        # Registra no histórico
+                        self.registrar_alteracao(
+                            tipo="regime_tributario",
+                            codigo=codigo,
+                            nome=nome,
+                            valor_anterior="Não definido",
+                            valor_novo=regime_novo_valido
+                        )
+
+                        # NÃO notifica definição de regime se o status atual for negativo
+                        if self.primeiro_carregamento_completo:
+                            if eh_status_monitorado(status):
+                                resumo.detalhe(
+                                    "regime_sem_notificacao", "Regime definido com status negativo (%s): registrando sem notificar Discord (%s)",
+                                    status, codigo
+                                )
+                            else:
+                                self.notificar(self.montar_mensagem_regime_definido, codigo, nome, regime_novo_valido)
+            else:
+                # Nova empresa detectada
+                resumo.detalhe(
+                    "nova_empresa", "Nova empresa detectada na linha %s: %s - %s (Status: %s, Regime: %s)",
+                    idx, codigo, nome, status, regime_tributario if regime_tributario else "Não definido"
+                )
+
+                # Só envia notificação se não for o primeiro carregamento E se o status NÃO for negativo
+                if self.primeiro_carregamento_completo:
+                    # NÃO notifica empresas novas com status negativo
+                    # Empresas já criadas inativas/baixas/devolvidas/suspensas não precisam de notificação
+                    if eh_status_monitorado(status):
+                        resumo.detalhe(
+                            "nova_sem_notificacao", "Nova empresa com status negativo (%s): registrando sem notificar Discord (%s)",
+                            status, codigo
+                        )
+                    else:
+                        # Notifica apenas empresas novas com status ATIVA
+                        self.notificar(self.montar_mensagem_nova_empresa, codigo, nome, status, regime_tributario)
+
+        self.metricas.registrar_etapa("normalizacao", time.perf_counter() - inicio_normalizacao)
+        self.metricas.contar("alteracoes", sum(
+            resumo.contagem[categoria]
+            for categoria in ("alteracao_status", "alteracao_regime", "regime_definido", "nova_empresa")
+        ))
+
+        # Uma linha por ciclo com as contagens por categoria
+        texto_resumo = resumo.fechar()
+        logger.info(f"Resumo do ciclo: {texto_resumo}")
+
+        self.relatar_valores_sem_regra()
+
+        # Envia as notificações do ciclo agrupadas (modo resumo) e espera a fila esvaziar:
+        # o estado só é confirmado depois da entrega, senão uma queda perderia as notificações
+        with self.metricas.etapa("notificacao"):
+            self.despachar_resumo()
+            await self.despachante.aguardar()
+        # Grava em disco (um único fsync) as alterações registradas no ciclo
+        with self.metricas.etapa("persistencia"):
+            await self.salvar_historico()
+
+        # FIM DO LOOP - Atualiza dados salvos APÓS processar TODAS as linhas
+        # PROTEÇÃO: Não salva se os dados novos forem muito menores que os anteriores
+        # (indica leitura incompleta/erro de conexão)
+        dados_anteriores_count = len(self.sheet_data)
+        dados_novos_count = len(novos_dados)
+
+        if dados_anteriores_count > 0 and dados_novos_count < dados_anteriores_count * 0.5:
+            # Se os novos dados têm menos de 50% dos anteriores, provavelmente houve erro
+            logger.warning(f"PROTEÇÃO ATIVADA: Dados novos ({dados_novos_count}) muito menores que anteriores ({dados_anteriores_count}). NÃO salvando estado.")
+            # Não atualiza self.sheet_data nem salva
+            return False
+
+        # Atualiza os índices apenas com as empresas alteradas ou removidas
+        removidos = self.sheet_data.keys() - novos_dados.keys()
+        for codigo in removidos:
+            self.indice.remover(codigo)
+            for valores in self.valores_sem_regra.values():
+                valores.remover(codigo)
+        alterados = {}
+        for _, codigo, _, status_bruto, regime_bruto in diff.linhas_alteradas:
+            self.valores_sem_regra["status"].atualizar(codigo, status_bruto.upper())
+            self.valores_sem_regra["regime"].atualizar(codigo, regime_bruto.upper())
+            # Linhas reprocessadas sem mudança nos valores normalizados não são regravadas
+            if novos_dados[codigo] == self.sheet_data.get(codigo):
+                continue
+            alterados[codigo] = novos_dados[codigo]
+            self.indice.atualizar(codigo, novos_dados[codigo])
+
+        # Grava antes de adotar a leitura. Se a gravação falhar, o ciclo é adotado mesmo assim
+        # (as notificações e o histórico já foram registrados; reprocessar duplicaria tudo)
+        # e as empresas não gravadas ficam pendentes para a próxima gravação
+        salvo = await self.salvar_estado(alterados, removidos)
+        self.sheet_data = novos_dados
+        self.motor_diff.confirmar(diff)
+        self.detector_alteracoes.confirmar(marcador)
+        self.reprocessar_tudo = False
+
+        # Se for a primeira carga, marca como completa APÓS salvar tudo
+        if salvo and not self.primeiro_carregamento_completo:
+            marcar_primeiro_carregamento()
+            self.primeiro_carregamento_completo = True
+
+        return houve_alteracao
 
     # === Funções auxiliares ===
-    def _proxima_verificacao(self, hora_atual):
-        """Calcula o horário da próxima verificação."""
-        HORARIOS_VERIFICACAO = [9, 11, 13, 15]
-        for hora in HORARIOS_VERIFICACAO:
-            if hora > hora_atual:
-                return f"{hora:02d}:00"
-        # Se passou de todas as horas de hoje, retorna a primeira de amanhã
-        return "09:00 (amanhã)"
+    def notificar(self, montar, *args):
+        """Monta uma notificação e a enfileira (ou acumula no resumo); o envio acontece em paralelo às demais linhas."""
+        notificacao = montar(*args)
+        if self.resumo is not None:
+            self.resumo.adicionar(notificacao)
+        else:
+            self.despachante.enfileirar(self._enviar_notificacao, notificacao)
+
+    def despachar_resumo(self, forcar=False):
+        """Enfileira as notificações acumuladas, uma leva por canal, se a janela do resumo terminou."""
+        if self.resumo is None or not self.resumo.pendentes:
+            return
+        if not forcar and not self.resumo.pronto():
+            return
+        for canal_id, notificacoes in self.resumo.retirar().items():
+            if len(notificacoes) == 1:
+                self.despachante.enfileirar(self._enviar_notificacao, notificacoes[0])
+            else:
+                self.despachante.enfileirar(self._enviar_resumo, canal_id, notificacoes, quantidade=len(notificacoes))
+
+    async def _enviar_notificacao(self, notificacao):
+        """Envia uma notificação em uma mensagem. Retorna (mensagens, notificações) enviadas."""
+        canal = self.get_channel(notificacao.canal_id)
+        if not canal:
+            raise CanalNaoEncontrado(f"canal {notificacao.canal_nome} não encontrado (notificação: {notificacao.resumo})")
+        await self.despachante.enviar(canal, "@everyone", embed=notificacao.embed)
+        logger.info(f"Mensagem enviada ({notificacao.canal_nome}): {notificacao.tipo} - {notificacao.resumo}")
+        return 1, 1
+
+    async def _enviar_resumo(self, canal_id, notificacoes):
+        """
+        Envia várias notificações de um canal em poucas mensagens (até 10 embeds cada).
+
+        Retorna (mensagens, notificações) enviadas.
+        """
+        canal = self.get_channel(canal_id)
+        canal_nome = notificacoes[0].canal_nome
+        if not canal:
+            raise CanalNaoEncontrado(f"canal {canal_nome} não encontrado ({len(notificacoes)} notificações)")
+
+        if len(notificacoes) > NOTIFICACOES_RESUMO_LIMITE_ARQUIVO:
+            # Muitas alterações: um embed com as contagens e a lista completa em anexo
+            contagem = {}
+            for n in notificacoes:
+                contagem[n.tipo] = contagem.get(n.tipo, 0) + 1
+
+            embed = discord.Embed(
+                title="Resumo de Alterações - Empresas",
+                description=f"**{len(notificacoes)}** alterações detectadas. A lista completa está no arquivo anexo.",
+                color=0x2196F3
+            )
+            for tipo, total in sorted(contagem.items(), key=lambda item: -item[1]):
+                embed.add_field(name=tipo, value=str(total), inline=True)
+            embed.add_field(name="Data/Hora", value=self.ultima_verificacao, inline=False)
+            embed.set_footer(text="Canella & Santos • Comunicação Interna")
+
+            linhas = [f"{n.tipo}: {n.resumo}" for n in notificacoes]
+            arquivo = discord.File(
+                io.BytesIO("\n".join(linhas).encode("utf-8")),
+                filename=f"alteracoes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            )
+            await self.despachante.enviar(canal, "@everyone", embed=embed, file=arquivo)
+            mensagens = 1
+        else:
+            lotes = agrupar_embeds([n.embed for n in notificacoes])
+            for num, lote in enumerate(lotes):
+                # Menciona @everyone apenas na primeira mensagem do resumo
+                await self.despachante.enviar(canal, "@everyone" if num == 0 else None, embeds=lote)
+            mensagens = len(lotes)
+
+        logger.info(f"Resumo enviado ({canal_nome}): {len(notificacoes)} notificações em {mensagens} mensagem(ns)")
+        return mensagens, len(notificacoes)
+
+    def relatar_valores_sem_regra(self):
+        """Registra, com a contagem, os valores de status/regime do ciclo que não casaram com nenhuma regra."""
+        for normalizador in (NORMALIZADOR_STATUS, NORMALIZADOR_REGIME):
+            for chave, (total, variantes) in normalizador.fechar_ciclo().items():
+                logger.warning(
+                    f"Valor de {normalizador.nome} sem regra de normalização: '{chave}' "
+                    f"({total}x; variantes: {', '.join(repr(v) for v in variantes)})"
+                )
+
+    async def _buscar_planilha(self):
+        """Lê as colunas mapeadas da planilha sem bloquear o loop de eventos."""
+        return await asyncio.to_thread(self.leitor.ler, self.fonte)
+
+    async def _aguardar_proximo_ciclo(self, houve_alteracao):
+        """Registra o resultado do ciclo no agendador e aguarda o próximo intervalo."""
+        # Resumos com janela de tempo podem vencer em ciclos sem alterações
+        self.despachar_resumo()
+        self.agendador.registrar_ciclo(houve_alteracao)
+        intervalo = self.agendador.proximo_intervalo()
+        logger.info(f"Próxima verificação em {intervalo:.0f}s")
+        await asyncio.sleep(intervalo)
 
     def carregar_estado(self):
-        caminho = DATA_DIR / "estado_empresas.json"
-        if caminho.exists():
+        """Carrega o estado das empresas do banco SQLite (migrando o JSON antigo, se existir)."""
+        try:
+            # Backups soltos de versões anteriores vão para o repositório deduplicado
+            importados = self.backups.importar_legados()
+            if importados:
+                logger.info(f"{importados} backups antigos importados para o repositório de backups.")
+
+            # Banco corrompido (ex: disco cheio, cópia interrompida): volta ao backup válido mais recente
+            if self.estado.caminho.exists() and not self.estado.verificar():
+                self._restaurar_estado_do_backup()
+
             try:
-                with open(caminho, "r", encoding="utf-8") as f:
-                    dados = json.load(f)
-                    ultima_verificacao = dados.get("ultima_verificacao", "Nunca")
-                    registros = dados.get("registros", {})
-                    print(f"Estado carregado ({len(registros)} registros).")
-                    print(f"Última verificação: {ultima_verificacao}")
-                    return registros
-            except Exception as e:
-                print(f"Erro ao carregar estado: {e}")
-        print("Nenhum estado salvo encontrado. Criando novo...")
+                migrados = self.estado.migrar_json(DATA_DIR / "estado_empresas.json")
+            except ArquivoCorrompido as e:
+                logger.error(f"Estado antigo (JSON) corrompido: {e}")
+                migrados = 0
+                self._restaurar_estado_do_backup()
+            if migrados:
+                logger.info(f"Estado antigo (JSON) migrado para SQLite ({migrados} registros).")
+
+            registros = self.estado.carregar()
+            # Se o bot caiu entre gravar o estado e o delta, o diário recomeça de uma nova base
+            self.diario_estado.conferir(registros)
+            if registros:
+                logger.info(f"Estado carregado ({len(registros)} registros). Última verificação: {self.estado.ultima_verificacao() or 'Nunca'}")
+                return registros
+        except Exception as e:
+            logger.error(f"Erro ao carregar estado: {e}")
+            # Sem estado confiável, a próxima leitura é tratada como primeira carga
+            # (recria o estado sem notificar todas as empresas como novas)
+            self.primeiro_carregamento_completo = False
+            logger.warning("Estado indisponível: a próxima verificação será uma carga completa sem notificações.")
+        logger.info("Nenhum estado salvo encontrado. Criando novo...")
         return {}
 
-    async def salvar_estado(self, dados):
-        """Salva o estado em arquivo de forma assíncrona."""
-        caminho = DATA_DIR / "estado_empresas.json"
+    def _restaurar_estado_do_backup(self):
+        """Recria o banco de estado a partir do diário (ou, sem ele, do backup completo mais recente)."""
+        try:
+            registros = self.diario_estado.estado_em()
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir o estado pelo diário: {e}")
+            registros = None
+        origem = "diário de estado"
+
+        if registros is None:
+            # Versões completas guardadas antes do diário existir
+            for versao in self.backups.versoes(NOME_BACKUP):
+                try:
+                    registros = decodificar(self.backups.ler(versao))
+                    origem = f"backup de {versao['data']}"
+                    break
+                except Exception as e:
+                    logger.warning(f"Backup de estado inválido ignorado ({versao['data']}): {e}")
+
+        if registros is None:
+            raise RuntimeError("estado corrompido e nenhum backup válido encontrado")
+        self.estado.recriar(registros)
+        logger.warning(f"Estado restaurado a partir do {origem} ({len(registros)} registros)")
+
+    def _fazer_backup(self):
+        """Registra no repositório o histórico de suspensas (só se o conteúdo mudou) e aplica a retenção."""
+        novos = 0
+        historico_suspensas = DATA_DIR / "historico_suspensas.json"
+        if historico_suspensas.exists() and self.backups.salvar(historico_suspensas.name, historico_suspensas.read_bytes()):
+            novos += 1
+        removidos = self.backups.aplicar_retencao()
+        return novos, removidos
+
+    async def salvar_estado(self, alterados, removidos=()):
+        """
+        Grava apenas as empresas alteradas/removidas no banco, de forma assíncrona.
+
+        Retorna True se a gravação foi feita. Se falhar, as empresas ficam pendentes
+        e entram na gravação seguinte (cada ciclo grava só o que mudou nele).
+        """
+        # Soma o que ficou pendente de uma gravação anterior que falhou
+        if self.estado_pendente or self.estado_pendente_removidos:
+            pendentes = {c: d for c, d in self.estado_pendente.items() if c not in removidos}
+            pendentes.update(alterados)
+            removidos = (self.estado_pendente_removidos - pendentes.keys()) | set(removidos)
+            alterados = pendentes
 
         def _salvar():
-            estado_completo = {
-                "ultima_verificacao": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
-                "registros": dados
-            }
-            with open(caminho, "w", encoding="utf-8") as f:
-                json.dump(estado_completo, f, indent=4, ensure_ascii=False)
+            with self.metricas.etapa("persistencia"):
+                ultima_verificacao = self.estado.aplicar(alterados, removidos)
+                # Delta do ciclo no diário (o estado completo só é lido ao iniciar uma nova base)
+                self.diario_estado.registrar(alterados, removidos, self.estado.carregar)
 
-            # Backup automático
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = BACKUPS_DIR / f"estado_empresas_backup_{timestamp}.json"
-            shutil.copy(caminho, backup_path)
-            return estado_completo, backup_path
+            # Backup automático (no máximo um a cada INTERVALO_BACKUP_ESTADO segundos)
+            backup = None
+            agora = datetime.now()
+            if (self.ultimo_backup_estado is None
+                    or (agora - self.ultimo_backup_estado).total_seconds() >= INTERVALO_BACKUP_ESTADO):
+                with self.metricas.etapa("backup"):
+                    backup = self._fazer_backup()
+                self.ultimo_backup_estado = agora
+            return ultima_verificacao, backup
+
+        if not alterados and not removidos:
+            return True
 
         try:
-            estado_completo, backup_path = await asyncio.to_thread(_salvar)
-            print(f"Estado salvo com sucesso em {estado_completo['ultima_verificacao']}")
-            logger.info(f"Estado salvo com sucesso. Backup: {backup_path}")
+            ultima_verificacao, backup = await asyncio.to_thread(_salvar)
         except Exception as e:
-            print(f"Erro ao salvar estado: {e}")
-            logger.error(f"Erro ao salvar estado: {e}")
+            self.estado_pendente = alterados
+            self.estado_pendente_removidos = set(removidos)
+            logger.error(f"Erro ao salvar estado ({len(alterados)} alterados, {len(removidos)} removidos pendentes): {e}")
+            return False
+
+        self.estado_pendente = {}
+        self.estado_pendente_removidos = set()
+        mensagem = f"Estado salvo com sucesso em {ultima_verificacao} ({len(alterados)} alterados, {len(removidos)} removidos)"
+        if backup:
+            mensagem += f". Backup: {backup[0]} nova(s) versão(ões), {backup[1]} removida(s) pela retenção"
+        logger.info(mensagem)
+        return True
 
     def carregar_historico(self):
-        """Carrega o histórico de alterações mensal."""
-        caminho = DATA_DIR / "historico_alteracoes.json"
-        if caminho.exists():
-            try:
-                with open(caminho, "r", encoding="utf-8") as f:
-                    historico = json.load(f)
-                    print(f"Histórico carregado ({len(historico)} competências).")
-                    logger.info(f"Histórico carregado ({len(historico)} competências).")
-                    return historico
-            except Exception as e:
-                print(f"Erro ao carregar histórico: {e}")
-                logger.error(f"Erro ao carregar histórico: {e}")
-        return {}
+        """Carrega o histórico de alterações mensal (arquivos por competência + log)."""
+        try:
+            historico = self.log_alteracoes.carregar(caminho_legado=DATA_DIR / "historico_alteracoes.json")
+            logger.info(f"Histórico carregado ({len(historico)} competências).")
+            return historico
+        except Exception as e:
+            logger.error(f"Erro ao carregar histórico: {e}")
+        return self.log_alteracoes.historico
 
     async def salvar_historico(self):
-        """Salva o histórico de alterações de forma assíncrona."""
-        caminho = DATA_DIR / "historico_alteracoes.json"
+        """Sincroniza os logs de alterações e de suspensas e os compacta quando necessário."""
 
-        def _salvar():
-            with open(caminho, "w", encoding="utf-8") as f:
-                json.dump(self.historico_alteracoes, f, indent=4, ensure_ascii=False)
+        def _sincronizar():
+            self.historico_suspensas.sincronizar()
+            self.log_alteracoes.sincronizar()
 
         try:
-            await asyncio.to_thread(_salvar)
-            logger.info("Histórico salvo com sucesso.")
+            await asyncio.to_thread(_sincronizar)
+            if self.log_alteracoes.precisa_compactar():
+                # Retrato e contabilidade no loop (onde os comandos leem o histórico); só a gravação em thread
+                compactacao = self.log_alteracoes.preparar_compactacao()
+                try:
+                    await asyncio.to_thread(self.log_alteracoes.gravar_compactacao, compactacao)
+                except Exception:
+                    self.log_alteracoes.cancelar_compactacao(compactacao)
+                    raise
+                self.log_alteracoes.concluir_compactacao(compactacao)
+                logger.info("Histórico compactado com sucesso.")
+            if self.historico_suspensas.precisa_compactar():
+                self.salvar_historico_suspensas()
         except Exception as e:
-            print(f"Erro ao salvar histórico: {e}")
             logger.error(f"Erro ao salvar histórico: {e}")
 
     def carregar_historico_suspensas(self):
-        """Carrega o histórico de empresas suspensas por semana."""
-        caminho = DATA_DIR / "historico_suspensas.json"
-        if caminho.exists():
-            try:
-                with open(caminho, "r", encoding="utf-8") as f:
-                    historico = json.load(f)
-                    print(f"Histórico de suspensas carregado ({len(historico)} semanas).")
-                    logger.info(f"Histórico de suspensas carregado ({len(historico)} semanas).")
-                    return historico
-            except Exception as e:
-                print(f"Erro ao carregar histórico de suspensas: {e}")
-                logger.error(f"Erro ao carregar histórico de suspensas: {e}")
-        return {}
-
-    async def salvar_historico_suspensas(self):
-        """Salva o histórico de empresas suspensas de forma assíncrona."""
-        caminho = DATA_DIR / "historico_suspensas.json"
-
-        def _salvar():
-            with open(caminho, "w", encoding="utf-8") as f:
-                json.dump(self.historico_suspensas, f, indent=4, ensure_ascii=False)
-
+        """Carrega o histórico de empresas suspensas por semana (arquivo completo + log)."""
         try:
-            await asyncio.to_thread(_salvar)
-            logger.info("Histórico de suspensas salvo com sucesso.")
+            # Valida o checksum e, se o arquivo estiver corrompido, usa o backup válido mais recente
+            origem = self.historico_suspensas.carregar()
+            if origem is not None and origem != self.historico_suspensas.caminho:
+                logger.warning(f"Histórico de suspensas restaurado do {origem}")
+            logger.info(f"Histórico de suspensas carregado ({len(self.historico_suspensas)} semanas).")
         except Exception as e:
-            print(f"Erro ao salvar histórico de suspensas: {e}")
-            logger.error(f"Erro ao salvar histórico de suspensas: {e}")
+            logger.error(f"Erro ao carregar histórico de suspensas: {e}")
+
+    def salvar_historico_suspensas(self):
+        """Agenda a regravação do arquivo completo de suspensas, que absorve o log acumulado."""
+        self.persistencia.marcar("historico_suspensas.json")
 
     def _obter_semana_ano(self, data=None):
         """Retorna a chave da semana no formato YYYY-WNN (ex: 2025-W01)."""
@@ -713,44 +1066,24 @@ class MyBot(discord.Client):
         agora = datetime.now()
         semana = self._obter_semana_ano(agora)
 
-        if semana not in self.historico_suspensas:
-            self.historico_suspensas[semana] = {
-                "empresas": [],
-                "total": 0
-            }
-
-        # Verifica se a empresa já foi registrada nesta semana
-        empresas_codigos = [e["codigo"] for e in self.historico_suspensas[semana]["empresas"]]
-        if codigo not in empresas_codigos:
-            self.historico_suspensas[semana]["empresas"].append({
-                "codigo": codigo,
-                "nome": nome,
-                "data_hora": agora.strftime("%d/%m/%Y %H:%M:%S")
-            })
-            self.historico_suspensas[semana]["total"] += 1
-
-            # Agenda o salvamento do histórico (não bloqueia)
-            asyncio.create_task(self.salvar_historico_suspensas())
+        # Verifica (em O(1)) se a empresa já foi registrada nesta semana; o registro vai
+        # para o log, com fsync em lote ao final do ciclo (veja salvar_historico)
+        try:
+            registrada = self.historico_suspensas.registrar(semana, codigo, nome, agora.strftime("%d/%m/%Y %H:%M:%S"))
+        except Exception as e:
+            logger.error(f"Erro ao gravar empresa suspensa no histórico: {e}")
+            return
 
-            logger.info(f"Empresa suspensa registrada: {codigo} - {nome} (Semana: {semana})")
+        if registrada:
+            self.resumo_ciclo.detalhe("suspensa_registrada", "Empresa suspensa registrada: %s - %s (Semana: %s)", codigo, nome, semana)
         else:
-            logger.info(f"Empresa {codigo} já registrada como suspensa nesta semana ({semana})")
+            self.resumo_ciclo.detalhe("suspensa_repetida", "Empresa %s já registrada como suspensa nesta semana (%s)", codigo, semana)
 
     def registrar_alteracao(self, tipo, codigo, nome, valor_anterior, valor_novo):
         """Registra uma alteração no histórico mensal."""
         agora = datetime.now()
         competencia = agora.strftime("%Y-%m")  # Formato: 2025-01
 
-        if competencia not in self.historico_alteracoes:
-            self.historico_alteracoes[competencia] = {
-                "alteracoes": [],
-                "estatisticas": {
-                    "total_alteracoes": 0,
-                    "alteracoes_status": 0,
-                    "alteracoes_regime": 0
-                }
-            }
-
         alteracao = {
             "tipo": tipo,
             "codigo": codigo,
@@ -760,23 +1093,21 @@ class MyBot(discord.Client):
             "data_hora": agora.strftime("%d/%m/%Y %H:%M:%S")
         }
 
-        self.historico_alteracoes[competencia]["alteracoes"].append(alteracao)
-        self.historico_alteracoes[competencia]["estatisticas"]["total_alteracoes"] += 1
-
-        if tipo == "status":
-            self.historico_alteracoes[competencia]["estatisticas"]["alteracoes_status"] += 1
-        elif tipo == "regime_tributario":
-            self.historico_alteracoes[competencia]["estatisticas"]["alteracoes_regime"] += 1
+        self.historico_alteracoes.adicionar(competencia, alteracao)
 
-        # Agenda o salvamento do histórico (não bloqueia)
-        asyncio.create_task(self.salvar_historico())
+        # Acrescenta uma linha ao log; o fsync é feito em lote ao final do ciclo
+        try:
+            self.log_alteracoes.acrescentar(competencia, alteracao)
+        except Exception as e:
+            logger.error(f"Erro ao gravar alteração no histórico: {e}")
 
-        logger.info(f"Alteração registrada: {tipo} - {codigo} - {nome} (Competência: {competencia})")
+        self.resumo_ciclo.detalhe(
+            "historico", "Alteração registrada: %s - %s - %s (Competência: %s)", tipo, codigo, nome, competencia
+        )
 
     async def verificar_relatorio_mensal(self):
         """Verifica diariamente se deve enviar o relatório mensal."""
         await self.wait_until_ready()
-        print(f"Sistema de relatório mensal iniciado (Dia configurado: {DIA_RELATORIO_MENSAL}, Horário: 09:00)")
         logger.info(f"Sistema de relatório mensal iniciado (Dia configurado: {DIA_RELATORIO_MENSAL}, Horário: 09:00)")
 
         while not self.is_closed():
@@ -787,9 +1118,6 @@ class MyBot(discord.Client):
                 if agora.day == DIA_RELATORIO_MENSAL:
                     # Verifica se ainda não enviou hoje e se já são 9 horas da manhã
                     if self.ultimo_relatorio_enviado != agora.date() and agora.hour == 9:
-                        print(f"\n{'='*60}")
-                        print(f"Gerando relatório mensal automático...")
-                        print(f"{'='*60}")
                         logger.info("Gerando relatório mensal automático...")
 
                         # Envia relatório do mês anterior
@@ -799,14 +1127,9 @@ class MyBot(discord.Client):
                         await self.enviar_relatorio_mensal(competencia)
                         self.ultimo_relatorio_enviado = agora.date()
 
-                        print(f"{'='*60}")
-                        print(f"Relatório mensal enviado com sucesso!")
-                        print(f"Competência: {competencia}")
-                        print(f"{'='*60}\n")
                         logger.info(f"Relatório mensal enviado! Competência: {competencia}")
 
             except Exception as e:
-                print(f"Erro ao verificar relatório mensal: {e}")
                 logger.error(f"Erro ao verificar relatório mensal: {e}")
 
             # Verifica a cada 30 minutos (mais frequente para garantir que pega às 09:00)
@@ -815,7 +1138,6 @@ class MyBot(discord.Client):
     async def verificar_relatorio_semanal_suspensas(self):
         """Verifica se deve enviar o relatório semanal de empresas suspensas (toda segunda-feira às 08:30)."""
         await self.wait_until_ready()
-        print("Sistema de relatório semanal de suspensas iniciado (Segunda-feira às 08:30)")
         logger.info("Sistema de relatório semanal de suspensas iniciado (Segunda-feira às 08:30)")
 
         while not self.is_closed():
@@ -827,9 +1149,6 @@ class MyBot(discord.Client):
                     # Verifica se ainda não enviou hoje e se já são 8:30
                     if self.ultimo_relatorio_suspensas_enviado != agora.date():
                         if agora.hour == 8 and agora.minute >= 30:
-                            print(f"\n{'='*60}")
-                            print(f"Gerando relatório semanal de empresas suspensas...")
-                            print(f"{'='*60}")
                             logger.info("Gerando relatório semanal de empresas suspensas...")
 
                             # Envia relatório da semana anterior
@@ -838,14 +1157,9 @@ class MyBot(discord.Client):
                             await self.enviar_relatorio_semanal_suspensas(semana_anterior)
                             self.ultimo_relatorio_suspensas_enviado = agora.date()
 
-                            print(f"{'='*60}")
-                            print(f"Relatório semanal de suspensas enviado com sucesso!")
-                            print(f"Semana: {semana_anterior}")
-                            print(f"{'='*60}\n")
                             logger.info(f"Relatório semanal de suspensas enviado! Semana: {semana_anterior}")
 
             except Exception as e:
-                print(f"Erro ao verificar relatório semanal de suspensas: {e}")
                 logger.error(f"Erro ao verificar relatório semanal de suspensas: {e}")
 
             # Verifica a cada 15 minutos para garantir que pega às 08:30
@@ -857,11 +1171,9 @@ class MyBot(discord.Client):
 
         if not canal:
             logger.error("Canal de suspensas não encontrado para envio do relatório semanal")
-            print("ERRO: Canal de suspensas não encontrado")
             return
 
         if semana not in self.historico_suspensas:
-            print(f"Nenhuma empresa suspensa registrada para a semana {semana}")
             logger.info(f"Sem empresas suspensas para relatório: {semana}")
 
             # Envia mensagem informando que não houve suspensões
@@ -1115,14 +1427,12 @@ class MyBot(discord.Client):
             )
 
             logger.info(f"Relatório de suspensas em PDF enviado: {semana}")
-            print(f"Relatório de suspensas em PDF enviado: {pdf_filename}")
 
         except ImportError:
             logger.warning("ReportLab não instalado. Não foi possível gerar PDF de suspensas.")
             await canal.send("⚠️ PDF não disponível: ReportLab não instalado.")
         except Exception as e:
             logger.error(f"Erro ao gerar relatório de suspensas em PDF: {e}")
-            print(f"Erro ao gerar relatório de suspensas: {e}")
 
     async def enviar_relatorio_mensal(self, competencia):
         """Envia o relatório mensal de alterações."""
@@ -1130,11 +1440,9 @@ class MyBot(discord.Client):
 
         if not canal:
             logger.error("Canal do Discord não encontrado para envio do relatório mensal")
-            print("ERRO: Canal do Discord não encontrado")
             return
 
         if competencia not in self.historico_alteracoes:
-            print(f"Nenhuma alteração registrada para a competência {competencia}")
             logger.warning(f"Sem alterações para relatório: {competencia}")
 
             # Envia mensagem informando que não houve alterações
@@ -1147,21 +1455,10 @@ class MyBot(discord.Client):
             await canal.send("@everyone", embed=embed)
             return
 
-        dados = self.historico_alteracoes[competencia]
-        alteracoes = dados["alteracoes"]
-        stats = dados["estatisticas"]
-
-        # Formata a competência para exibição
-        data_comp = datetime.strptime(competencia, "%Y-%m")
-        mes_nome = data_comp.strftime("%B/%Y").upper()
-        mes_nome_pt = {
-            "JANUARY": "JANEIRO", "FEBRUARY": "FEVEREIRO", "MARCH": "MARÇO",
-            "APRIL": "ABRIL", "MAY": "MAIO", "JUNE": "JUNHO",
-            "JULY": "JULHO", "AUGUST": "AGOSTO", "SEPTEMBER": "SETEMBRO",
-            "OCTOBER": "OUTUBRO", "NOVEMBER": "NOVEMBRO", "DECEMBER": "DEZEMBRO"
-        }
-        for en, pt in mes_nome_pt.items():
-            mes_nome = mes_nome.replace(en, pt)
+        # Estatísticas e alterações por empresa vêm dos agregados do histórico
+        stats = self.historico_alteracoes.estatisticas(competencia)
+        empresas_alteradas = self.historico_alteracoes.empresas(competencia)
+        mes_nome = nome_competencia(competencia)
 
         # Cria o embed principal
         embed = discord.Embed(
@@ -1179,17 +1476,6 @@ class MyBot(discord.Client):
             inline=False
         )
 
-        # Agrupa alterações por empresa
-        empresas_alteradas = {}
-        for alt in alteracoes:
-            codigo = alt["codigo"]
-            if codigo not in empresas_alteradas:
-                empresas_alteradas[codigo] = {
-                    "nome": alt["nome"],
-                    "alteracoes": []
-                }
-            empresas_alteradas[codigo]["alteracoes"].append(alt)
-
         # Lista as empresas com alterações (limita a 10 no embed)
         empresas_texto = []
         for i, (codigo, dados_emp) in enumerate(empresas_alteradas.items()):
@@ -1197,7 +1483,7 @@ class MyBot(discord.Client):
                 empresas_texto.append(f"\n_... e mais {len(empresas_alteradas) - 10} empresas_")
                 break
 
-            num_alt = len(dados_emp["alteracoes"])
+            num_alt = dados_emp["alteracoes"]
             empresas_texto.append(f"**{codigo}** - {dados_emp['nome']} ({num_alt} alteração{'ões' if num_alt > 1 else ''})")
 
         if empresas_texto:
@@ -1212,43 +1498,20 @@ class MyBot(discord.Client):
         await canal.send("@everyone", embed=embed)
         logger.info(f"Relatório mensal enviado: {competencia}")
 
-        # Sempre gera e envia o PDF detalhado
-        await self.enviar_relatorio_detalhado(canal, competencia, alteracoes, empresas_alteradas)
+        # Sempre gera e envia o PDF detalhado (só ele precisa da lista de alterações)
+        alteracoes = self.historico_alteracoes[competencia]["alteracoes"]
+        await self.enviar_relatorio_detalhado(canal, competencia, alteracoes, agrupar_por_empresa(alteracoes))
 
     async def enviar_relatorio_anual(self, canal, ano, competencias_ano):
         """Envia o relatório anual consolidado de alterações."""
 
         if not canal:
             logger.error("Canal do Discord não encontrado para envio do relatório anual")
-            print("ERRO: Canal do Discord não encontrado")
             return
 
-        # Consolida dados de todas as competências do ano
-        total_alteracoes = 0
-        total_alteracoes_status = 0
-        total_alteracoes_regime = 0
-        todas_alteracoes = []
-        empresas_alteradas_ano = {}
-
-        for competencia in sorted(competencias_ano):
-            dados = self.historico_alteracoes[competencia]
-            stats = dados["estatisticas"]
-            alteracoes = dados["alteracoes"]
-
-            total_alteracoes += stats["total_alteracoes"]
-            total_alteracoes_status += stats["alteracoes_status"]
-            total_alteracoes_regime += stats["alteracoes_regime"]
-            todas_alteracoes.extend(alteracoes)
-
-            # Agrupa empresas
-            for alt in alteracoes:
-                codigo = alt["codigo"]
-                if codigo not in empresas_alteradas_ano:
-                    empresas_alteradas_ano[codigo] = {
-                        "nome": alt["nome"],
-                        "alteracoes": []
-                    }
-                empresas_alteradas_ano[codigo]["alteracoes"].append(alt)
+        # Agregado do ano (mantido a cada alteração registrada)
+        resumo_ano = self.historico_alteracoes.resumo_ano(ano)
+        stats_ano = resumo_ano["estatisticas"]
 
         # Cria o embed principal
         embed = discord.Embed(
@@ -1260,29 +1523,19 @@ class MyBot(discord.Client):
         # Estatísticas gerais
         embed.add_field(
             name="Estatísticas Gerais",
-            value=f"**Total de Alterações:** {total_alteracoes}\n"
-                  f"**Alterações de Status:** {total_alteracoes_status}\n"
-                  f"**Alterações de Regime:** {total_alteracoes_regime}\n"
-                  f"**Empresas Afetadas:** {len(empresas_alteradas_ano)}\n"
+            value=f"**Total de Alterações:** {stats_ano['total_alteracoes']}\n"
+                  f"**Alterações de Status:** {stats_ano['alteracoes_status']}\n"
+                  f"**Alterações de Regime:** {stats_ano['alteracoes_regime']}\n"
+                  f"**Empresas Afetadas:** {len(resumo_ano['empresas'])}\n"
                   f"**Meses com Alterações:** {len(competencias_ano)}",
             inline=False
         )
 
         # Resumo por mês
         resumo_meses = []
-        mes_nome_pt = {
-            "JANUARY": "JAN", "FEBRUARY": "FEV", "MARCH": "MAR",
-            "APRIL": "ABR", "MAY": "MAI", "JUNE": "JUN",
-            "JULY": "JUL", "AUGUST": "AGO", "SEPTEMBER": "SET",
-            "OCTOBER": "OUT", "NOVEMBER": "NOV", "DECEMBER": "DEZ"
-        }
-
         for competencia in sorted(competencias_ano):
-            dados = self.historico_alteracoes[competencia]
-            stats = dados["estatisticas"]
-            data_comp = datetime.strptime(competencia, "%Y-%m")
-            mes_nome = data_comp.strftime("%B").upper()
-            mes_abrev = mes_nome_pt.get(mes_nome, mes_nome[:3])
+            stats = self.historico_alteracoes.estatisticas(competencia)
+            mes_abrev = nome_competencia(competencia, abreviado=True)
 
             resumo_meses.append(f"**{mes_abrev}:** {stats['total_alteracoes']} alterações")
 
@@ -1308,15 +1561,9 @@ class MyBot(discord.Client):
                 )
 
         # Top 10 empresas com mais alterações
-        empresas_ordenadas = sorted(
-            empresas_alteradas_ano.items(),
-            key=lambda x: len(x[1]["alteracoes"]),
-            reverse=True
-        )
-
         top_empresas = []
-        for i, (codigo, dados_emp) in enumerate(empresas_ordenadas[:10]):
-            num_alt = len(dados_emp["alteracoes"])
+        for i, (codigo, dados_emp) in enumerate(self.historico_alteracoes.top_empresas(ano, 10)):
+            num_alt = dados_emp["alteracoes"]
             top_empresas.append(f"{i+1}. **{codigo}** - {dados_emp['nome'][:30]}... ({num_alt}x)")
 
         if top_empresas:
@@ -1331,8 +1578,13 @@ class MyBot(discord.Client):
         await canal.send("@everyone", embed=embed)
         logger.info(f"Relatório anual enviado: {ano}")
 
-        # Sempre gera e envia o PDF detalhado anual
-        await self.enviar_relatorio_anual_detalhado(canal, ano, todas_alteracoes, empresas_alteradas_ano, competencias_ano)
+        # Sempre gera e envia o PDF detalhado anual (só ele precisa da lista de alterações)
+        todas_alteracoes = []
+        for competencia in sorted(competencias_ano):
+            todas_alteracoes.extend(self.historico_alteracoes[competencia]["alteracoes"])
+        await self.enviar_relatorio_anual_detalhado(
+            canal, ano, todas_alteracoes, agrupar_por_empresa(todas_alteracoes), competencias_ano
+        )
 
     async def enviar_relatorio_detalhado(self, canal, competencia, alteracoes, empresas_alteradas):
         """Gera e envia relatório detalhado em PDF com todas as alterações."""
@@ -1344,16 +1596,7 @@ class MyBot(discord.Client):
             from reportlab.lib.units import cm
 
             # Formata a competência para exibição
-            data_comp = datetime.strptime(competencia, "%Y-%m")
-            mes_nome = data_comp.strftime("%B/%Y").upper()
-            mes_nome_pt = {
-                "JANUARY": "JANEIRO", "FEBRUARY": "FEVEREIRO", "MARCH": "MARÇO",
-                "APRIL": "ABRIL", "MAY": "MAIO", "JUNE": "JUNHO",
-                "JULY": "JULHO", "AUGUST": "AGOSTO", "SEPTEMBER": "SETEMBRO",
-                "OCTOBER": "OUTUBRO", "NOVEMBER": "NOVEMBRO", "DECEMBER": "DEZEMBRO"
-            }
-            for en, pt in mes_nome_pt.items():
-                mes_nome = mes_nome.replace(en, pt)
+            mes_nome = nome_competencia(competencia)
 
             # Cria o arquivo PDF
             pdf_filename = DATA_DIR / f"relatorio_detalhado_{competencia}.pdf"
@@ -1461,7 +1704,6 @@ class MyBot(discord.Client):
             )
 
             logger.info(f"Relatório detalhado em PDF enviado: {competencia}")
-            print(f"Relatório detalhado em PDF enviado: {pdf_filename}")
 
         except ImportError:
             # Se reportlab não estiver instalado, gera arquivo TXT como fallback
@@ -1469,7 +1711,6 @@ class MyBot(discord.Client):
             await self.enviar_relatorio_detalhado_txt(canal, competencia, alteracoes, empresas_alteradas)
         except Exception as e:
             logger.error(f"Erro ao gerar relatório detalhado em PDF: {e}")
-            print(f"Erro ao gerar relatório detalhado: {e}")
             # Tenta enviar em TXT como fallback
             try:
                 await self.enviar_relatorio_detalhado_txt(canal, competencia, alteracoes, empresas_alteradas)
@@ -1480,16 +1721,7 @@ class MyBot(discord.Client):
         """Gera e envia relatório detalhado em TXT (fallback quando PDF não disponível)."""
         try:
             # Formata a competência para exibição
-            data_comp = datetime.strptime(competencia, "%Y-%m")
-            mes_nome = data_comp.strftime("%B/%Y").upper()
-            mes_nome_pt = {
-                "JANUARY": "JANEIRO", "FEBRUARY": "FEVEREIRO", "MARCH": "MARÇO",
-                "APRIL": "ABRIL", "MAY": "MAIO", "JUNE": "JUNHO",
-                "JULY": "JULHO", "AUGUST": "AGOSTO", "SEPTEMBER": "SETEMBRO",
-                "OCTOBER": "OUTUBRO", "NOVEMBER": "NOVEMBRO", "DECEMBER": "DEZEMBRO"
-            }
-            for en, pt in mes_nome_pt.items():
-                mes_nome = mes_nome.replace(en, pt)
+            mes_nome = nome_competencia(competencia)
 
             # Cria o conteúdo do arquivo TXT
             txt_filename = DATA_DIR / f"relatorio_detalhado_{competencia}.txt"
@@ -1541,11 +1773,9 @@ class MyBot(discord.Client):
             )
 
             logger.info(f"Relatório detalhado em TXT enviado: {competencia}")
-            print(f"Relatório detalhado em TXT enviado: {txt_filename}")
 
         except Exception as e:
             logger.error(f"Erro ao gerar relatório detalhado em TXT: {e}")
-            print(f"Erro ao gerar relatório detalhado TXT: {e}")
 
     async def enviar_relatorio_anual_detalhado(self, canal, ano, alteracoes, empresas_alteradas, competencias):
         """Gera e envia relatório anual detalhado em PDF com todas as alterações do ano."""
@@ -1623,24 +1853,11 @@ class MyBot(discord.Client):
 
             # Resumo por mês
             elements.append(Paragraph("RESUMO POR MÊS", heading_style))
-            mes_nome_pt = {
-                "JANUARY": "JANEIRO", "FEBRUARY": "FEVEREIRO", "MARCH": "MARÇO",
-                "APRIL": "ABRIL", "MAY": "MAIO", "JUNE": "JUNHO",
-                "JULY": "JULHO", "AUGUST": "AGOSTO", "SEPTEMBER": "SETEMBRO",
-                "OCTOBER": "OUTUBRO", "NOVEMBER": "NOVEMBRO", "DECEMBER": "DEZEMBRO"
-            }
-
             resumo_data = [['Mês', 'Alterações', 'Status', 'Regime']]
             for competencia in sorted(competencias):
-                dados = self.historico_alteracoes[competencia]
-                stats = dados["estatisticas"]
-                data_comp = datetime.strptime(competencia, "%Y-%m")
-                mes_nome = data_comp.strftime("%B/%Y").upper()
-                for en, pt in mes_nome_pt.items():
-                    mes_nome = mes_nome.replace(en, pt)
-
+                stats = self.historico_alteracoes.estatisticas(competencia)
                 resumo_data.append([
-                    mes_nome,
+                    nome_competencia(competencia),
                     str(stats['total_alteracoes']),
                     str(stats['alteracoes_status']),
                     str(stats['alteracoes_regime'])
@@ -1718,24 +1935,23 @@ class MyBot(discord.Client):
             )
 
             logger.info(f"Relatório anual detalhado em PDF enviado: {ano}")
-            print(f"Relatório anual detalhado em PDF enviado: {pdf_filename}")
 
         except ImportError:
             logger.warning("ReportLab não instalado. Não foi possível gerar PDF anual.")
             await canal.send("⚠️ Erro: ReportLab não instalado. Instale com: `pip install reportlab`")
         except Exception as e:
             logger.error(f"Erro ao gerar relatório anual detalhado em PDF: {e}")
-            print(f"Erro ao gerar relatório anual detalhado: {e}")
             await canal.send(f"⚠️ Erro ao gerar relatório anual em PDF: {str(e)}")
 
-    async def enviar_mensagem(self, codigo, nome, status):
+    def montar_mensagem(self, codigo, nome, status):
+        """Monta a notificação de mudança para um status monitorado."""
         # Define o canal baseado no status
         # Empresas SUSPENSAS vão para o canal específico de suspensas
         if status == "SUSPENSA":
-            canal = self.get_channel(DISCORD_SUSPENSE_CHANNEL_ID)
+            canal_id = DISCORD_SUSPENSE_CHANNEL_ID
             canal_nome = "suspensas"
         else:
-            canal = self.get_channel(DISCORD_CHANNEL_ID)
+            canal_id = DISCORD_CHANNEL_ID
             canal_nome = "principal"
 
         # Cores para cada status
@@ -1766,12 +1982,10 @@ class MyBot(discord.Client):
 
         embed.set_footer(text="Canella & Santos • Comunicação Interna")
 
-        await canal.send("@everyone", embed=embed)
-        logger.info(f"Mensagem enviada ({canal_nome}): {codigo} - {nome} -> {status}")
-        print(f"Mensagem enviada ({canal_nome}): {codigo} - {nome} -> {status}")
+        return Notificacao(canal_id, canal_nome, embed, tipo="Status", resumo=f"{codigo} - {nome} -> {status}")
 
-    async def enviar_mensagem_nova_empresa(self, codigo, nome, status, regime_tributario=""):
-        canal = self.get_channel(DISCORD_CHANNEL_ID)
+    def montar_mensagem_nova_empresa(self, codigo, nome, status, regime_tributario=""):
+        """Monta a notificação de nova empresa cadastrada."""
         status_display = "ATIVA" if not eh_status_monitorado(status) else status
 
         embed = discord.Embed(
@@ -1785,19 +1999,20 @@ class MyBot(discord.Client):
         embed.add_field(name="\u200b", value="\u200b", inline=True)  # Campo vazio para padronizar
         embed.set_footer(text="Canella & Santos • Comunicação Interna")
 
-        await canal.send("@everyone", embed=embed)
-        logger.info(f"Mensagem de nova empresa enviada: {codigo} - {nome}")
-        print(f"Mensagem de nova empresa enviada: {codigo} - {nome} ({status_display})")
+        return Notificacao(
+            DISCORD_CHANNEL_ID, "principal", embed, tipo="Nova empresa",
+            resumo=f"{codigo} - {nome} ({status_display}, regime: {regime_tributario if regime_tributario else '—'})"
+        )
 
-    async def enviar_mensagem_reativacao(self, codigo, nome, status_anterior):
-        """Envia notificação quando empresa volta a ficar ATIVA."""
+    def montar_mensagem_reativacao(self, codigo, nome, status_anterior):
+        """Monta a notificação de empresa que voltou a ficar ATIVA."""
         # Define o canal baseado no status anterior
         # Reativações de empresas que estavam SUSPENSAS vão para o canal específico
         if status_anterior == "SUSPENSA":
-            canal = self.get_channel(DISCORD_SUSPENSE_CHANNEL_ID)
+            canal_id = DISCORD_SUSPENSE_CHANNEL_ID
             canal_nome = "suspensas"
         else:
-            canal = self.get_channel(DISCORD_CHANNEL_ID)
+            canal_id = DISCORD_CHANNEL_ID
             canal_nome = "principal"
 
         # Mapeamento de status anteriores
@@ -1834,13 +2049,10 @@ class MyBot(discord.Client):
         embed.add_field(name="\u200b", value="\u200b", inline=True)  # Campo vazio para padronizar
         embed.set_footer(text="Canella & Santos • Comunicação Interna")
 
-        await canal.send("@everyone", embed=embed)
-        logger.info(f"Mensagem de reativação enviada ({canal_nome}): {codigo} - {nome} ({status_anterior} -> ATIVA)")
-        print(f"Mensagem de reativação enviada ({canal_nome}): {codigo} - {nome} ({status_anterior} -> ATIVA)")
+        return Notificacao(canal_id, canal_nome, embed, tipo="Reativação", resumo=f"{codigo} - {nome} ({status_anterior} -> ATIVA)")
 
-    async def enviar_mensagem_regime_tributario(self, codigo, nome, regime_anterior, regime_novo):
-        """Envia notificação quando há mudança de regime tributário."""
-        canal = self.get_channel(DISCORD_CHANNEL_ID)
+    def montar_mensagem_regime_tributario(self, codigo, nome, regime_anterior, regime_novo):
+        """Monta a notificação de mudança de regime tributário."""
         
         # Mapeamento de regimes para descrição e cores
         regimes_map = {
@@ -1882,13 +2094,13 @@ class MyBot(discord.Client):
         embed.add_field(name="\u200b", value="\u200b", inline=True)  # Campo vazio para padronizar
         embed.set_footer(text="Canella & Santos • Comunicação Interna")
 
-        await canal.send("@everyone", embed=embed)
-        logger.info(f"Notificação de regime tributário enviada: {codigo} - {nome} ({regime_anterior} -> {regime_novo})")
-        print(f"Notificação de regime tributário: {codigo} - {nome} ({regime_anterior} -> {regime_novo})")
+        return Notificacao(
+            DISCORD_CHANNEL_ID, "principal", embed, tipo="Regime tributário",
+            resumo=f"{codigo} - {nome} ({regime_anterior} -> {regime_novo})"
+        )
 
-    async def enviar_mensagem_regime_definido(self, codigo, nome, regime_tributario):
-        """Envia notificação quando o regime tributário é definido pela primeira vez."""
-        canal = self.get_channel(DISCORD_CHANNEL_ID)
+    def montar_mensagem_regime_definido(self, codigo, nome, regime_tributario):
+        """Monta a notificação de regime tributário definido pela primeira vez."""
 
         # Mapeamento de regimes para descrição e cores
         regimes_map = {
@@ -1919,9 +2131,10 @@ class MyBot(discord.Client):
         embed.add_field(name="\u200b", value="\u200b", inline=True)
         embed.set_footer(text="Canella & Santos • Comunicação Interna")
 
-        await canal.send("@everyone", embed=embed)
-        logger.info(f"Notificação de regime definido enviada: {codigo} - {nome} (Regime: {regime_tributario})")
-        print(f"Notificação de regime definido: {codigo} - {nome} (Regime: {regime_tributario})")
+        return Notificacao(
+            DISCORD_CHANNEL_ID, "principal", embed, tipo="Regime definido",
+            resumo=f"{codigo} - {nome} (Regime: {regime_tributario})"
+        )
 
 
 # === COMANDOS MANUAIS ===
@@ -1997,6 +2210,25 @@ async def help_command(interaction: discord.Interaction):
         inline=False
     )
 
+    embed.add_field(
+        name="/backups",
+        value="Lista os backups guardados (apenas administradores)",
+        inline=False
+    )
+
+    embed.add_field(
+        name="/normalizacao",
+        value="Lista os valores de status/regime da planilha sem regra de normalização\n"
+              "* Regras no arquivo config/normalizacao.json (relido sem reiniciar o bot)",
+        inline=False
+    )
+
+    embed.add_field(
+        name="/metricas",
+        value="Mostra os tempos (p50/p95) de cada etapa e os contadores dos últimos ciclos de verificação",
+        inline=False
+    )
+
     embed.add_field(
         name="Notificações Automáticas",
         value="* Quando empresa fica INATIVA/BAIXA/DEVOLVIDA/SUSPENSA\n"
@@ -2042,6 +2274,17 @@ async def status(interaction: discord.Interaction):
         value="**Online**",
         inline=True
     )
+    contagem = bot.indice.contagem_status()
+    embed.add_field(
+        name="Status Monitorados",
+        value="\n".join(f"{st}: **{contagem.get(st, 0)}**" for st in STATUS_MONITORADOS_ORDEM),
+        inline=True
+    )
+    embed.add_field(
+        name="Intervalo de Verificação",
+        value=f"**{bot.agendador.descricao()}**",
+        inline=True
+    )
     embed.set_footer(text="Canella & Santos • Comunicação Interna")
 
     await interaction.response.send_message(embed=embed)
@@ -2115,12 +2358,10 @@ async def historico(interaction: discord.Interaction):
 
     # Lista as competências
     for competencia in competencias_ordenadas[:12]:  # Limita a 12 meses
-        dados = bot.historico_alteracoes[competencia]
-        stats = dados["estatisticas"]
+        stats = bot.historico_alteracoes.estatisticas(competencia)
 
-        # Formata a data
-        data_comp = datetime.strptime(competencia, "%Y-%m")
-        mes_nome = data_comp.strftime("%B/%Y")
+        # Nome do mês em português (calculado uma vez por competência)
+        mes_nome = nome_competencia(competencia).title()
 
         embed.add_field(
             name=f"{mes_nome}",
@@ -2155,10 +2396,7 @@ async def relatorio_anual(interaction: discord.Interaction, ano: int = None):
             ano = agora.year
 
         # Filtra as competências do ano solicitado
-        competencias_ano = [
-            comp for comp in bot.historico_alteracoes.keys()
-            if comp.startswith(f"{ano}-")
-        ]
+        competencias_ano = bot.historico_alteracoes.competencias_do_ano(ano)
 
         if not competencias_ano:
             await interaction.followup.send(
@@ -2263,31 +2501,17 @@ async def cmd_empresas_suspensas(interaction: discord.Interaction):
     await interaction.response.defer()  # Indica que o bot está processando
 
     try:
-        # Busca dados diretamente da planilha para ter código, nome, status e regime
-        data = await asyncio.to_thread(bot.sheet.get_all_values)
-
-        # Filtra empresas suspensas
+        # Consulta o índice de status mantido pelo monitor (sem acessar a planilha)
         empresas_suspensas_lista = []
-        for row in data[1:]:  # Pula o cabeçalho
-            if len(row) < 3:
-                continue
-
-            codigo = str(row[0]).strip()
-            nome = str(row[1]).strip()
-            status_bruto = str(row[2]).upper().strip()
-            regime_bruto = str(row[3]).upper().strip() if len(row) > 3 else ""
-
-            # Normaliza os valores
-            status = normalizar_status(status_bruto)
-            regime = normalizar_regime(regime_bruto)
-
-            if status == "SUSPENSA":
-                empresas_suspensas_lista.append({
-                    "codigo": codigo,
-                    "nome": nome,
-                    "status": status,
-                    "regime": regime if regime else "Não definido"
-                })
+        for codigo in bot.indice.codigos_com_status("SUSPENSA"):
+            dados = bot.sheet_data.get(codigo, {})
+            regime = dados.get("regime_tributario", "") if isinstance(dados, dict) else ""
+            empresas_suspensas_lista.append({
+                "codigo": codigo,
+                "nome": (dados.get("nome") if isinstance(dados, dict) else None) or "N/A",
+                "status": "SUSPENSA",
+                "regime": regime if regime else "Não definido"
+            })
 
         if not empresas_suspensas_lista:
             embed = discord.Embed(
@@ -2375,6 +2599,147 @@ async def cmd_empresas_suspensas(interaction: discord.Interaction):
         await interaction.followup.send(f"Erro ao listar empresas suspensas: {str(e)}")
         logger.error(f"Erro no comando /empresas-suspensas: {e}")
 
+def _formatar_bytes(tamanho):
+    for unidade in ("B", "KB", "MB", "GB"):
+        if tamanho < 1024 or unidade == "GB":
+            return f"{tamanho:.0f} {unidade}" if unidade == "B" else f"{tamanho:.1f} {unidade}"
+        tamanho /= 1024
+
+@bot.tree.command(name="backups", description="Lista os backups do estado e dos históricos (administradores)")
+@app_commands.default_permissions(administrator=True)
+async def cmd_backups(interaction: discord.Interaction):
+    """Lista as versões guardadas no repositório de backups, por arquivo."""
+    versoes = bot.backups.versoes()
+    if not versoes:
+        await interaction.response.send_message("Nenhum backup registrado ainda.", ephemeral=True)
+        return
+
+    uso_disco = bot.backups.uso_disco()
+    tamanho_original = sum(v["tamanho"] or 0 for v in versoes)
+
+    embed = discord.Embed(
+        title="Backups",
+        description=f"**{len(versoes)}** versões guardadas • **{_formatar_bytes(uso_disco)}** em disco "
+                    f"({_formatar_bytes(tamanho_original)} sem compressão/deduplicação)\n"
+                    f"Retenção: {bot.backups.horas}h por hora, {bot.backups.dias} dias por dia, "
+                    f"{bot.backups.meses} meses por mês • Compressão: {bot.backups.compressao}",
+        color=0x607D8B
+    )
+
+    por_nome = {}
+    for versao in versoes:
+        por_nome.setdefault(versao["nome"], []).append(versao)
+
+    for nome in sorted(por_nome)[:24]:
+        lista = por_nome[nome]
+        linhas = [
+            f"└ {datetime.strptime(v['data'], '%Y-%m-%dT%H:%M:%S').strftime('%d/%m/%Y %H:%M')} "
+            f"({_formatar_bytes(v['tamanho_comprimido'])})"
+            for v in lista[:5]
+        ]
+        if len(lista) > 5:
+            linhas.append(f"└ ... e mais {len(lista) - 5} versões")
+        embed.add_field(name=f"{nome} ({len(lista)})", value="\n".join(linhas), inline=False)
+
+    embed.set_footer(text="Canella & Santos • Versões idênticas não são duplicadas")
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+    logger.info(f"Comando /backups executado por {interaction.user}")
+
+@bot.tree.command(name="normalizacao", description="Valores de status/regime da planilha sem regra de normalização")
+async def cmd_normalizacao(interaction: discord.Interaction):
+    """Lista os valores brutos das empresas atuais que não casam com nenhuma regra do arquivo de normalização."""
+    regras = REGRAS_NORMALIZACAO
+    carregado_em = regras.carregado_em.strftime('%d/%m/%Y %H:%M:%S') if regras.carregado_em else "-"
+
+    embed = discord.Embed(
+        title="Normalização de Status e Regime",
+        description=f"Arquivo de regras: `{regras.caminho.name}` (carregado em {carregado_em})\n"
+                    f"**{len(regras.status.tabela)}** regras de status • **{len(regras.regime.tabela)}** regras de regime",
+        color=0x795548
+    )
+
+    if regras.ultimo_erro:
+        embed.add_field(
+            name="⚠️ Última recarga falhou (regras anteriores mantidas)",
+            value=regras.ultimo_erro[:1000],
+            inline=False
+        )
+
+    for normalizador in (regras.status, regras.regime):
+        sem_regra = bot.valores_sem_regra[normalizador.nome].resumo()
+        if not sem_regra:
+            valor = "Nenhum valor sem regra na planilha."
+        else:
+            linhas = []
+            for chave, (total, variantes) in list(sem_regra.items())[:10]:
+                exemplos = ", ".join(f"`{v}`" for v in variantes[:3])
+                if len(variantes) > 3:
+                    exemplos += f" e mais {len(variantes) - 3}"
+                linhas.append(f"└ **{chave}** ({total} empresa(s)): {exemplos}")
+            if len(sem_regra) > 10:
+                linhas.append(f"└ ... e mais {len(sem_regra) - 10} valores")
+            valor = "\n".join(linhas)[:1024]
+        embed.add_field(name=f"Sem regra de {normalizador.nome} ({len(sem_regra)})", value=valor, inline=False)
+
+    embed.set_footer(text="Canella & Santos • Edite o arquivo de regras; ele é relido no próximo ciclo")
+
+    await interaction.response.send_message(embed=embed)
+    logger.info(f"Comando /normalizacao executado por {interaction.user}")
+
+@bot.tree.command(name="metricas", description="Tempos (p50/p95) e contadores dos últimos ciclos de verificação")
+async def cmd_metricas(interaction: discord.Interaction):
+    """Mostra os percentis de tempo por etapa e os contadores dos ciclos guardados em memória."""
+    metricas = bot.metricas
+    if not metricas.ciclos:
+        await interaction.response.send_message("Nenhum ciclo de verificação concluído ainda.")
+        return
+
+    embed = discord.Embed(
+        title="Métricas dos Ciclos",
+        description=f"Últimos **{len(metricas.ciclos)}** ciclos (guardados até {metricas.ciclos.maxlen}) • "
+                    f"{sum(1 for c in metricas.ciclos if c.resultado == 'alterado')} com alterações • "
+                    f"{sum(1 for c in metricas.ciclos if c.resultado == 'erro')} com erro",
+        color=0x009688
+    )
+
+    rotulos = {
+        "total": "Ciclo completo",
+        "busca": "Busca da planilha",
+        "diff": "Comparação (diff)",
+        "normalizacao": "Normalização e alterações",
+        "notificacao": "Notificações (envio)",
+        "persistencia": "Persistência",
+        "backup": "Backup",
+    }
+    for etapa, (ciclos, p50, p95, maximo) in metricas.resumo_etapas().items():
+        embed.add_field(
+            name=rotulos.get(etapa, etapa),
+            value=f"p50 **{p50 * 1000:.0f} ms** • p95 **{p95 * 1000:.0f} ms**\n"
+                  f"└ máx {maximo * 1000:.0f} ms em {ciclos} ciclo(s)",
+            inline=True
+        )
+
+    contadores = metricas.contadores_buffer()
+    embed.add_field(
+        name="Contadores (ciclos acima)",
+        value=f"└ {contadores['linhas']} linhas lidas, {contadores['linhas_alteradas']} novas/alteradas\n"
+              f"└ {contadores['alteracoes']} alterações detectadas\n"
+              f"└ {contadores['notificacoes_enviadas']} notificações enviadas em {contadores['mensagens_enviadas']} mensagens, "
+              f"{contadores['notificacoes_falhas']} falhas\n"
+              f"└ {_formatar_bytes(contadores['bytes_gravados'])} gravados em arquivos de dados\n"
+              f"└ {contadores['reconexoes']} reconexões",
+        inline=False
+    )
+
+    rodape = "Canella & Santos • Tempos medidos a cada ciclo"
+    if metricas.arquivo_prometheus is not None:
+        rodape += f" • Prometheus: {metricas.arquivo_prometheus.name}"
+    embed.set_footer(text=rodape)
+
+    await interaction.response.send_message(embed=embed)
+    logger.info(f"Comando /metricas executado por {interaction.user}")
+
 async def enviar_pdf_empresas_suspensas_atuais(canal, empresas):
     """Gera e envia PDF com todas as empresas atualmente suspensas."""
     try:
@@ -2511,14 +2876,12 @@ async def enviar_pdf_empresas_suspensas_atuais(canal, empresas):
         )
 
         logger.info(f"PDF de empresas suspensas atuais enviado: {pdf_filename}")
-        print(f"PDF de empresas suspensas atuais enviado: {pdf_filename}")
 
     except ImportError:
         logger.warning("ReportLab não instalado. Não foi possível gerar PDF.")
         await canal.send("⚠️ PDF não disponível: ReportLab não instalado.")
     except Exception as e:
         logger.error(f"Erro ao gerar PDF de empresas suspensas atuais: {e}")
-        print(f"Erro ao gerar PDF: {e}")
 
 # === INICIALIZAÇÃO DO BOT ===
 if __name__ == "__main__":
@@ -2526,7 +2889,8 @@ if __name__ == "__main__":
     criar_lockfile()
 
     try:
-        bot.run(DISCORD_TOKEN)
+        # log_handler=None: o discord.py usa a configuração de logging acima em vez de criar a sua
+        bot.run(DISCORD_TOKEN, log_handler=None)
     except KeyboardInterrupt:
         logger.info("Bot encerrado pelo usuário")
     except Exception as e:
@@ -0,0 +1,195 @@
+"""
+Métricas dos ciclos de verificação da planilha.
+
+Cada ciclo mede o tempo das etapas (busca, diff, normalização, notificação,
+persistência, backup) e conta eventos (linhas, alterações, notificações,
+bytes gravados, reconexões). Os últimos N ciclos ficam num buffer circular em
+memória, de onde saem os percentis do comando /metricas. Opcionalmente um
+arquivo de texto no formato do Prometheus é regravado a cada ciclo (para o
+textfile collector do node_exporter, por exemplo).
+"""
+
+import math
+import os
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+# Etapas do ciclo, na ordem de exibição
+ETAPAS = ("busca", "diff", "normalizacao", "notificacao", "persistencia", "backup")
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) pelo método do posto mais próximo; None se não houver valores."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posto = max(1, math.ceil(p / 100 * len(ordenados)))
+    return ordenados[posto - 1]
+
+
+class MetricasCiclo:
+    """Tempos (segundos) por etapa e contadores de um único ciclo."""
+
+    def __init__(self):
+        self.inicio = time.time()
+        self._relogio = time.perf_counter()
+        self.duracao = None
+        self.etapas = {}
+        self.contadores = Counter()
+        self.resultado = None
+
+    @contextmanager
+    def etapa(self, nome):
+        """Mede o bloco e soma o tempo à etapa (uma etapa pode ocorrer mais de uma vez no ciclo)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_etapa(nome, time.perf_counter() - inicio)
+
+    def registrar_etapa(self, nome, segundos):
+        self.etapas[nome] = self.etapas.get(nome, 0.0) + segundos
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] += quantidade
+
+
+class ColetorMetricas:
+    """
+    Buffer circular dos últimos ciclos, com totais acumulados desde o início do processo.
+
+    Args:
+        limite: Ciclos mantidos no buffer.
+        arquivo_prometheus: Arquivo regravado a cada ciclo no formato de texto do Prometheus (opcional).
+        prefixo: Prefixo dos nomes das métricas exportadas.
+    """
+
+    def __init__(self, limite=500, arquivo_prometheus=None, prefixo="gerson"):
+        self.ciclos = deque(maxlen=limite)
+        self.arquivo_prometheus = Path(arquivo_prometheus) if arquivo_prometheus else None
+        self.prefixo = prefixo
+        self.atual = None
+        self._fontes = {}  # nome -> função que retorna o total acumulado do contador
+        self._ultimos_totais = {}
+        self.totais = Counter()  # Contadores acumulados desde o início
+        self.resultados = Counter()  # Ciclos por resultado
+        self.tempo_total = Counter()  # Soma dos tempos por etapa (segundos)
+        self.execucoes = Counter()  # Ciclos em que cada etapa ocorreu
+
+    def registrar_fonte(self, nome, obter_total):
+        """
+        Registra um contador mantido fora do ciclo (ex: notificações enviadas pelos workers).
+
+        A cada ciclo é registrado o quanto o total cresceu desde o ciclo anterior.
+        """
+        self._fontes[nome] = obter_total
+        self._ultimos_totais[nome] = obter_total()
+
+    def iniciar_ciclo(self):
+        self.atual = MetricasCiclo()
+        return self.atual
+
+    @contextmanager
+    def etapa(self, nome):
+        """Mede uma etapa do ciclo em andamento (sem ciclo em andamento, apenas executa o bloco)."""
+        if self.atual is None:
+            yield
+            return
+        with self.atual.etapa(nome):
+            yield
+
+    def registrar_etapa(self, nome, segundos):
+        """Soma um tempo medido à parte (ex: um laço longo demais para um bloco `with`)."""
+        if self.atual is not None:
+            self.atual.registrar_etapa(nome, segundos)
+
+    def contar(self, nome, quantidade=1):
+        if self.atual is not None:
+            self.atual.contar(nome, quantidade)
+
+    def finalizar_ciclo(self, resultado):
+        """Fecha o ciclo em andamento e o guarda no buffer. Retorna o registro do ciclo."""
+        ciclo, self.atual = self.atual, None
+        if ciclo is None:
+            return None
+        ciclo.duracao = time.perf_counter() - ciclo._relogio
+        ciclo.resultado = resultado
+        for nome, obter_total in self._fontes.items():
+            total = obter_total()
+            ciclo.contadores[nome] += total - self._ultimos_totais[nome]
+            self._ultimos_totais[nome] = total
+
+        self.ciclos.append(ciclo)
+        self.resultados[resultado] += 1
+        self.totais.update(ciclo.contadores)
+        self.tempo_total["total"] += ciclo.duracao
+        self.execucoes["total"] += 1
+        for nome, segundos in ciclo.etapas.items():
+            self.tempo_total[nome] += segundos
+            self.execucoes[nome] += 1
+        return ciclo
+
+    # === Consultas ===
+    def tempos(self, etapa):
+        """Tempos (segundos) da etapa nos ciclos do buffer em que ela ocorreu ("total" = ciclo inteiro)."""
+        if etapa == "total":
+            return [c.duracao for c in self.ciclos]
+        return [c.etapas[etapa] for c in self.ciclos if etapa in c.etapas]
+
+    def resumo_etapas(self):
+        """{etapa: (ciclos, p50, p95, máximo)} em segundos, para o ciclo inteiro e cada etapa medida."""
+        resumo = {}
+        for etapa in ("total",) + ETAPAS:
+            valores = self.tempos(etapa)
+            if valores:
+                resumo[etapa] = (len(valores), percentil(valores, 50), percentil(valores, 95), max(valores))
+        return resumo
+
+    def contadores_buffer(self):
+        """Soma dos contadores dos ciclos no buffer."""
+        soma = Counter()
+        for ciclo in self.ciclos:
+            soma.update(ciclo.contadores)
+        return soma
+
+    # === Exportação (Prometheus) ===
+    def texto_prometheus(self):
+        """Métricas no formato de exposição em texto do Prometheus."""
+        p = self.prefixo
+        linhas = [
+            f"# HELP {p}_ciclo_duracao_segundos Duração do ciclo e de cada etapa (quantis dos últimos {self.ciclos.maxlen} ciclos)",
+            f"# TYPE {p}_ciclo_duracao_segundos summary",
+        ]
+        for etapa, (_, p50, p95, _) in self.resumo_etapas().items():
+            linhas.append(f'{p}_ciclo_duracao_segundos{{etapa="{etapa}",quantile="0.5"}} {p50:.6f}')
+            linhas.append(f'{p}_ciclo_duracao_segundos{{etapa="{etapa}",quantile="0.95"}} {p95:.6f}')
+        for etapa, segundos in self.tempo_total.items():
+            linhas.append(f'{p}_ciclo_duracao_segundos_sum{{etapa="{etapa}"}} {segundos:.6f}')
+            linhas.append(f'{p}_ciclo_duracao_segundos_count{{etapa="{etapa}"}} {self.execucoes[etapa]}')
+
+        linhas += [f"# HELP {p}_ciclos_total Ciclos executados por resultado", f"# TYPE {p}_ciclos_total counter"]
+        for resultado, total in sorted(self.resultados.items()):
+            linhas.append(f'{p}_ciclos_total{{resultado="{resultado}"}} {total}')
+
+        for nome, total in sorted(self.totais.items()):
+            linhas += [f"# TYPE {p}_{nome}_total counter", f"{p}_{nome}_total {total}"]
+
+        if self.ciclos:
+            linhas += [
+                f"# HELP {p}_ultimo_ciclo_timestamp_segundos Início do último ciclo (epoch)",
+                f"# TYPE {p}_ultimo_ciclo_timestamp_segundos gauge",
+                f"{p}_ultimo_ciclo_timestamp_segundos {self.ciclos[-1].inicio:.0f}",
+            ]
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self):
+        """Regrava o arquivo do Prometheus (se configurado). Chamada síncrona: use asyncio.to_thread."""
+        if self.arquivo_prometheus is None:
+            return
+        self.arquivo_prometheus.parent.mkdir(parents=True, exist_ok=True)
+        # Troca atômica: o coletor nunca lê um arquivo pela metade
+        temporario = self.arquivo_prometheus.with_name(f".{self.arquivo_prometheus.name}.tmp")
+        temporario.write_text(self.texto_prometheus(), encoding="utf-8")
+        os.replace(temporario, self.arquivo_prometheus)
@@ -0,0 +1,267 @@
+"""
+Normalização dos valores de status e regime tributário lidos da planilha.
+
+As chaves dos mapeamentos são canonizadas uma única vez (sem acentos,
+maiúsculas, pontuação e espaços repetidos reduzidos a um espaço), então
+"Suspensa - RFB", "SUSPENSA_RFB" e "suspensa  rfb" caem na mesma regra. O
+resultado de cada valor bruto fica num cache limitado: no laço de linhas, a
+normalização repetida do mesmo texto é uma consulta de dicionário.
+
+Valores que não casam com nenhuma regra são mantidos (em maiúsculas) e contados
+por forma canônica, com as variantes vistas, para o resumo do ciclo.
+
+As regras ficam num arquivo externo (JSON ou YAML, veja `RegrasNormalizacao`),
+relido quando a data de modificação muda: uma nova grafia não exige reiniciar
+o bot.
+"""
+
+import json
+import logging
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_NAO_ALFANUMERICO = re.compile(r"[^0-9A-Z]+")
+
+
+def canonizar(valor):
+    """Forma canônica de um valor: sem acentos, maiúsculas, só letras/números separados por um espaço."""
+    decomposto = unicodedata.normalize("NFKD", str(valor))
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return _NAO_ALFANUMERICO.sub(" ", sem_acentos.upper()).strip()
+
+
+class Normalizador:
+    """
+    Tabela de normalização pré-compilada, com cache por valor bruto.
+
+    Args:
+        mapeamento: dict {variação: valor normalizado}.
+        nome: Descrição usada nos logs (ex: "status").
+        limite_cache: Valores brutos distintos guardados no cache (ao passar, o cache é esvaziado).
+    """
+
+    def __init__(self, mapeamento, nome="valor", limite_cache=4096):
+        self.nome = nome
+        self.limite_cache = limite_cache
+        self.tabela = self.compilar(mapeamento)
+        self._cache = {}  # valor bruto -> (normalizado, forma canônica se não há regra / None)
+        self.desconhecidos = Counter()  # forma canônica -> ocorrências no ciclo atual
+        self.variantes = {}  # forma canônica -> set de valores brutos vistos
+
+    def substituir(self, tabela):
+        """Troca a tabela compilada (veja `compilar`) e descarta o cache de valores brutos."""
+        self.tabela = tabela
+        self._cache = {}
+
+    def compilar(self, mapeamento):
+        """Canoniza as chaves do mapeamento; avisa sobre variações que passam a colidir."""
+        tabela = {}
+        for variacao, normalizado in mapeamento.items():
+            chave = canonizar(variacao)
+            if chave in tabela and tabela[chave] != normalizado:
+                logger.warning(
+                    f"Regra de {self.nome} ambígua: '{variacao}' -> '{normalizado}' "
+                    f"colide com '{tabela[chave]}' (mantida a primeira)"
+                )
+                continue
+            tabela[chave] = normalizado
+        return tabela
+
+    def normalizar(self, valor, contar=True):
+        """
+        Retorna o valor normalizado ("" para vazio).
+
+        Args:
+            contar: Se False, não conta valores desconhecidos (consultas repetidas do mesmo valor).
+        """
+        if not valor:
+            return ""
+        try:
+            normalizado, desconhecido = self._cache[valor]
+        except KeyError:
+            chave = canonizar(valor)
+            if chave in self.tabela:
+                normalizado, desconhecido = self.tabela[chave], None
+            else:
+                normalizado, desconhecido = " ".join(str(valor).upper().split()), chave
+            if len(self._cache) >= self.limite_cache:
+                self._cache.clear()
+            self._cache[valor] = (normalizado, desconhecido)
+
+        if desconhecido is not None and contar:
+            self.desconhecidos[desconhecido] += 1
+            self.variantes.setdefault(desconhecido, set()).add(str(valor))
+        return normalizado
+
+    def sem_regra(self, valor):
+        """Forma canônica do valor se nenhuma regra casa com ele; None se há regra (ou o valor é vazio)."""
+        if not valor:
+            return None
+        self.normalizar(valor, contar=False)
+        return self._cache[valor][1]
+
+    def fechar_ciclo(self):
+        """
+        Encerra a contagem do ciclo: retorna {forma canônica: (ocorrências, variantes)}
+        dos valores sem regra, e zera a contagem para o próximo ciclo.
+        """
+        resumo = {
+            chave: (total, sorted(self.variantes.get(chave, ())))
+            for chave, total in self.desconhecidos.most_common()
+        }
+        self.desconhecidos = Counter()
+        self.variantes = {}
+        return resumo
+
+
+class ValoresSemRegra:
+    """
+    Valores brutos sem regra de normalização nas empresas atuais da planilha.
+
+    A contagem do ciclo (`Normalizador.fechar_ciclo`) só vê as linhas novas ou
+    alteradas; aqui o valor de cada empresa fica guardado até a linha mudar ou
+    sair da planilha, então o resumo cobre a planilha inteira.
+
+    Args:
+        normalizador: Normalizador consultado (as regras atuais valem no resumo).
+    """
+
+    def __init__(self, normalizador):
+        self.normalizador = normalizador
+        self.por_codigo = {}  # codigo -> valor bruto sem regra
+
+    def atualizar(self, codigo, valor):
+        if self.normalizador.sem_regra(valor) is None:
+            self.por_codigo.pop(codigo, None)
+        else:
+            self.por_codigo[codigo] = valor
+
+    def remover(self, codigo):
+        self.por_codigo.pop(codigo, None)
+
+    def resumo(self):
+        """{forma canônica: (empresas, variantes)}, da mais frequente para a menos."""
+        empresas = Counter()
+        variantes = {}
+        for valor in self.por_codigo.values():
+            chave = self.normalizador.sem_regra(valor)
+            if chave is None:
+                continue  # Ganhou regra numa recarga ainda não reprocessada
+            empresas[chave] += 1
+            variantes.setdefault(chave, set()).add(valor)
+        return {chave: (total, sorted(variantes[chave])) for chave, total in empresas.most_common()}
+
+
+class RegrasInvalidas(Exception):
+    """Arquivo de regras de normalização ausente, ilegível ou com estrutura inválida."""
+
+
+class RegrasNormalizacao:
+    """
+    Regras de status e regime lidas de um arquivo, recarregadas quando ele muda.
+
+    O arquivo (JSON, ou YAML se o PyYAML estiver instalado) tem a forma
+    {"status": {variação: normalizado}, "regime": {variação: normalizado}}.
+    Um arquivo inválido numa recarga é ignorado: as regras anteriores continuam valendo.
+
+    Args:
+        caminho: Arquivo de regras (.json, .yaml ou .yml).
+        limite_cache: Repassado aos normalizadores.
+    """
+
+    SECOES = ("status", "regime")
+
+    def __init__(self, caminho, limite_cache=4096):
+        self.caminho = Path(caminho)
+        self.status = Normalizador({}, nome="status", limite_cache=limite_cache)
+        self.regime = Normalizador({}, nome="regime", limite_cache=limite_cache)
+        self._assinatura = None  # (mtime, tamanho) do arquivo carregado
+        self.carregado_em = None
+        self.ultimo_erro = None
+
+    def _ler(self):
+        texto = self.caminho.read_text(encoding="utf-8-sig")
+        if self.caminho.suffix.lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError as e:
+                raise RegrasInvalidas("arquivo YAML, mas o PyYAML não está instalado (pip install pyyaml)") from e
+            try:
+                return yaml.safe_load(texto)
+            except yaml.YAMLError as e:
+                raise RegrasInvalidas(f"YAML inválido: {e}") from e
+        try:
+            return json.loads(texto)
+        except json.JSONDecodeError as e:
+            raise RegrasInvalidas(f"JSON inválido: {e}") from e
+
+    def _validar(self, conteudo):
+        if not isinstance(conteudo, dict):
+            raise RegrasInvalidas("o arquivo deve conter as seções 'status' e 'regime'")
+        secoes = {}
+        for secao in self.SECOES:
+            mapeamento = conteudo.get(secao)
+            if not isinstance(mapeamento, dict):
+                raise RegrasInvalidas(f"seção '{secao}' ausente ou não é um mapeamento")
+            invalidas = [k for k, v in mapeamento.items() if not isinstance(v, str) or not str(k).strip()]
+            if invalidas:
+                raise RegrasInvalidas(f"seção '{secao}': regras inválidas para {invalidas[:5]}")
+            secoes[secao] = {str(k): v for k, v in mapeamento.items()}
+        return secoes
+
+    def carregar(self):
+        """
+        Lê, valida e compila o arquivo; só então troca as tabelas dos dois normalizadores.
+
+        Levanta RegrasInvalidas (ou OSError) sem alterar as regras em uso.
+        """
+        assinatura = self._obter_assinatura()
+        secoes = self._validar(self._ler())
+        tabela_status = self.status.compilar(secoes["status"])
+        tabela_regime = self.regime.compilar(secoes["regime"])
+
+        self.status.substituir(tabela_status)
+        self.regime.substituir(tabela_regime)
+        self._assinatura = assinatura
+        self.carregado_em = datetime.now()
+        self.ultimo_erro = None
+        logger.info(
+            f"Regras de normalização carregadas de {self.caminho.name}: "
+            f"{len(tabela_status)} de status, {len(tabela_regime)} de regime"
+        )
+
+    def _obter_assinatura(self):
+        info = self.caminho.stat()
+        return info.st_mtime_ns, info.st_size
+
+    def verificar(self):
+        """
+        Recarrega as regras se o arquivo mudou desde a última leitura.
+
+        Retorna True se as regras foram recarregadas. Erros são registrados e as
+        regras anteriores são mantidas (o mesmo erro não é registrado de novo
+        enquanto o arquivo não mudar).
+        """
+        try:
+            assinatura = self._obter_assinatura()
+        except OSError as e:
+            if self.ultimo_erro != str(e):
+                logger.error(f"Arquivo de regras de normalização inacessível ({e}); mantendo as regras atuais")
+                self.ultimo_erro = str(e)
+            return False
+        if assinatura == self._assinatura:
+            return False
+
+        try:
+            self.carregar()
+        except (RegrasInvalidas, OSError) as e:
+            self._assinatura = assinatura  # Não tenta de novo até a próxima modificação
+            self.ultimo_erro = str(e)
+            logger.error(f"Regras de normalização não recarregadas ({self.caminho.name}: {e}); mantendo as regras atuais")
+            return False
+        return True
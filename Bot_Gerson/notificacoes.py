@@ -0,0 +1,201 @@
+"""
+Despacho assíncrono das notificações do Bot_Gerson para o Discord.
+
+O ciclo de monitoramento apenas enfileira as notificações; um pool de workers
+as envia em paralelo, respeitando um balde de tokens por canal para não
+esbarrar nos limites de taxa do Discord. No modo resumo, as notificações de um
+ciclo (ou de uma janela de tempo) são agrupadas por canal e enviadas juntas.
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Limites do Discord por mensagem
+MAX_EMBEDS_POR_MENSAGEM = 10
+MAX_CARACTERES_EMBEDS = 5500  # Limite real: 6000 somando todos os embeds
+
+
+class CanalNaoEncontrado(Exception):
+    """O canal de destino não existe ou o bot não tem acesso a ele; a notificação não foi entregue."""
+
+
+class Notificacao:
+    """Notificação pronta para envio: canal de destino, embed e uma linha de resumo."""
+
+    __slots__ = ("canal_id", "canal_nome", "embed", "tipo", "resumo")
+
+    def __init__(self, canal_id, canal_nome, embed, tipo, resumo):
+        self.canal_id = canal_id
+        self.canal_nome = canal_nome
+        self.embed = embed
+        self.tipo = tipo
+        self.resumo = resumo
+
+
+def agrupar_embeds(embeds):
+    """Divide os embeds em lotes que respeitam os limites de uma mensagem do Discord."""
+    lotes = []
+    lote = []
+    tamanho = 0
+    for embed in embeds:
+        tamanho_embed = len(embed)
+        if lote and (len(lote) >= MAX_EMBEDS_POR_MENSAGEM or tamanho + tamanho_embed > MAX_CARACTERES_EMBEDS):
+            lotes.append(lote)
+            lote = []
+            tamanho = 0
+        lote.append(embed)
+        tamanho += tamanho_embed
+    if lote:
+        lotes.append(lote)
+    return lotes
+
+
+class ResumoNotificacoes:
+    """
+    Acumula as notificações para envio agrupado por canal.
+
+    Args:
+        janela: Segundos que a primeira notificação pendente pode esperar antes
+            do envio. 0 = envia ao final de cada ciclo.
+    """
+
+    def __init__(self, janela=0):
+        self.janela = janela
+        self.pendentes = []
+        self._primeira_em = None
+
+    def adicionar(self, notificacao):
+        if not self.pendentes:
+            self._primeira_em = time.monotonic()
+        self.pendentes.append(notificacao)
+
+    def pronto(self):
+        """Indica se as notificações pendentes já devem ser enviadas."""
+        if not self.pendentes:
+            return False
+        return self.janela <= 0 or (time.monotonic() - self._primeira_em) >= self.janela
+
+    def retirar(self):
+        """Retorna {canal_id: [notificações]} (na ordem de chegada) e esvazia o acumulador."""
+        por_canal = {}
+        for notificacao in self.pendentes:
+            por_canal.setdefault(notificacao.canal_id, []).append(notificacao)
+        self.pendentes = []
+        self._primeira_em = None
+        return por_canal
+
+
+class BaldeTokens:
+    """Balde de tokens simples: permite rajadas de `capacidade` e repõe `por_segundo` tokens/s."""
+
+    def __init__(self, capacidade, por_segundo):
+        self.capacidade = capacidade
+        self.por_segundo = por_segundo
+        self.tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()  # Mantém a ordem de chegada (FIFO) dentro do canal
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self._ultimo) * self.por_segundo)
+        self._ultimo = agora
+
+    async def consumir(self):
+        """Aguarda até haver um token disponível e o consome."""
+        async with self._lock:
+            while True:
+                self._repor()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.por_segundo)
+
+
+class DespachanteNotificacoes:
+    """
+    Fila de notificações com pool de workers.
+
+    Args:
+        workers: Quantidade de envios simultâneos.
+        rajada_por_canal: Mensagens que um canal aceita em rajada.
+        por_segundo_por_canal: Reposição do balde de cada canal (mensagens/s). 0 = sem limite.
+    """
+
+    def __init__(self, workers=3, rajada_por_canal=5, por_segundo_por_canal=1.0):
+        self.num_workers = workers
+        self.rajada_por_canal = rajada_por_canal
+        self.por_segundo_por_canal = por_segundo_por_canal
+        self.fila = None
+        self.tarefas = []
+        self.baldes = {}  # id do canal -> BaldeTokens
+        self.enviadas = 0  # Notificações entregues (um resumo conta cada notificação que leva)
+        self.mensagens_enviadas = 0  # Mensagens do Discord efetivamente enviadas
+        self.falhas = 0  # Notificações não entregues
+
+    def iniciar(self):
+        """Cria a fila e os workers no loop atual (idempotente)."""
+        if self.tarefas:
+            return
+        self.fila = asyncio.Queue()
+        self.tarefas = [
+            asyncio.create_task(self._worker(num), name=f"notificacoes-{num}")
+            for num in range(self.num_workers)
+        ]
+        logger.info(f"Despachante de notificações iniciado ({self.num_workers} workers)")
+
+    def enfileirar(self, funcao, *args, quantidade=1, **kwargs):
+        """
+        Agenda `await funcao(*args, **kwargs)` sem bloquear quem chamou.
+
+        `funcao` retorna (mensagens enviadas, notificações entregues); se falhar,
+        as `quantidade` notificações do envio contam como falhas.
+        """
+        if self.fila is None:
+            self.iniciar()
+        self.fila.put_nowait((funcao, args, kwargs, quantidade))
+
+    def pendentes(self):
+        return self.fila.qsize() if self.fila is not None else 0
+
+    async def enviar(self, canal, *args, **kwargs):
+        """Envia uma mensagem ao canal respeitando o limite de taxa do canal."""
+        if self.por_segundo_por_canal:
+            chave = getattr(canal, "id", None)
+            balde = self.baldes.get(chave)
+            if balde is None:
+                balde = self.baldes[chave] = BaldeTokens(self.rajada_por_canal, self.por_segundo_por_canal)
+            await balde.consumir()
+        return await canal.send(*args, **kwargs)
+
+    async def _worker(self, num):
+        while True:
+            funcao, args, kwargs, quantidade = await self.fila.get()
+            try:
+                mensagens, notificacoes = await funcao(*args, **kwargs)
+                self.mensagens_enviadas += mensagens
+                self.enviadas += notificacoes
+            except Exception as e:
+                self.falhas += quantidade
+                logger.error(f"Erro ao enviar notificação ({getattr(funcao, '__name__', funcao)}): {e}")
+            finally:
+                self.fila.task_done()
+
+    async def aguardar(self):
+        """Aguarda até que todas as notificações enfileiradas tenham sido processadas."""
+        if self.fila is not None:
+            await self.fila.join()
+
+    async def encerrar(self):
+        """Esvazia a fila (sem limite de tempo: nada enfileirado é descartado) e para os workers."""
+        if not self.tarefas:
+            return
+        if self.pendentes():
+            logger.info(f"Aguardando o envio de {self.pendentes()} notificação(ões) antes de encerrar")
+        await self.aguardar()
+        for tarefa in self.tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self.tarefas, return_exceptions=True)
+        self.tarefas = []
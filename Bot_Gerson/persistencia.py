@@ -0,0 +1,94 @@
+"""
+Gravação adiada (debounce) dos arquivos de dados do Bot_Gerson.
+
+Em ciclos com muitas alterações, cada registro marcava o arquivo para
+regravação imediata, disparando vários escritores simultâneos no mesmo
+arquivo. Aqui cada arquivo tem no máximo um escritor em andamento: as
+marcações feitas dentro da janela são agrupadas numa única gravação, e
+marcações feitas durante a gravação geram apenas mais uma gravação ao final.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Arquivo:
+    __slots__ = ("preparar", "gravar", "sujo", "tarefa", "gravacoes", "gravando")
+
+    def __init__(self, preparar, gravar):
+        self.preparar = preparar
+        self.gravar = gravar
+        self.sujo = False
+        self.tarefa = None
+        self.gravacoes = 0
+        self.gravando = False  # Gravação em andamento na thread
+
+
+class PersistenciaAdiada:
+    """
+    Agrupa e serializa as gravações de cada arquivo registrado.
+
+    Cada arquivo é registrado com duas funções:
+        preparar(): roda no loop de eventos e tira uma cópia consistente dos
+            dados (ex: o texto JSON), para que o dict não mude durante a gravação.
+        gravar(dados): roda em thread (asyncio.to_thread) e grava a cópia em disco.
+
+    Args:
+        janela: Segundos que a primeira marcação espera antes de gravar.
+    """
+
+    def __init__(self, janela=0.5):
+        self.janela = janela
+        self.arquivos = {}
+        self.marcacoes = 0
+        self._descarregando = False
+
+    def registrar(self, nome, preparar, gravar):
+        self.arquivos[nome] = _Arquivo(preparar, gravar)
+
+    def marcar(self, nome):
+        """Marca o arquivo como alterado e agenda a gravação (se ainda não houver uma)."""
+        arquivo = self.arquivos[nome]
+        arquivo.sujo = True
+        self.marcacoes += 1
+        if arquivo.tarefa is None or arquivo.tarefa.done():
+            arquivo.tarefa = asyncio.create_task(self._escritor(nome, arquivo), name=f"gravar-{nome}")
+
+    async def _escritor(self, nome, arquivo, espera=True):
+        # Enquanto houver marcações novas, grava de novo (uma gravação por vez)
+        while arquivo.sujo:
+            if espera and self.janela and not self._descarregando:
+                await asyncio.sleep(self.janela)
+            arquivo.sujo = False
+            arquivo.gravando = True
+            try:
+                await asyncio.to_thread(arquivo.gravar, arquivo.preparar())
+                arquivo.gravacoes += 1
+                logger.info(f"Arquivo {nome} salvo com sucesso.")
+            except Exception as e:
+                logger.error(f"Erro ao salvar {nome}: {e}")
+            finally:
+                arquivo.gravando = False
+
+    async def descarregar(self):
+        """Grava imediatamente tudo que estiver pendente e aguarda os escritores (uso no encerramento)."""
+        self._descarregando = True
+        try:
+            for nome, arquivo in self.arquivos.items():
+                tarefa = arquivo.tarefa
+                if tarefa is not None and not tarefa.done():
+                    # Cancelar não interrompe a gravação já na thread: nesse caso espera o escritor,
+                    # que grava de novo (sem a janela) se houve marcações durante a gravação
+                    if not arquivo.gravando:
+                        tarefa.cancel()  # Ainda na janela de espera: nada sendo gravado
+                    await asyncio.gather(tarefa, return_exceptions=True)
+                arquivo.tarefa = None
+                if arquivo.sujo:
+                    await self._escritor(nome, arquivo, espera=False)
+        finally:
+            self._descarregando = False
+
+    def pendentes(self):
+        return [nome for nome, arquivo in self.arquivos.items() if arquivo.sujo or (arquivo.tarefa and not arquivo.tarefa.done())]
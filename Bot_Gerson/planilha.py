@@ -0,0 +1,334 @@
+"""
+Utilitários de leitura e comparação da planilha de empresas do Bot_Gerson.
+
+Mantém o estado necessário para que o ciclo de monitoramento processe apenas
+o que realmente mudou desde a última verificação.
+"""
+
+import hashlib
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Separadores que não aparecem em células comuns da planilha
+_SEP_CAMPO = "\x1f"
+_SEP_LINHA = "\x1e"
+
+
+def _hash(texto):
+    """Retorna um hash curto (hex) do texto informado."""
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# === LEITURA PROJETADA (APENAS AS COLUNAS NECESSÁRIAS) ===
+CAMPOS_PLANILHA = ("codigo", "nome", "status", "regime")
+
+
+def coluna_para_indice(letra):
+    """Converte a letra da coluna (A, B, ..., AA) em índice base 1."""
+    indice = 0
+    for char in letra.strip().upper():
+        indice = indice * 26 + (ord(char) - ord("A") + 1)
+    return indice
+
+
+def indice_para_coluna(indice):
+    """Converte o índice base 1 da coluna em letra (1 -> A, 27 -> AA)."""
+    letra = ""
+    while indice > 0:
+        indice, resto = divmod(indice - 1, 26)
+        letra = chr(ord("A") + resto) + letra
+    return letra
+
+
+class LeitorColunas:
+    """
+    Lê da planilha apenas as colunas mapeadas para código, nome, status e regime.
+
+    Colunas adjacentes são agrupadas em uma única faixa A1 (ex: A:D) e faixas
+    separadas são buscadas numa só chamada `batch_get`. O resultado é sempre
+    devolvido no formato [codigo, nome, status, regime] por linha (cabeçalho
+    incluído), igual ao que o restante do bot espera de `get_all_values`.
+    """
+
+    def __init__(self, colunas):
+        # colunas: dict campo -> letra (ex: {"codigo": "A", "nome": "B", ...})
+        self.indices = [coluna_para_indice(colunas[campo]) for campo in CAMPOS_PLANILHA]
+        self.faixas = self._agrupar_faixas(sorted(set(self.indices)))
+
+    @staticmethod
+    def _agrupar_faixas(indices):
+        """Agrupa índices de colunas em faixas contíguas [(inicio, fim), ...]."""
+        faixas = []
+        for indice in indices:
+            if faixas and indice == faixas[-1][1] + 1:
+                faixas[-1] = (faixas[-1][0], indice)
+            else:
+                faixas.append((indice, indice))
+        return faixas
+
+    def ranges_a1(self):
+        """Retorna as faixas no formato A1 (ex: ["A:D"])."""
+        return [f"{indice_para_coluna(ini)}:{indice_para_coluna(fim)}" for ini, fim in self.faixas]
+
+    def montar_linhas(self, blocos):
+        """Combina os blocos retornados por faixa em linhas [codigo, nome, status, regime]."""
+        # Mapeia cada coluna para (bloco, deslocamento dentro do bloco)
+        posicoes = {}
+        for num_bloco, (ini, fim) in enumerate(self.faixas):
+            for indice in range(ini, fim + 1):
+                posicoes[indice] = (num_bloco, indice - ini)
+
+        total_linhas = max((len(bloco) for bloco in blocos), default=0)
+        linhas = []
+        for num_linha in range(total_linhas):
+            linha = []
+            for indice in self.indices:
+                num_bloco, deslocamento = posicoes[indice]
+                bloco = blocos[num_bloco]
+                valores = bloco[num_linha] if num_linha < len(bloco) else []
+                linha.append(valores[deslocamento] if deslocamento < len(valores) else "")
+            linhas.append(linha)
+        return linhas
+
+    def ler(self, fonte):
+        """Busca as faixas configuradas da fonte (chamada síncrona: use asyncio.to_thread)."""
+        blocos = fonte.batch_get(self.ranges_a1())
+        return self.montar_linhas(blocos)
+
+
+def extrair_campos(row):
+    """Extrai (codigo, nome, status, regime) de uma linha bruta (colunas A-D).
+
+    Retorna None se a linha não tiver os campos obrigatórios (código, nome e status).
+    """
+    if len(row) < 3:
+        return None
+
+    codigo, nome, status = row[0], row[1], row[2]
+    regime = row[3] if len(row) > 3 else ""
+
+    if not all([codigo, nome, status]):
+        return None
+
+    return str(codigo).strip(), str(nome).strip(), str(status).strip(), str(regime).strip()
+
+
+def impressao_linha(codigo, nome, status, regime):
+    """Calcula a impressão digital (hash) do conteúdo relevante de uma linha."""
+    return _hash(_SEP_CAMPO.join((codigo, nome, status, regime)))
+
+
+def digest_planilha(data):
+    """Calcula o digest da planilha inteira considerando apenas as colunas A-D."""
+    return _hash(_SEP_LINHA.join(_SEP_CAMPO.join(map(str, row[:4])) for row in data[1:]))
+
+
+class ResultadoDiff:
+    """Resultado de uma comparação entre a leitura atual e a última confirmada."""
+
+    def __init__(self, digest, inalterado, linhas_alteradas=None, codigos_validos=None, impressoes=None,
+                 codigos_inalterados=None):
+        self.digest = digest
+        self.inalterado = inalterado
+        # Lista de (idx, codigo, nome, status_bruto, regime_bruto) das linhas novas/alteradas
+        self.linhas_alteradas = linhas_alteradas or []
+        # Conjunto de todos os códigos válidos presentes na leitura atual
+        self.codigos_validos = codigos_validos or set()
+        # Com calcular(todas=True): códigos de linhas_alteradas cujo conteúdo não mudou
+        self.codigos_inalterados = codigos_inalterados or set()
+        self._impressoes = impressoes or {}
+
+
+class MotorDiff:
+    """
+    Compara leituras sucessivas da planilha usando impressões digitais por linha.
+
+    - Se o digest da planilha não mudou, o ciclo pode ser ignorado por completo.
+    - Caso contrário, apenas as linhas cujo hash mudou são retornadas para processamento.
+
+    As impressões só passam a valer após `confirmar()`, para que um ciclo com erro
+    ou rejeitado pela proteção de leitura incompleta seja reprocessado por inteiro.
+    """
+
+    def __init__(self):
+        self.digest = None
+        self.impressoes = {}  # codigo -> hash da linha
+
+    def resetar(self):
+        """Descarta a base de comparação (o próximo ciclo processa todas as linhas)."""
+        self.digest = None
+        self.impressoes = {}
+
+    def calcular(self, data, todas=False):
+        """
+        Compara a leitura atual (incluindo cabeçalho) com a última confirmada.
+
+        Com todas=True, todas as linhas são retornadas para reprocessamento (ex: regras de
+        normalização recarregadas); as que não mudaram ficam em `codigos_inalterados`.
+        """
+        digest = digest_planilha(data)
+        if digest == self.digest and not todas:
+            return ResultadoDiff(digest, inalterado=True, codigos_validos=set(self.impressoes))
+
+        linhas_alteradas = []
+        impressoes = {}
+        codigos_inalterados = set()
+
+        # Pula a primeira linha (cabeçalho); idx 1 é o cabeçalho
+        for idx, row in enumerate(data[1:], start=2):
+            campos = extrair_campos(row)
+            if campos is None:
+                continue
+
+            impressao = impressao_linha(*campos)
+            codigo = campos[0]
+            impressoes[codigo] = impressao
+
+            if self.impressoes.get(codigo) != impressao:
+                linhas_alteradas.append((idx, *campos))
+            elif todas:
+                linhas_alteradas.append((idx, *campos))
+                codigos_inalterados.add(codigo)
+
+        return ResultadoDiff(
+            digest,
+            inalterado=False,
+            linhas_alteradas=linhas_alteradas,
+            codigos_validos=set(impressoes),
+            impressoes=impressoes,
+            codigos_inalterados=codigos_inalterados,
+        )
+
+    def confirmar(self, resultado):
+        """Adota a leitura do resultado como nova base de comparação."""
+        if resultado.inalterado:
+            return
+        self.digest = resultado.digest
+        self.impressoes = resultado._impressoes
+
+
+# === DETECÇÃO DE ALTERAÇÕES (SINAL BARATO ANTES DO DOWNLOAD COMPLETO) ===
+class DetectorAlteracoes:
+    """
+    Interface de detector de alterações da planilha.
+
+    Implementações retornam um marcador barato de obter (ex: data de modificação
+    ou id de revisão). O download completo só é feito quando o marcador muda.
+    Um marcador None significa "desconhecido" e sempre força a leitura.
+    """
+
+    def __init__(self):
+        self.ultimo_marcador = None
+
+    def obter_marcador(self):
+        raise NotImplementedError
+
+    def verificar(self):
+        """Retorna (mudou, marcador). Chamada síncrona: use asyncio.to_thread."""
+        marcador = self.obter_marcador()
+        if marcador is None or marcador != self.ultimo_marcador:
+            return True, marcador
+        return False, marcador
+
+    def confirmar(self, marcador):
+        """Registra o marcador após um ciclo processado com sucesso."""
+        self.ultimo_marcador = marcador
+
+    def resetar(self):
+        self.ultimo_marcador = None
+
+
+class DetectorSempreAlterado(DetectorAlteracoes):
+    """Detector nulo: sempre considera que a planilha mudou."""
+
+    def obter_marcador(self):
+        return None
+
+
+class DetectorRevisaoFonte(DetectorAlteracoes):
+    """
+    Usa o marcador de revisão da fonte da planilha (ver fontes_planilha.FontePlanilha).
+
+    Para o Google Sheets é o `modifiedTime` do arquivo no Drive, que requer o
+    escopo drive.metadata.readonly. Em caso de erro retorna None (a planilha é
+    lida normalmente).
+    """
+
+    def __init__(self, fonte):
+        super().__init__()
+        self.fonte = fonte
+        self._falha_registrada = False
+
+    def obter_marcador(self):
+        try:
+            marcador = self.fonte.marcador_revisao()
+            self._falha_registrada = False
+            return marcador
+        except Exception as e:
+            if not self._falha_registrada:
+                logger.warning(f"Não foi possível obter a data de modificação da planilha ({e}). Lendo planilha completa.")
+                self._falha_registrada = True
+            return None
+
+
+# === ÍNDICES SECUNDÁRIOS DO ESTADO ATUAL ===
+class IndiceEmpresas:
+    """
+    Índices por status e por regime tributário (valores normalizados) do estado atual.
+
+    Atualizado incrementalmente a cada ciclo, permite responder "quem está
+    SUSPENSA/BAIXA/LP agora" sem varrer a planilha nem o estado inteiro.
+    """
+
+    def __init__(self):
+        self.por_status = defaultdict(set)
+        self.por_regime = defaultdict(set)
+        self._valores = {}  # codigo -> (status, regime)
+
+    @staticmethod
+    def _extrair(dados):
+        # Estados antigos guardavam apenas o status como string
+        if isinstance(dados, dict):
+            return dados.get("status", ""), dados.get("regime_tributario", "")
+        return dados, ""
+
+    def reconstruir(self, registros):
+        """Recria os índices a partir de um dicionário codigo -> dados."""
+        self.por_status.clear()
+        self.por_regime.clear()
+        self._valores.clear()
+        for codigo, dados in registros.items():
+            self.atualizar(codigo, dados)
+
+    def atualizar(self, codigo, dados):
+        """Insere ou atualiza uma empresa nos índices."""
+        self.remover(codigo)
+        status, regime = self._extrair(dados)
+        self._valores[codigo] = (status, regime)
+        self.por_status[status].add(codigo)
+        self.por_regime[regime].add(codigo)
+
+    def remover(self, codigo):
+        """Remove uma empresa dos índices (se existir)."""
+        valores = self._valores.pop(codigo, None)
+        if valores is None:
+            return
+        status, regime = valores
+        self.por_status[status].discard(codigo)
+        if not self.por_status[status]:
+            del self.por_status[status]
+        self.por_regime[regime].discard(codigo)
+        if not self.por_regime[regime]:
+            del self.por_regime[regime]
+
+    def codigos_com_status(self, status):
+        return set(self.por_status.get(status, ()))
+
+    def codigos_com_regime(self, regime):
+        return set(self.por_regime.get(regime, ()))
+
+    def contagem_status(self):
+        """Retorna {status: quantidade} do estado atual."""
+        return {status: len(codigos) for status, codigos in self.por_status.items()}
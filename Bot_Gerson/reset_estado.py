@@ -7,8 +7,8 @@ Uso:
 
 O que este script faz:
 1. Deleta o arquivo de flag de primeiro carregamento (primeiro_carregamento.flag)
-2. Deleta o arquivo de estado das empresas (estado_empresas.json)
-3. MANTÉM o histórico de alterações (historico_alteracoes.json)
+2. Move o banco de estado das empresas (estado_empresas.db) para backup
+3. MANTÉM o histórico de alterações (pasta data/historico)
 
 Após executar este script, o bot irá:
 - Fazer uma nova carga completa da planilha SEM enviar notificações
@@ -17,6 +17,7 @@ Após executar este script, o bot irá:
 """
 
 import os
+import sqlite3
 from pathlib import Path
 from datetime import datetime
 
@@ -32,13 +33,14 @@ def reset_estado():
 
     # Arquivos a serem deletados
     flag_path = DATA_DIR / "primeiro_carregamento.flag"
-    estado_path = DATA_DIR / "estado_empresas.json"
-    historico_path = DATA_DIR / "historico_alteracoes.json"
+    estado_path = DATA_DIR / "estado_empresas.db"
+    estado_json_path = DATA_DIR / "estado_empresas.json"  # Formato antigo (antes do SQLite)
+    historico_path = DATA_DIR / "historico"
 
     # Verifica se o histórico existe (para informar o usuário)
     if historico_path.exists():
         print(f"✓ Histórico de alterações encontrado: {historico_path}")
-        print("  Este arquivo será MANTIDO.")
+        print("  O histórico será MANTIDO.")
     else:
         print(f"⚠ Histórico de alterações não encontrado: {historico_path}")
 
@@ -52,9 +54,22 @@ def reset_estado():
         print(f"⚠ Flag não encontrada (já estava resetada): {flag_path}")
 
     # Faz backup do estado antes de deletar
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     if estado_path.exists():
-        backup_path = DATA_DIR / f"estado_empresas_backup_reset_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        backup_path = DATA_DIR / f"estado_empresas_backup_reset_{timestamp}.db"
+        # Consolida o WAL no banco antes de movê-lo
+        conexao = sqlite3.connect(estado_path)
+        conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conexao.close()
         estado_path.rename(backup_path)
+        for sufixo in ("-wal", "-shm"):
+            auxiliar = estado_path.with_name(estado_path.name + sufixo)
+            if auxiliar.exists():
+                auxiliar.unlink()
+        print(f"✓ Estado das empresas movido para backup: {backup_path}")
+    elif estado_json_path.exists():
+        backup_path = DATA_DIR / f"estado_empresas_backup_reset_{timestamp}.json"
+        estado_json_path.rename(backup_path)
         print(f"✓ Estado das empresas movido para backup: {backup_path}")
     else:
         print(f"⚠ Estado não encontrado (já estava resetado): {estado_path}")
@@ -0,0 +1,68 @@
+"""
+Resumo de log por ciclo de verificação da planilha.
+
+O laço de linhas não escreve uma linha de log por empresa: cada evento
+(normalização, alteração, empresa nova...) é contado numa categoria, e ao fim
+do ciclo sai uma única linha com as contagens. O detalhe por linha só é
+registrado com o logger em DEBUG, e apenas as primeiras ocorrências de cada
+categoria no ciclo (amostragem); as demais entram só na contagem.
+"""
+
+import logging
+from collections import Counter
+
+
+class ResumoCiclo:
+    """
+    Contagem de eventos do ciclo por categoria, com detalhe amostrado.
+
+    Args:
+        logger: Logger usado para o detalhe e para a linha de resumo.
+        rotulos: dict {categoria: rótulo no resumo}, na ordem de exibição
+            (categorias sem rótulo aparecem pelo nome, no fim).
+        amostra: Detalhes registrados por categoria em cada ciclo (0 = nenhum).
+    """
+
+    def __init__(self, logger, rotulos=None, amostra=20):
+        self.logger = logger
+        self.rotulos = rotulos or {}
+        self.amostra = amostra
+        self.contagem = Counter()
+        self._detalhados = Counter()
+
+    def contar(self, categoria, quantidade=1):
+        self.contagem[categoria] += quantidade
+
+    def detalhe(self, categoria, mensagem, *args, nivel=logging.DEBUG):
+        """
+        Conta um evento e registra o detalhe se o nível estiver ativo e a amostra da categoria não acabou.
+
+        `mensagem` usa o formato do logging (%s); os argumentos só são formatados se a linha for registrada.
+        """
+        self.contagem[categoria] += 1
+        if self._detalhados[categoria] >= self.amostra or not self.logger.isEnabledFor(nivel):
+            return
+        self._detalhados[categoria] += 1
+        self.logger.log(nivel, mensagem, *args)
+
+    def texto(self):
+        """Contagens do ciclo em uma linha (ex: "3 alterações de status, 12 status normalizados")."""
+        partes = [
+            f"{self.contagem[categoria]} {rotulo}"
+            for categoria, rotulo in self.rotulos.items() if self.contagem[categoria]
+        ]
+        partes += [
+            f"{total} {categoria}"
+            for categoria, total in self.contagem.items() if total and categoria not in self.rotulos
+        ]
+        return ", ".join(partes) or "nenhum evento"
+
+    def fechar(self):
+        """Retorna o texto do resumo, com as linhas de detalhe omitidas, e zera as contagens para o próximo ciclo."""
+        texto = self.texto()
+        omitidos = sum(self.contagem[c] - self._detalhados[c] for c in self._detalhados)
+        if omitidos and self.logger.isEnabledFor(logging.DEBUG):
+            texto += f" ({omitidos} detalhes por linha omitidos; amostra de {self.amostra} por categoria)"
+        self.contagem = Counter()
+        self._detalhados = Counter()
+        return texto
@@ -0,0 +1,136 @@
+"""
+Serialização dos arquivos de dados do Bot_Gerson: JSON, orjson ou msgpack.
+
+O formato de gravação é escolhido na inicialização (`FORMATO_ARQUIVOS`):
+- "json": JSON indentado (legível, o formato das versões anteriores);
+- "orjson": JSON compacto gerado pelo orjson (bem mais rápido, arquivos menores);
+- "msgpack": binário compacto (o menor e mais rápido de carregar);
+- "auto": orjson se instalado, senão json.
+
+Na leitura o formato é detectado pelo conteúdo, então arquivos gravados em
+qualquer formato continuam legíveis após trocar a configuração. orjson e
+msgpack são opcionais: sem eles o bot usa o módulo json da biblioteca padrão.
+"""
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("json", "orjson", "msgpack")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_formato = "json"  # Formato de gravação em uso (veja definir_formato)
+
+
+def escolher_formato(preferido="auto"):
+    """Retorna o formato a usar, caindo para json se o pacote do formato pedido não estiver instalado."""
+    if preferido == "msgpack":
+        try:
+            import msgpack  # noqa: F401
+            return "msgpack"
+        except ImportError:
+            logger.warning("msgpack não instalado; gravando em JSON. Instale com: pip install msgpack")
+            preferido = "auto"
+    if preferido in ("auto", "orjson"):
+        if orjson is not None:
+            return "orjson"
+        if preferido == "orjson":
+            logger.warning("orjson não instalado; usando o módulo json. Instale com: pip install orjson")
+        return "json"
+    if preferido != "json":
+        logger.warning(f"Formato de arquivo desconhecido '{preferido}'; usando json (opções: auto, {', '.join(FORMATOS)})")
+    return "json"
+
+
+def definir_formato(preferido="auto"):
+    """Define o formato usado por `codificar` quando nenhum é informado. Retorna o formato escolhido."""
+    global _formato
+    _formato = escolher_formato(preferido)
+    return _formato
+
+
+def formato_atual():
+    return _formato
+
+
+# === Codificação ===
+def codificar(dados, formato=None, indent=4):
+    """
+    Serializa `dados` em bytes no formato indicado (padrão: o definido em `definir_formato`).
+
+    `indent` só vale para o formato json; orjson e msgpack são sempre compactos.
+    """
+    formato = formato or _formato
+    if formato == "msgpack":
+        import msgpack
+        return msgpack.packb(dados, use_bin_type=True)
+    if formato == "orjson":
+        return orjson.dumps(dados)
+    return json.dumps(dados, indent=indent, ensure_ascii=False).encode("utf-8")
+
+
+def canonico(dados):
+    """JSON canônico (chaves ordenadas, sem espaços) em bytes: mesmo conteúdo -> mesmos bytes."""
+    if orjson is not None:
+        return orjson.dumps(dados, option=orjson.OPT_SORT_KEYS)
+    return canonico_json(dados)
+
+
+def canonico_json(dados):
+    """Mesma forma de `canonico`, sempre pelo módulo json (referência dos checksums antigos)."""
+    return json.dumps(dados, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def linha_json(dados):
+    """Uma linha de JSON compacto (sem a quebra), para logs JSONL."""
+    if orjson is not None:
+        return orjson.dumps(dados).decode("utf-8")
+    return json.dumps(dados, ensure_ascii=False)
+
+
+def ler_linha_json(linha):
+    """Decodifica uma linha JSONL. Levanta json.JSONDecodeError se estiver inválida."""
+    if orjson is not None:
+        return orjson.loads(linha)
+    return json.loads(linha)
+
+
+# === Decodificação ===
+def detectar_formato(conteudo):
+    """Detecta pelo primeiro byte significativo: '{' ou '[' é JSON; qualquer outro, msgpack."""
+    if isinstance(conteudo, str):
+        return "json"
+    inicio = conteudo.lstrip(b" \t\r\n")
+    if inicio.startswith(b"\xef\xbb\xbf"):  # BOM do UTF-8 (arquivo editado à mão)
+        return "json"
+    return "json" if inicio[:1] in (b"{", b"[") else "msgpack"
+
+
+def decodificar(conteudo):
+    """
+    Decodifica bytes (ou texto) gravados em qualquer formato suportado.
+
+    Levanta ValueError se o conteúdo não puder ser decodificado.
+    """
+    if detectar_formato(conteudo) == "msgpack":
+        try:
+            import msgpack
+        except ImportError as e:
+            raise ValueError("arquivo em msgpack, mas o pacote msgpack não está instalado (pip install msgpack)") from e
+        try:
+            return msgpack.unpackb(conteudo, raw=False, strict_map_key=False)
+        except Exception as e:
+            raise ValueError(f"msgpack inválido: {e}") from e
+
+    if isinstance(conteudo, bytes):
+        conteudo = conteudo.removeprefix(b"\xef\xbb\xbf")
+    if orjson is not None:
+        return orjson.loads(conteudo)
+    if isinstance(conteudo, bytes):
+        conteudo = conteudo.decode("utf-8")
+    return json.loads(conteudo)
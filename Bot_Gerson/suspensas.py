@@ -0,0 +1,196 @@
+"""
+Histórico semanal de empresas suspensas do Bot_Gerson.
+
+Cada semana (YYYY-WNN) guarda a lista ordenada de empresas suspensas e um
+conjunto com os códigos, então verificar se a empresa já foi registrada na
+semana é O(1), mesmo numa suspensão em massa.
+
+A gravação é incremental: cada registro acrescenta uma linha em
+`historico_suspensas.jsonl`, e o arquivo completo (`historico_suspensas.json`)
+só é regravado quando o log acumula linhas suficientes. Reaplicar uma linha já
+presente no arquivo completo não tem efeito, então uma queda no meio da
+compactação não duplica registros.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from arquivos import carregar_dados, contabilizar_gravacao, descartar_linha_incompleta, gravar_atomico, serializar_dados
+from serializacao import ler_linha_json, linha_json
+
+logger = logging.getLogger(__name__)
+
+
+class HistoricoSuspensas:
+    """
+    Empresas suspensas por semana: {semana: {"empresas": [...], "total": n}}.
+
+    Args:
+        diretorio: Pasta dos dados (ex: data/).
+        backups: RepositorioBackups usado se o arquivo completo estiver corrompido (opcional).
+        limite_linhas: Linhas no log que disparam a regravação do arquivo completo.
+    """
+
+    NOME_ARQUIVO = "historico_suspensas.json"
+    NOME_LOG = "historico_suspensas.jsonl"
+
+    def __init__(self, diretorio, backups=None, limite_linhas=500):
+        self.diretorio = Path(diretorio)
+        self.backups = backups
+        self.caminho = self.diretorio / self.NOME_ARQUIVO
+        self.caminho_log = self.diretorio / self.NOME_LOG
+        # Log já incluído numa compactação em andamento (apagado quando ela termina)
+        self.caminho_log_compactando = self.diretorio / (self.NOME_LOG + ".compactando")
+        self.limite_linhas = limite_linhas
+        self.semanas = {}
+        self._codigos = {}  # semana -> set de códigos já registrados
+        self.linhas_log = 0
+        self._linhas_arquivo = 0  # Linhas em `caminho_log` (sem as do log em compactação)
+        self._arquivo = None
+        self._pendente_fsync = False
+        self._lock = threading.Lock()  # `sincronizar` e a compactação rodam em thread; `registrar`, no loop
+
+    def __contains__(self, semana):
+        return semana in self.semanas
+
+    def __getitem__(self, semana):
+        return self.semanas[semana]
+
+    def __len__(self):
+        return len(self.semanas)
+
+    def keys(self):
+        return self.semanas.keys()
+
+    # === Leitura ===
+    def carregar(self):
+        """
+        Lê o arquivo completo e reaplica os logs. Retorna a origem do arquivo completo
+        (o caminho, a descrição do backup usado, ou None se ainda não existe).
+        """
+        # Checksum inválido: usa o backup válido mais recente
+        semanas, origem = carregar_dados(self.caminho, self.backups, padrao={})
+        self.semanas = semanas
+        self._codigos = {
+            semana: {empresa["codigo"] for empresa in dados["empresas"]}
+            for semana, dados in semanas.items()
+        }
+
+        self.linhas_log = 0
+        self._linhas_arquivo = 0
+        for caminho in (self.caminho_log_compactando, self.caminho_log):
+            if not caminho.exists():
+                continue
+            if descartar_linha_incompleta(caminho):
+                logger.warning(f"Última linha de {caminho.name} estava incompleta; descartada")
+            with open(caminho, "r", encoding="utf-8") as f:
+                for numero, linha in enumerate(f, 1):
+                    if caminho == self.caminho_log:
+                        self._linhas_arquivo += 1
+                    try:
+                        registro = ler_linha_json(linha)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Linha {numero} de {caminho.name} inválida/truncada; ignorada")
+                        continue
+                    self._adicionar(registro["semana"], registro["empresa"])
+                    self.linhas_log += 1
+        return origem
+
+    # === Escrita ===
+    def _adicionar(self, semana, empresa):
+        codigos = self._codigos.setdefault(semana, set())
+        if empresa["codigo"] in codigos:
+            return False
+        if semana not in self.semanas:
+            self.semanas[semana] = {"empresas": [], "total": 0}
+        codigos.add(empresa["codigo"])
+        self.semanas[semana]["empresas"].append(empresa)
+        self.semanas[semana]["total"] += 1
+        return True
+
+    def registrar(self, semana, codigo, nome, data_hora):
+        """
+        Registra a empresa como suspensa na semana e acrescenta a linha ao log (sem fsync).
+
+        Retorna False se ela já estava registrada nesta semana.
+        """
+        empresa = {"codigo": codigo, "nome": nome, "data_hora": data_hora}
+        if not self._adicionar(semana, empresa):
+            return False
+
+        with self._lock:
+            if self._arquivo is None:
+                self.diretorio.mkdir(parents=True, exist_ok=True)
+                self._arquivo = open(self.caminho_log, "a", encoding="utf-8")
+            linha = linha_json({"semana": semana, "empresa": empresa}) + "\n"
+            self._arquivo.write(linha)
+            self._arquivo.flush()
+            contabilizar_gravacao(len(linha.encode("utf-8")))
+            self.linhas_log += 1
+            self._linhas_arquivo += 1
+            self._pendente_fsync = True
+        return True
+
+    def sincronizar(self):
+        """Garante em disco (fsync) as linhas acrescentadas desde a última chamada."""
+        with self._lock:
+            self._sincronizar()
+
+    def _sincronizar(self):
+        if self._arquivo is not None and self._pendente_fsync:
+            os.fsync(self._arquivo.fileno())
+            self._pendente_fsync = False
+
+    def precisa_compactar(self):
+        return self.linhas_log >= self.limite_linhas
+
+    def preparar_compactacao(self):
+        """
+        Roda no loop de eventos: serializa o histórico completo, sem tocar nos arquivos.
+
+        Retorna (linhas do log incluídas no retrato, conteúdo do arquivo completo);
+        os registros feitos depois disso continuam no log (veja `gravar_compactacao`).
+        """
+        incluidas = self._linhas_arquivo
+        self._linhas_arquivo = 0
+        self.linhas_log = 0
+        return incluidas, serializar_dados(self.semanas)
+
+    def gravar_compactacao(self, compactacao):
+        """
+        Roda em thread: separa as linhas do log incluídas no retrato, grava o arquivo
+        completo e só então apaga as linhas separadas.
+        """
+        incluidas, conteudo = compactacao
+        with self._lock:
+            if self._arquivo is not None:
+                self._sincronizar()
+                self._arquivo.close()
+                self._arquivo = None
+            if incluidas and self.caminho_log.exists():
+                linhas = self.caminho_log.read_bytes().splitlines(keepends=True)
+                if len(linhas) == incluidas and not self.caminho_log_compactando.exists():
+                    self.caminho_log.replace(self.caminho_log_compactando)
+                else:
+                    # Compactação anterior não terminou ou houve registros após o retrato:
+                    # junta as linhas incluídas ao log em compactação e mantém as demais
+                    with open(self.caminho_log_compactando, "ab") as destino:
+                        destino.write(b"".join(linhas[:incluidas]))
+                        destino.flush()
+                        os.fsync(destino.fileno())
+                    if len(linhas) > incluidas:
+                        gravar_atomico(self.caminho_log, b"".join(linhas[incluidas:]))
+                    else:
+                        self.caminho_log.unlink()
+        gravar_atomico(self.caminho, conteudo)
+        self.caminho_log_compactando.unlink(missing_ok=True)
+
+    def fechar(self):
+        with self._lock:
+            if self._arquivo is not None:
+                self._sincronizar()
+                self._arquivo.close()
+                self._arquivo = None
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os módulos do bot são importados pelo nome, como quando o bot roda da própria pasta
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
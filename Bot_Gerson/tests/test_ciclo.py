@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("discord")
+
+BOT_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="module")
+def main(tmp_path_factory):
+    """Importa o main com dados, logs, backups e regras de normalização numa pasta temporária."""
+    pasta = tmp_path_factory.mktemp("gerson")
+    regras = pasta / "normalizacao.json"
+    shutil.copy(BOT_DIR / "config" / "normalizacao.json", regras)
+    # O main lê as variáveis ao ser importado (e o load_dotenv pode acrescentar outras):
+    # o ambiente original volta ao fim do módulo
+    ambiente = dict(os.environ)
+    os.environ.update({
+        "GERSON_DATA_DIR": str(pasta / "data"),
+        "GERSON_LOGS_DIR": str(pasta / "logs"),
+        "GERSON_BACKUPS_DIR": str(pasta / "backups"),
+        "NORMALIZACAO_ARQUIVO": str(regras),
+        "NOTIFICACOES_RESUMO": "false",
+    })
+    try:
+        import main
+        yield main
+    finally:
+        os.environ.clear()
+        os.environ.update(ambiente)
+
+
+@pytest.fixture
+def bot(main, tmp_path, monkeypatch):
+    """MyBot lendo um CSV local, com pastas próprias por teste e notificações apenas registradas."""
+    from fontes_planilha import FonteArquivoLocal
+    from planilha import DetectorRevisaoFonte
+
+    for nome in ("DATA_DIR", "BACKUPS_DIR"):
+        pasta = tmp_path / nome.lower()
+        pasta.mkdir()
+        monkeypatch.setattr(main, nome, pasta)
+    (main.DATA_DIR / "primeiro_carregamento.flag").touch()
+
+    csv = tmp_path / "planilha.csv"
+    _escrever(csv, [["E10", "EMPRESA DEZ", "ATIVA", "SN"], ["E11", "EMPRESA ONZE", "SUSPENSA JUDICIAL", "SN"]])
+
+    bot = main.MyBot()
+    bot.fonte = FonteArquivoLocal(csv).conectar()
+    bot.detector_alteracoes = DetectorRevisaoFonte(bot.fonte)
+    bot.notificacoes = []
+    bot.notificar = lambda montar, *args: bot.notificacoes.append(args)
+    bot.alteracoes = []
+    registrar_alteracao = bot.registrar_alteracao
+    bot.registrar_alteracao = lambda **alteracao: (bot.alteracoes.append(alteracao), registrar_alteracao(**alteracao))
+    bot.sheet_data = bot.carregar_estado()
+    yield bot
+    bot.estado.fechar()
+    bot.log_alteracoes.fechar()
+    bot.historico_suspensas.fechar()
+
+
+def _escrever(caminho, linhas):
+    info = caminho.stat() if caminho.exists() else None
+    caminho.write_text("\n".join(",".join(l) for l in [["COD", "EMPRESA", "STATUS", "REGIME"], *linhas]) + "\n", encoding="utf-8")
+    if info is not None:
+        os.utime(caminho, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+
+
+def _ciclo(bot):
+    asyncio.run(bot.executar_ciclo())
+
+
+def test_gravacao_que_falhou_e_refeita_no_ciclo_seguinte(bot, monkeypatch):
+    _ciclo(bot)
+    bot.notificacoes.clear()
+    _escrever(bot.fonte.caminho, [["E10", "EMPRESA DEZ", "BAIXA", "SN"], ["E11", "EMPRESA ONZE", "SUSPENSA JUDICIAL", "SN"]])
+
+    def falhar(*args, **kwargs):
+        raise OSError("disco cheio")
+
+    with monkeypatch.context() as m:
+        m.setattr(bot.estado, "aplicar", falhar)
+        _ciclo(bot)
+    assert bot.notificacoes == [("E10", "EMPRESA DEZ", "BAIXA")]
+    assert bot.estado.carregar()["E10"]["status"] == "ATIVA"
+
+    # A planilha não mudou mais: a gravação pendente é refeita mesmo assim, sem notificar de novo
+    _ciclo(bot)
+    assert bot.estado.carregar() == bot.sheet_data
+    assert bot.estado.carregar()["E10"]["status"] == "BAIXA"
+    assert len(bot.notificacoes) == 1
+
+
+def test_recarga_de_regras_nao_gera_alteracoes(main, bot):
+    _ciclo(bot)
+    bot.notificacoes.clear()
+    bot.alteracoes.clear()
+
+    caminho_regras = main.REGRAS_NORMALIZACAO.caminho
+    original = caminho_regras.read_text(encoding="utf-8")
+    regras = json.loads(original)
+    regras["status"]["SUSPENSA JUDICIAL"] = "SUSPENSA"
+    try:
+        _escrever_regras(caminho_regras, json.dumps(regras))
+        # Uma alteração real no mesmo ciclo continua sendo notificada
+        _escrever(bot.fonte.caminho, [["E10", "EMPRESA DEZ", "BAIXA", "SN"], ["E11", "EMPRESA ONZE", "SUSPENSA JUDICIAL", "SN"]])
+        _ciclo(bot)
+    finally:
+        _escrever_regras(caminho_regras, original)
+        main.REGRAS_NORMALIZACAO.verificar()
+
+    assert bot.notificacoes == [("E10", "EMPRESA DEZ", "BAIXA")]
+    assert bot.sheet_data["E11"]["status"] == "SUSPENSA"
+    assert bot.estado.carregar()["E11"]["status"] == "SUSPENSA"
+    assert bot.indice.codigos_com_status("SUSPENSA") == {"E11"}
+    assert [a["codigo"] for a in bot.alteracoes] == ["E10"]
+    assert len(bot.historico_suspensas) == 0
+
+
+def test_estado_salvo_com_regras_antigas_e_migrado_sem_notificar(main, bot):
+    # Estado gravado por uma versão anterior, antes da canonização ("SUSPENSA (RFB)" sem regra)
+    bot.estado.aplicar({"E10": {"nome": "EMPRESA DEZ", "status": "SUSPENSA (RFB)", "regime_tributario": "SN"}})
+    bot.sheet_data = bot.carregar_estado()
+    _escrever(bot.fonte.caminho, [["E10", "EMPRESA DEZ", "SUSPENSA (RFB)", "SN"]])
+
+    _ciclo(bot)
+
+    assert bot.notificacoes == []
+    assert bot.alteracoes == []
+    assert bot.estado.carregar()["E10"]["status"] == "SUSPENSA"
+    assert len(bot.historico_suspensas) == 0
+
+
+def _escrever_regras(caminho, texto):
+    info = caminho.stat()
+    caminho.write_text(texto, encoding="utf-8")
+    os.utime(caminho, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
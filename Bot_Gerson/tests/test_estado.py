@@ -0,0 +1,51 @@
+import json
+
+from estado import EstadoEmpresas
+
+
+def _empresa(nome, status, regime=""):
+    return {"nome": nome, "status": status, "regime_tributario": regime}
+
+
+def test_gravacao_incremental_sobrevive_a_reabertura(tmp_path):
+    caminho = tmp_path / "estado_empresas.db"
+    estado = EstadoEmpresas(caminho)
+    estado.aplicar({"1": _empresa("A", "ATIVA", "SN"), "2": _empresa("B", "ATIVA"), "3": _empresa("C", "BAIXA")})
+    estado.aplicar({"2": _empresa("B", "SUSPENSA", "LP")}, removidos={"3"})
+    estado.fechar()
+
+    reaberto = EstadoEmpresas(caminho)
+    assert reaberto.carregar() == {"1": _empresa("A", "ATIVA", "SN"), "2": _empresa("B", "SUSPENSA", "LP")}
+    assert reaberto.total() == 2
+    assert reaberto.ultima_verificacao() is not None
+    assert reaberto.verificar()
+    reaberto.fechar()
+
+
+def test_migra_o_json_antigo_uma_unica_vez(tmp_path):
+    caminho_json = tmp_path / "estado_empresas.json"
+    caminho_json.write_text(json.dumps({
+        "ultima_verificacao": "01/01/2026 08:00:00",
+        "registros": {"1": _empresa("A", "ATIVA", "SN")},
+    }), encoding="utf-8")
+    estado = EstadoEmpresas(tmp_path / "estado_empresas.db")
+
+    assert estado.migrar_json(caminho_json) == 1
+    assert estado.carregar() == {"1": _empresa("A", "ATIVA", "SN")}
+    assert estado.ultima_verificacao() == "01/01/2026 08:00:00"
+    assert not caminho_json.exists()
+    assert (tmp_path / "estado_empresas.json.migrado").exists()
+    assert estado.migrar_json(caminho_json) == 0
+    estado.fechar()
+
+
+def test_recriar_preserva_o_banco_anterior(tmp_path):
+    caminho = tmp_path / "estado_empresas.db"
+    estado = EstadoEmpresas(caminho)
+    estado.aplicar({"1": _empresa("A", "ATIVA")})
+
+    estado.recriar({"2": _empresa("B", "BAIXA")})
+
+    assert estado.carregar() == {"2": _empresa("B", "BAIXA")}
+    assert (tmp_path / "estado_empresas.db.corrompido").exists()
+    estado.fechar()
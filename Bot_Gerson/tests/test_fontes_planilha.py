@@ -0,0 +1,48 @@
+import os
+
+from fontes_planilha import FonteArquivoLocal
+from planilha import DetectorRevisaoFonte, LeitorColunas
+
+COLUNAS = {"codigo": "A", "nome": "B", "status": "C", "regime": "D"}
+
+
+def _escrever(caminho, linhas):
+    caminho.write_text("\n".join(",".join(linha) for linha in linhas) + "\n", encoding="utf-8")
+
+
+def _avancar_mtime(caminho):
+    info = caminho.stat()
+    os.utime(caminho, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+
+
+def test_edicao_do_arquivo_muda_o_marcador(tmp_path):
+    caminho = tmp_path / "planilha.csv"
+    _escrever(caminho, [["CODIGO", "EMPRESA", "STATUS", "REGIME"], ["1", "EMPRESA A", "ATIVA", "SN"]])
+    fonte = FonteArquivoLocal(caminho).conectar()
+    detector = DetectorRevisaoFonte(fonte)
+
+    mudou, marcador = detector.verificar()
+    assert mudou
+    LeitorColunas(COLUNAS).ler(fonte)
+    detector.confirmar(marcador)
+    assert detector.verificar() == (False, marcador)
+
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write("2,EMPRESA B,SUSPENSA,LP\n")
+    _avancar_mtime(caminho)
+
+    mudou, novo_marcador = detector.verificar()
+    assert mudou
+    assert novo_marcador != marcador
+    linhas = LeitorColunas(COLUNAS).ler(fonte)
+    assert linhas[-1] == ["2", "EMPRESA B", "SUSPENSA", "LP"]
+
+
+def test_mutacoes_simuladas_mudam_o_marcador(tmp_path):
+    caminho = tmp_path / "planilha.csv"
+    _escrever(caminho, [["CODIGO", "EMPRESA", "STATUS", "REGIME"]] + [[str(i), f"E{i}", "ATIVA", "SN"] for i in range(10)])
+    fonte = FonteArquivoLocal(caminho, taxa_mutacao=0.5, semente=1).conectar()
+
+    antes = fonte.marcador_revisao()
+    fonte.batch_get(["A:D"])
+    assert fonte.marcador_revisao() != antes
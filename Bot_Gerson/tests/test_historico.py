@@ -0,0 +1,67 @@
+from historico import LogAlteracoes
+
+
+def _alteracao(codigo):
+    return {"tipo": "status", "codigo": codigo, "nome": f"EMPRESA {codigo}", "valor_anterior": "ATIVA", "valor_novo": "BAIXA"}
+
+
+def _registrar(log, competencia, codigo):
+    alteracao = _alteracao(codigo)
+    log.historico.adicionar(competencia, alteracao)
+    log.acrescentar(competencia, alteracao)
+
+
+def _compactar(log):
+    compactacao = log.preparar_compactacao()
+    log.gravar_compactacao(compactacao)
+    log.concluir_compactacao(compactacao)
+
+
+def test_compactacao_grava_competencias_e_esvazia_o_log(tmp_path):
+    log = LogAlteracoes(tmp_path)
+    log.carregar()
+    _registrar(log, "2026-09", "1")
+    _registrar(log, "2026-10", "2")
+
+    _compactar(log)
+    log.fechar()
+
+    assert log.linhas_log == 0
+    assert log.historico.pendentes() == []
+    assert log.caminho_log.read_text(encoding="utf-8") == ""
+    recarregado = LogAlteracoes(tmp_path)
+    recarregado.carregar()
+    assert [alt["codigo"] for alt in recarregado.historico["2026-09"]["alteracoes"]] == ["1"]
+    assert recarregado.historico.ultimo_seq("2026-10") == 2
+
+
+def test_alteracao_durante_a_gravacao_continua_no_log(tmp_path):
+    log = LogAlteracoes(tmp_path)
+    log.carregar()
+    _registrar(log, "2026-10", "1")
+
+    compactacao = log.preparar_compactacao()
+    _registrar(log, "2026-10", "2")  # Chega enquanto a thread grava
+    log.gravar_compactacao(compactacao)
+    log.concluir_compactacao(compactacao)
+    log.fechar()
+
+    # A competência segue fixa (com a alteração nova) e só a linha nova ficou no log
+    assert [c for c, _ in log.historico.pendentes()] == ["2026-10"]
+    assert log.linhas_log == 1
+    assert log.caminho_log.read_text(encoding="utf-8").count("\n") == 1
+    recarregado = LogAlteracoes(tmp_path)
+    recarregado.carregar()
+    assert [alt["codigo"] for alt in recarregado.historico["2026-10"]["alteracoes"]] == ["1", "2"]
+
+
+def test_gravacao_que_falhou_mantem_a_compactacao_pendente(tmp_path):
+    log = LogAlteracoes(tmp_path)
+    log.carregar()
+    _registrar(log, "2020-01", "1")
+
+    compactacao = log.preparar_compactacao()
+    log.cancelar_compactacao(compactacao)
+
+    assert log.precisa_compactar()
+    assert log.linhas_log == 1
@@ -0,0 +1,118 @@
+import json
+import os
+
+import pytest
+
+from normalizacao import Normalizador, RegrasInvalidas, RegrasNormalizacao, ValoresSemRegra, canonizar
+
+REGRAS = {
+    "status": {"ATIVA": "ATIVA", "SUSPENSA RFB": "SUSPENSA"},
+    "regime": {"SIMPLES NACIONAL": "SN"},
+}
+
+
+def _gravar(caminho, conteudo):
+    texto = conteudo if isinstance(conteudo, str) else json.dumps(conteudo)
+    info = caminho.stat() if caminho.exists() else None
+    caminho.write_text(texto, encoding="utf-8")
+    if info is not None:
+        # Garante uma data de modificação diferente mesmo em sistemas de arquivos com baixa resolução
+        os.utime(caminho, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def regras(tmp_path):
+    caminho = tmp_path / "normalizacao.json"
+    _gravar(caminho, REGRAS)
+    regras = RegrasNormalizacao(caminho)
+    regras.carregar()
+    return regras
+
+
+def test_canonizar_remove_acentos_pontuacao_e_espacos():
+    assert canonizar("Suspensa - RFB") == "SUSPENSA RFB"
+    assert canonizar("suspensa_rfb") == "SUSPENSA RFB"
+    assert canonizar("  Legalização ") == "LEGALIZACAO"
+
+
+def test_normalizador_usa_a_forma_canonica_das_regras():
+    normalizador = Normalizador({"SUSPENSA RFB": "SUSPENSA", "ATIVA (LEGALIZAÇÃO)": "ATIVA"}, nome="status")
+
+    assert normalizador.normalizar("Suspensa - RFB") == "SUSPENSA"
+    assert normalizador.normalizar("ativa legalizacao") == "ATIVA"
+    assert normalizador.normalizar("") == ""
+
+
+def test_valores_sem_regra_sao_mantidos_e_contados_no_ciclo():
+    normalizador = Normalizador({"ATIVA": "ATIVA"}, nome="status")
+
+    assert normalizador.normalizar("Suspensa  judicial") == "SUSPENSA JUDICIAL"
+    normalizador.normalizar("SUSPENSA-JUDICIAL")
+    normalizador.normalizar("SUSPENSA-JUDICIAL", contar=False)
+    normalizador.normalizar("ATIVA")
+
+    assert normalizador.fechar_ciclo() == {"SUSPENSA JUDICIAL": (2, ["SUSPENSA-JUDICIAL", "Suspensa  judicial"])}
+    assert normalizador.fechar_ciclo() == {}
+
+
+def test_variacoes_de_grafia_caem_na_mesma_regra(regras):
+    assert regras.status.normalizar("Suspensa - RFB") == "SUSPENSA"
+    assert regras.status.normalizar("suspensa_rfb") == "SUSPENSA"
+    assert regras.regime.normalizar("Simples  Nacional") == "SN"
+    assert regras.status.normalizar("Suspensa judicial") == "SUSPENSA JUDICIAL"
+
+
+def test_arquivo_sem_modificacao_nao_recarrega(regras):
+    assert regras.verificar() is False
+
+
+def test_recarrega_quando_o_arquivo_muda(regras):
+    assert regras.status.normalizar("SUSPENSA JUDICIAL") == "SUSPENSA JUDICIAL"  # Fica no cache
+
+    novas = {**REGRAS, "status": {**REGRAS["status"], "SUSPENSA JUDICIAL": "SUSPENSA"}}
+    _gravar(regras.caminho, novas)
+
+    assert regras.verificar() is True
+    assert regras.status.normalizar("SUSPENSA JUDICIAL") == "SUSPENSA"
+    assert regras.ultimo_erro is None
+
+
+def test_arquivo_invalido_mantem_as_regras_anteriores(regras):
+    _gravar(regras.caminho, "{ isto não é json")
+
+    assert regras.verificar() is False
+    assert "JSON inválido" in regras.ultimo_erro
+    assert regras.status.normalizar("SUSPENSA RFB") == "SUSPENSA"
+    # O mesmo arquivo inválido não é relido a cada ciclo
+    assert regras.verificar() is False
+
+
+def test_secao_ausente_e_rejeitada(tmp_path):
+    caminho = tmp_path / "normalizacao.json"
+    _gravar(caminho, {"status": {"ATIVA": "ATIVA"}})
+
+    with pytest.raises(RegrasInvalidas):
+        RegrasNormalizacao(caminho).carregar()
+
+
+def test_valores_sem_regra_cobrem_as_empresas_atuais(regras):
+    valores = ValoresSemRegra(regras.status)
+    valores.atualizar("1", "SUSPENSA JUDICIAL")
+    valores.atualizar("2", "Suspensa - Judicial")
+    valores.atualizar("3", "ATIVA")
+
+    assert valores.resumo() == {"SUSPENSA JUDICIAL": (2, ["SUSPENSA JUDICIAL", "Suspensa - Judicial"])}
+
+    valores.remover("1")
+    valores.atualizar("2", "ATIVA")
+    assert valores.resumo() == {}
+
+
+def test_valores_sem_regra_seguem_as_regras_recarregadas(regras):
+    valores = ValoresSemRegra(regras.status)
+    valores.atualizar("1", "SUSPENSA JUDICIAL")
+
+    _gravar(regras.caminho, {**REGRAS, "status": {**REGRAS["status"], "SUSPENSA JUDICIAL": "SUSPENSA"}})
+    regras.verificar()
+
+    assert valores.resumo() == {}
@@ -0,0 +1,39 @@
+import asyncio
+
+from notificacoes import CanalNaoEncontrado, DespachanteNotificacoes
+
+
+def _despachar(*envios):
+    """Enfileira os envios (funcao, args, quantidade), espera a fila esvaziar e retorna o despachante."""
+    despachante = DespachanteNotificacoes(workers=2, por_segundo_por_canal=0)
+
+    async def executar():
+        for funcao, args, quantidade in envios:
+            despachante.enfileirar(funcao, *args, quantidade=quantidade)
+        await despachante.encerrar()
+
+    asyncio.run(executar())
+    return despachante
+
+
+async def _enviar(mensagens, notificacoes):
+    return mensagens, notificacoes
+
+
+async def _sem_canal(*args):
+    raise CanalNaoEncontrado("canal teste não encontrado")
+
+
+def test_conta_mensagens_e_notificacoes_separadamente():
+    despachante = _despachar((_enviar, (1, 1), 1), (_enviar, (2, 15), 15))
+
+    assert despachante.mensagens_enviadas == 3
+    assert despachante.enviadas == 16
+    assert despachante.falhas == 0
+
+
+def test_canal_inexistente_conta_todas_as_notificacoes_como_falhas():
+    despachante = _despachar((_enviar, (1, 1), 1), (_sem_canal, (), 12))
+
+    assert despachante.enviadas == 1
+    assert despachante.falhas == 12
@@ -0,0 +1,70 @@
+from planilha import MotorDiff
+
+CABECALHO = ["CODIGO", "EMPRESA", "STATUS", "REGIME"]
+
+
+def _planilha(*linhas):
+    return [CABECALHO, *[list(linha) for linha in linhas]]
+
+
+def test_primeira_leitura_retorna_todas_as_linhas_validas():
+    motor = MotorDiff()
+    diff = motor.calcular(_planilha(["1", "A", "ATIVA", "SN"], ["2", "B", "BAIXA", ""], ["", "SEM CODIGO", "ATIVA", ""]))
+
+    assert not diff.inalterado
+    assert [linha[1] for linha in diff.linhas_alteradas] == ["1", "2"]
+    assert diff.codigos_validos == {"1", "2"}
+
+
+def test_apenas_linhas_alteradas_apos_confirmar():
+    motor = MotorDiff()
+    motor.confirmar(motor.calcular(_planilha(["1", "A", "ATIVA", "SN"], ["2", "B", "ATIVA", "LP"])))
+
+    diff = motor.calcular(_planilha(["1", "A", "ATIVA", "SN"], ["2", "B", "SUSPENSA", "LP"], ["3", "C", "ATIVA", "SN"]))
+
+    assert diff.linhas_alteradas == [(3, "2", "B", "SUSPENSA", "LP"), (4, "3", "C", "ATIVA", "SN")]
+    assert diff.codigos_validos == {"1", "2", "3"}
+
+
+def test_planilha_identica_e_inalterada():
+    motor = MotorDiff()
+    dados = _planilha(["1", "A", "ATIVA", "SN"])
+    motor.confirmar(motor.calcular(dados))
+
+    diff = motor.calcular(_planilha(["1", "A", "ATIVA", "SN"]))
+
+    assert diff.inalterado
+    assert diff.linhas_alteradas == []
+    assert diff.codigos_validos == {"1"}
+
+
+def test_sem_confirmar_a_leitura_e_reprocessada():
+    motor = MotorDiff()
+    motor.confirmar(motor.calcular(_planilha(["1", "A", "ATIVA", "SN"])))
+    motor.calcular(_planilha(["1", "A", "BAIXA", "SN"]))  # Ciclo com erro: não confirmado
+
+    diff = motor.calcular(_planilha(["1", "A", "BAIXA", "SN"]))
+
+    assert [linha[1] for linha in diff.linhas_alteradas] == ["1"]
+
+
+def test_empresa_removida_sai_dos_codigos_validos():
+    motor = MotorDiff()
+    motor.confirmar(motor.calcular(_planilha(["1", "A", "ATIVA", "SN"], ["2", "B", "ATIVA", "SN"])))
+
+    diff = motor.calcular(_planilha(["1", "A", "ATIVA", "SN"]))
+
+    assert diff.linhas_alteradas == []
+    assert diff.codigos_validos == {"1"}
+
+
+def test_todas_reprocessa_e_separa_linhas_inalteradas():
+    motor = MotorDiff()
+    dados = _planilha(["1", "A", "ATIVA", "SN"], ["2", "B", "SUSPENSA JUDICIAL", "SN"])
+    motor.confirmar(motor.calcular(dados))
+
+    diff = motor.calcular(_planilha(["1", "A", "BAIXA", "SN"], ["2", "B", "SUSPENSA JUDICIAL", "SN"]), todas=True)
+
+    assert not diff.inalterado
+    assert [linha[1] for linha in diff.linhas_alteradas] == ["1", "2"]
+    assert diff.codigos_inalterados == {"2"}
@@ -0,0 +1,64 @@
+from suspensas import HistoricoSuspensas
+
+
+def _registrar(historico, *codigos):
+    for codigo in codigos:
+        historico.registrar("2026-W42", codigo, f"EMPRESA {codigo}", "18/10/2026 09:00:00")
+
+
+def _codigos(historico):
+    return [empresa["codigo"] for empresa in historico["2026-W42"]["empresas"]]
+
+
+def test_compactacao_grava_o_arquivo_completo_e_apaga_o_log(tmp_path):
+    historico = HistoricoSuspensas(tmp_path)
+    historico.carregar()
+    _registrar(historico, "1", "2")
+
+    historico.gravar_compactacao(historico.preparar_compactacao())
+    historico.fechar()
+
+    assert not historico.caminho_log.exists()
+    assert not historico.caminho_log_compactando.exists()
+    recarregado = HistoricoSuspensas(tmp_path)
+    recarregado.carregar()
+    assert _codigos(recarregado) == ["1", "2"]
+    assert recarregado.linhas_log == 0
+
+
+def test_registro_durante_a_gravacao_continua_no_log(tmp_path):
+    historico = HistoricoSuspensas(tmp_path)
+    historico.carregar()
+    _registrar(historico, "1")
+
+    compactacao = historico.preparar_compactacao()
+    _registrar(historico, "2")  # Chega antes de a thread separar o log
+    historico.gravar_compactacao(compactacao)
+    _registrar(historico, "3")
+    historico.fechar()
+
+    assert historico.linhas_log == 2
+    assert historico.caminho_log.read_text(encoding="utf-8").count("\n") == 2
+    recarregado = HistoricoSuspensas(tmp_path)
+    recarregado.carregar()
+    assert _codigos(recarregado) == ["1", "2", "3"]
+    assert recarregado.linhas_log == 2
+
+
+def test_compactacao_interrompida_e_absorvida_pela_seguinte(tmp_path):
+    historico = HistoricoSuspensas(tmp_path)
+    historico.carregar()
+    _registrar(historico, "1")
+    historico.fechar()
+    historico.caminho_log.replace(historico.caminho_log_compactando)  # Queda antes de gravar o arquivo completo
+
+    historico = HistoricoSuspensas(tmp_path)
+    historico.carregar()
+    _registrar(historico, "2")
+    historico.gravar_compactacao(historico.preparar_compactacao())
+    historico.fechar()
+
+    assert not historico.caminho_log_compactando.exists()
+    recarregado = HistoricoSuspensas(tmp_path)
+    recarregado.carregar()
+    assert _codigos(recarregado) == ["1", "2"]
@@ -1,41 +1,46 @@
 import logging
 import os
 import sys
-from logging.handlers import RotatingFileHandler
+
+from dotenv import load_dotenv
+
+# Módulos compartilhados pelos bots ficam em comum/, na raiz do repositório
+RAIZ_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ_REPOSITORIO not in sys.path:
+    sys.path.insert(0, RAIZ_REPOSITORIO)
+
+from comum.registro_logs import configurar_logs
+
+# Carrega o .env antes de ler as opções de log
+load_dotenv()
 
 # Cria diretório de logs se não existir
 LOG_DIR = "logs"
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
-# Configuração do logger
-logger = logging.getLogger("rebecca_bot")
-logger.setLevel(logging.DEBUG)
-
-# Handler para arquivo (rotativo) com UTF-8
-file_handler = RotatingFileHandler(
+# Configuração do logger: arquivo (rotativo) e console são escritos por uma
+# thread própria (fila), fora do loop de eventos do discord.py
+logger = configurar_logs(
     os.path.join(LOG_DIR, "rebecca_bot.log"),
-    maxBytes=10485760,  # 10MB
-    backupCount=5,
-    encoding='utf-8'
-)
-file_handler.setLevel(logging.DEBUG)
-
-# Handler para console - usa stderr e ignora erros de encoding
-console_handler = logging.StreamHandler(sys.stderr)
-console_handler.setLevel(logging.INFO)
-
-# Formato das mensagens (sem emojis para evitar problemas de encoding)
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
+    logger="rebecca_bot",
+    nivel=os.getenv("LOG_NIVEL", "DEBUG"),
+    nivel_console=os.getenv("LOG_NIVEL_CONSOLE", "INFO"),
+    formato=os.getenv("LOG_FORMATO", "texto").lower(),  # texto ou json (uma linha JSON por registro)
+    rotacao=os.getenv("LOG_ROTACAO", "tamanho").lower(),  # tamanho ou diaria
+    tamanho_maximo=int(os.getenv("LOG_TAMANHO_MAXIMO_MB", "10")) * 1024 * 1024,
+    arquivos_antigos=int(os.getenv("LOG_ARQUIVOS_ANTIGOS", "5")),
+    # Formato das mensagens (sem emojis para evitar problemas de encoding)
+    formato_texto="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    formato_data="%Y-%m-%d %H:%M:%S",
 )
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
 
-# Adiciona handlers ao logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# Logs do discord.py pela mesma fila (o bot roda com log_handler=None); INFO como no padrão do discord.py
+discord_logger = logging.getLogger("discord")
+discord_logger.setLevel(logging.INFO)
+discord_logger.propagate = False
+for handler in logger.handlers:
+    discord_logger.addHandler(handler)
 
 def get_logger():
     return logger
@@ -38,12 +38,10 @@ def criar_lockfile():
                     import psutil
                     if psutil.pid_exists(old_pid):
                         logger.error(f"Bot já está rodando (PID: {old_pid}). Encerrando...")
-                        print(f"ERRO: Bot_Rebecca já está em execução (PID: {old_pid})")
                         sys.exit(1)
                 else:
                     os.kill(old_pid, 0)  # Não mata o processo, apenas verifica
                     logger.error(f"Bot já está rodando (PID: {old_pid}). Encerrando...")
-                    print(f"ERRO: Bot_Rebecca já está em execução (PID: {old_pid})")
                     sys.exit(1)
             except (ProcessLookupError, OSError, ImportError):
                 # Processo não existe mais, pode remover o lockfile antigo
@@ -336,7 +334,8 @@ if __name__ == "__main__":
     criar_lockfile()
 
     try:
-        bot.run(DISCORD_TOKEN)
+        # log_handler=None: o discord.py usa a configuração de logging do config.py em vez de criar a sua
+        bot.run(DISCORD_TOKEN, log_handler=None)
     except KeyboardInterrupt:
         logger.info("Bot encerrado pelo usuário")
     except Exception as e:
@@ -0,0 +1 @@
+"""Módulos compartilhados pelos bots (Bot_Gerson, Bot_Rebecca)."""
@@ -0,0 +1,134 @@
+"""
+Configuração de logging sem bloquear o loop de eventos.
+
+O logger recebe apenas um QueueHandler: cada registro é colocado numa fila em
+memória e um QueueListener, numa thread própria, faz a escrita no arquivo e
+no console. Assim a gravação em disco (e a rotação do arquivo) nunca roda na
+thread do asyncio.
+
+Opções:
+- rotação por tamanho ("tamanho") ou à meia-noite ("diaria"), com N arquivos antigos;
+- arquivo em texto ou em JSON (uma linha por registro, para ferramentas de análise);
+- nível separado para o console.
+
+Compartilhado pelos bots Gerson e Rebecca: cada bot põe a raiz do repositório no
+`sys.path` antes de importar `comum.registro_logs`.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from pathlib import Path
+
+FORMATO_TEXTO = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener = None
+
+
+class FormatadorJSON(logging.Formatter):
+    """Um objeto JSON por linha: data, nível, logger, mensagem (e a exceção, se houver)."""
+
+    def format(self, record):
+        registro = {
+            "data": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        if record.exc_text:
+            registro["excecao"] = record.exc_text
+        return json.dumps(registro, ensure_ascii=False)
+
+
+class _QueueHandlerEstruturado(QueueHandler):
+    """Como o QueueHandler, mas mantém o traceback separado da mensagem (campo "excecao" no JSON)."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _nivel(valor):
+    if isinstance(valor, int):
+        return valor
+    return getattr(logging, str(valor).upper(), logging.INFO)
+
+
+def configurar_logs(
+    arquivo,
+    logger=None,
+    nivel="INFO",
+    nivel_console=None,
+    formato="texto",
+    rotacao="tamanho",
+    tamanho_maximo=10 * 1024 * 1024,
+    arquivos_antigos=5,
+    formato_texto=FORMATO_TEXTO,
+    formato_data=None,
+):
+    """
+    Configura `logger` (padrão: o logger raiz) para gravar em `arquivo` e no console via fila.
+
+    Args:
+        arquivo: Caminho do arquivo de log (a pasta é criada se não existir).
+        nivel: Nível do arquivo (e do console, se `nivel_console` não for informado).
+        formato: "texto" ou "json" (apenas o arquivo; o console é sempre texto).
+        rotacao: "tamanho" (ao passar de `tamanho_maximo` bytes) ou "diaria" (à meia-noite).
+        arquivos_antigos: Arquivos rotacionados mantidos.
+
+    Retorna o logger configurado. Chamar de novo substitui a configuração anterior.
+    """
+    global _listener
+    encerrar_logs()
+
+    arquivo = Path(arquivo)
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    if rotacao == "diaria":
+        arquivo_handler = TimedRotatingFileHandler(arquivo, when="midnight", backupCount=arquivos_antigos, encoding="utf-8")
+    else:
+        arquivo_handler = RotatingFileHandler(arquivo, maxBytes=tamanho_maximo, backupCount=arquivos_antigos, encoding="utf-8")
+    texto = logging.Formatter(formato_texto, datefmt=formato_data)
+    arquivo_handler.setFormatter(FormatadorJSON() if formato == "json" else texto)
+    arquivo_handler.setLevel(_nivel(nivel))
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(texto)
+    console_handler.setLevel(_nivel(nivel_console or nivel))
+
+    fila = queue.SimpleQueue()  # Sem limite: quem registra nunca espera pela escrita
+    alvo = logging.getLogger(logger)
+    for handler in list(alvo.handlers):
+        alvo.removeHandler(handler)
+        handler.close()
+    alvo.addHandler(_QueueHandlerEstruturado(fila))
+    alvo.setLevel(min(arquivo_handler.level, console_handler.level))
+    if logger:
+        alvo.propagate = False  # Evita a segunda escrita pelos handlers do logger raiz
+
+    _listener = QueueListener(fila, arquivo_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    return alvo
+
+
+def encerrar_logs():
+    """Grava os registros ainda na fila e para a thread de escrita (também chamada na saída do processo)."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(encerrar_logs)